@@ -1,19 +1,25 @@
 #!/usr/bin/env python3
 
-import os
 import numpy as np
 from scipy import stats
-import matplotlib.pyplot as plt
-import statsmodels.api as sm
-import numpy as np
 
 # custom HYPY modules
-import supfunc as sup
+import figures
+import profiling
+import streaming as stream
+from results import TestResult
+from samples import as_summary
 
 __author__ = "Christopher J. Blakeney"
 __version__ = "0.1.0"
 __license__ = ""
 
+# largest sample handed to shapiro-wilks by select_normality_tests
+SHAPIRO_MAX_N = 5000
+# the last anderson-darling p-value branch has its minimum here and grows
+# past it, larger adjusted statistics get p = 0 (as statsmodels normal_ad)
+AD_MAX_AA = 153.467
+
 
 def check_normality(
     data,
@@ -22,105 +28,181 @@ def check_normality(
     figure_options=[],
     figs_save_path="null",
     dpi=150,
+    subsample=None,
+    seed=None,
 ):
-    # checks normailty assumption and returns dict
-    # conclusion false by default
-    normality_tests_dict = {
-        "shapiro-wilks": {
-            "t": [0.0],
-            "p": [0.0],
-            "conclusion": False,
-            "interpretation": "",
-        },
-        "k-squared": {
-            "t": [0.0],
-            "p": [0.0],
-            "conclusion": False,
-            "interpretation": "",
-        },
-    }
-    # graphical options
+    # checks normailty assumption and returns {test: TestResult} for the
+    # requested tests. data may be an array or a SampleSummary, every test
+    # and figure reads the same summary (one sort, one moment pass)
+    sample = as_summary(data)
+    # graphical options, drawn on a private Agg figure (see figures.py)
     for i in figure_options:
-        if i == "histogram" and figs_save_path != "null":
-            # create histogram from data
-            plt.hist(
-                data, edgecolor="black", density=True, bins="auto", color="b", alpha=0.8
-            )
-            # create normality curve line and mean vertical
-            mu, std = stats.norm.fit(data)
-            xmin, xmax = plt.xlim()
-            x = np.linspace(xmin, xmax, 100)
-            p = stats.norm.pdf(x, mu, std)
-            plt.plot(x, p, "--", color="red", linewidth=1.5)
-            plt.axvline(data.mean(), color="orange", linestyle="dashed", linewidth=1)
-
-            # histogram labels
-            plt.xlabel("Value")
-            plt.ylabel("Frequency")
-            plt.title(
-                f"Normalized Histogram with Normal Curve: {data_label}\nμ={round(data.mean(), 4)}, σ={round(np.std(data), 4)}"
-            )
-            # save histogram
-            hist_file_name = f"{data_label} - Histogram.png"
-            hist_save_path = os.path.join(figs_save_path, hist_file_name)
-            plt.savefig(hist_save_path, dpi=dpi)
-        elif i == "qq-plot" and figs_save_path != "null":
-            # create qq plot from data
-            fig = sm.qqplot(data, line="s")
-            plt.title(f"QQ-Plot - {data_label}")
-            # save figure
-            qq_file_name = f"{data_label} - QQ-Plot.png"
-            qq_save_path = os.path.join(figs_save_path, qq_file_name)
-            plt.savefig(qq_save_path, dpi=dpi)
+        if i in figures.DRAWERS and figs_save_path != "null":
+            figures.render_figure(i, sample, data_label, figs_save_path, dpi)
+
+    # optional seeded subsample, keeps large-n tests bounded and meaningful
+    if subsample and statistical_options and len(sample) > subsample:
+        sample = as_summary(subsample_data(sample.data, subsample, seed))
 
     # normality statistical test options
+    normality_tests = {}
     for j in statistical_options:
-        if j == "shapiro-wilks":  # reliable for samples < 1000
-            test_stat_shapiro, p_value_shapiro = stats.shapiro(data)
-            normality_tests_dict[j]["t"] = test_stat_shapiro
-            normality_tests_dict[j]["p"] = p_value_shapiro
-            sup.test_p_value(p_value_shapiro, "shapiro-wilks", normality_tests_dict)
-        elif j == "k-squared":
-            test_stat_ksquare, p_value_ksquare = stats.normaltest(data)
-            normality_tests_dict[j]["t"] = test_stat_ksquare
-            normality_tests_dict[j]["p"] = p_value_ksquare
-            sup.test_p_value(p_value_ksquare, "k-squared", normality_tests_dict)
+        with profiling.stage(f"normality:{j}", len(sample)):
+            if j == "shapiro-wilks":  # reliable for samples < 1000
+                test_stat, p_value = stats.shapiro(sample.sorted)
+            elif j == "k-squared":
+                test_stat, p_value = ksquared(sample)
+            elif j == "kolmogorov-smirnov":
+                test_stat, p_value = lilliefors(sample)
+            elif j == "anderson-darling":
+                test_stat, p_value = anderson_darling(sample)
+            else:
+                continue
+        normality_tests[j] = TestResult(j, test_stat, p_value)
+
+    return normality_tests
+
+
+def select_normality_tests(n):
+    # shapiro-wilks loses accuracy past ~5000 samples (scipy warns), larger
+    # samples use the O(n log n) ecdf tests. k-squared works at any size
+    if n < SHAPIRO_MAX_N:
+        return ["shapiro-wilks", "k-squared"]
+    return ["anderson-darling", "kolmogorov-smirnov", "k-squared"]
+
+
+def subsample_data(data, size, seed=None):
+    # seeded sample without replacement, data returned as is when small enough
+    data = np.asarray(data)
+    if len(data) <= size:
+        return data
+    rng = np.random.default_rng(seed)
+    return data[np.sort(rng.choice(len(data), size, replace=False))]
+
+
+def ksquared(data):
+    # d'agostino-pearson k-squared from the summary moments, as
+    # stats.normaltest (which also rejects samples below 8 values)
+    sample = as_summary(data)
+    if len(sample) < 8:
+        return stats.normaltest(sample.data)
+    return stream.ksquared(sample.moments)
 
-    # return dict containing results
-    return normality_tests_dict
+
+def _standardized_sorted(data):
+    return as_summary(data).standardized_sorted()
+
+
+def lilliefors(data):
+    # kolmogorov-smirnov test for normality with estimated mean / sd.
+    # p-value from Dallal & Wilkinson (1986), as R nortest::lillie.test
+    z = _standardized_sorted(data)
+    n = len(z)
+    cdf = stats.norm.cdf(z)
+    i = np.arange(1, n + 1)
+    d = max(np.max(i / n - cdf), np.max(cdf - (i - 1) / n))
+    if n <= 100:
+        kd, nd = d, n
+    else:
+        kd, nd = d * (n / 100) ** 0.49, 100
+    p = np.exp(
+        -7.01256 * kd**2 * (nd + 2.78019)
+        + 2.99587 * kd * np.sqrt(nd + 2.78019)
+        - 0.122119
+        + 0.974598 / np.sqrt(nd)
+        + 1.67997 / nd
+    )
+    if p > 0.1:
+        kk = (np.sqrt(n) - 0.01 + 0.85 / np.sqrt(n)) * d
+        if kk <= 0.302:
+            p = 1.0
+        elif kk <= 0.5:
+            p = 2.76773 - 19.828 * kk + 80.709 * kk**2 - 138.55 * kk**3 + 81.218 * kk**4
+        elif kk <= 0.9:
+            p = (
+                -4.901232
+                + 40.662806 * kk
+                - 97.490286 * kk**2
+                + 94.029866 * kk**3
+                - 32.355711 * kk**4
+            )
+        elif kk <= 1.31:
+            p = (
+                6.198765
+                - 19.558097 * kk
+                + 23.186922 * kk**2
+                - 12.234627 * kk**3
+                + 2.423045 * kk**4
+            )
+        else:
+            p = 0.0
+    return float(d), float(p)
+
+
+def anderson_darling(data):
+    # anderson-darling test for normality with estimated mean / sd, log cdf
+    # terms keep the tails stable at large n. p-value from the adjusted
+    # statistic (D'Agostino & Stephens 1986), as R nortest::ad.test
+    z = _standardized_sorted(data)
+    n = len(z)
+    i = np.arange(1, n + 1)
+    a2 = (
+        -n
+        - np.sum((2 * i - 1) * (stats.norm.logcdf(z) + stats.norm.logsf(z[::-1]))) / n
+    )
+    aa = a2 * (1 + 0.75 / n + 2.25 / n**2)
+    if aa < 0.2:
+        p = 1 - np.exp(-13.436 + 101.14 * aa - 223.73 * aa**2)
+    elif aa < 0.34:
+        p = 1 - np.exp(-8.318 + 42.796 * aa - 59.938 * aa**2)
+    elif aa < 0.6:
+        p = np.exp(0.9177 - 4.279 * aa - 1.38 * aa**2)
+    elif aa < AD_MAX_AA:
+        p = np.exp(1.2937 - 5.709 * aa + 0.0186 * aa**2)
+    else:
+        p = 0.0
+    return float(a2), float(min(max(p, 0.0), 1.0))
+
+
+def levene(*samples):
+    # levene's test, median centred as stats.levene, from each summary's
+    # absolute deviations
+    samples = [as_summary(s) for s in samples]
+    k = len(samples)
+    ni = np.array([s.n for s in samples], dtype=np.float64)
+    zbar = np.array([s.abs_dev.mean() for s in samples])
+    ssw = sum(((s.abs_dev - zb) ** 2).sum() for s, zb in zip(samples, zbar))
+    ntot = ni.sum()
+    zall = (ni * zbar).sum() / ntot
+    w = (ntot - k) * (ni * (zbar - zall) ** 2).sum() / ((k - 1) * ssw)
+    return float(w), float(stats.f.sf(w, k - 1, ntot - k))
+
+
+def bartlett(*samples):
+    # bartlett's test from each summary's variance
+    samples = [as_summary(s) for s in samples]
+    t, p = stream.bartlett_from_moments(
+        [s.n for s in samples], [s.variance() for s in samples]
+    )
+    return float(t), float(p)
 
 
 def check_variance_equality(group_1, group_2, statistical_options=[]):
-    # checks homogeneity of variances assumption and returns results dict
-    variance_tests_dict = {
-        "bartletts": {
-            "t": 0.0,
-            "p": 0.0,
-            "conclusion": False,
-            "interpretation": "",
-        },
-        "levenes": {
-            "t": 0.0,
-            "p": 0.0,
-            "conclusion": False,
-            "interpretation": "",
-        },
-    }
-    # variance statistical test options
+    # checks homogeneity of variances assumption, returns {test: TestResult}.
+    # groups may be arrays or SampleSummary objects
+    group_1, group_2 = as_summary(group_1), as_summary(group_2)
+    variance_tests = {}
     for j in statistical_options:
-        if j == "levenes":
-            test_stat_lev, p_value_lev = stats.levene(group_1, group_2)
-            variance_tests_dict[j]["t"] = test_stat_lev
-            variance_tests_dict[j]["p"] = p_value_lev
-            sup.test_p_value(p_value_lev, "levenes", variance_tests_dict)
-        elif j == "bartletts":
-            test_stat_bart, p_value_bart = stats.bartlett(group_1, group_2)
-            variance_tests_dict[j]["t"] = test_stat_bart
-            variance_tests_dict[j]["p"] = p_value_bart
-            sup.test_p_value(p_value_bart, "bartletts", variance_tests_dict)
-
-    # return dict containing results
-    return variance_tests_dict
+        with profiling.stage(f"variance:{j}", len(group_1) + len(group_2)):
+            if j == "levenes":
+                test_stat, p_value = levene(group_1, group_2)
+            elif j == "bartletts":
+                test_stat, p_value = bartlett(group_1, group_2)
+            else:
+                continue
+        variance_tests[j] = TestResult(j, test_stat, p_value)
+
+    return variance_tests
 
 
 def main():
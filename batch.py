@@ -0,0 +1,193 @@
+import csv
+import os
+import numpy as np
+from scipy import stats
+
+# custom hypy modules
+import supfunc as sup
+import streaming as stream
+
+# column-wise t-tests: every column of a 2-D array (rows = observations) is
+# tested at once with array operations, NaN cells are ignored per column.
+# normality is checked with the moment based k-squared test and variance
+# equality with levene's (median) and bartlett's tests; shapiro-wilks has no
+# array-wise form and is left to the single sample path in stats_tests.
+# results come back as a numpy structured array, one row per column tested.
+
+ONE_SAMPLE_FIELDS = [
+    ("label", object),
+    ("n", np.int64),
+    ("mean", np.float64),
+    ("std", np.float64),
+    ("t", np.float64),
+    ("p", np.float64),
+    ("k2", np.float64),
+    ("k2_p", np.float64),
+    ("normal", np.bool_),
+    ("assumptions_met", np.bool_),
+    ("conclusion", np.bool_),
+]
+
+TWO_SAMPLE_FIELDS = [
+    ("label", object),
+    ("n_1", np.int64),
+    ("n_2", np.int64),
+    ("mean_1", np.float64),
+    ("mean_2", np.float64),
+    ("t", np.float64),
+    ("p", np.float64),
+    ("k2_1", np.float64),
+    ("k2_p_1", np.float64),
+    ("k2_2", np.float64),
+    ("k2_p_2", np.float64),
+    ("levene", np.float64),
+    ("levene_p", np.float64),
+    ("bartlett", np.float64),
+    ("bartlett_p", np.float64),
+    ("normal", np.bool_),
+    ("equal_var", np.bool_),
+    ("assumptions_met", np.bool_),
+    ("conclusion", np.bool_),
+]
+
+
+def as_2d(data):
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim == 1:
+        data = data.reshape(-1, 1)
+    return data
+
+
+def column_moments(data):
+    # returns n, mean, m2, m3, m4 per column, NaN cells excluded
+    mask = ~np.isnan(data)
+    n = mask.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(mask, data, 0.0).sum(axis=0) / n
+    d = np.where(mask, data - mean, 0.0)
+    d2 = d * d
+    return n, mean, d2.sum(axis=0), (d2 * d).sum(axis=0), (d2 * d2).sum(axis=0)
+
+
+def column_ksquared(n, m2, m3, m4):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        g1 = np.sqrt(n) * m3 / m2**1.5
+        b2 = n * m4 / m2**2
+        return stream.ksquared_from_moments(n, g1, b2)
+
+
+def column_levene(groups):
+    # levene's test (median centred, as scipy default) across k 2-D groups
+    k = len(groups)
+    ni, zbar, ssw = [], [], []
+    for g in groups:
+        z = np.abs(g - np.nanmedian(g, axis=0))
+        mask = ~np.isnan(z)
+        n = mask.sum(axis=0)
+        zm = np.where(mask, z, 0.0).sum(axis=0) / n
+        ni.append(n)
+        zbar.append(zm)
+        ssw.append(np.where(mask, (z - zm) ** 2, 0.0).sum(axis=0))
+    ni, zbar, ssw = np.array(ni), np.array(zbar), np.array(ssw)
+    ntot = ni.sum(axis=0)
+    zall = (ni * zbar).sum(axis=0) / ntot
+    numer = (ntot - k) * (ni * (zbar - zall) ** 2).sum(axis=0)
+    denom = (k - 1) * ssw.sum(axis=0)
+    w = numer / denom
+    return w, stats.f.sf(w, k - 1, ntot - k)
+
+
+def batch_ttest(
+    data_1,
+    data_2=None,
+    labels=None,
+    pop_mean=0,
+    test_type="one-sample",
+    tail_type="two-tailed",
+):
+    # one-sample: every column of data_1 against pop_mean
+    # two-sample: column j of data_1 against column j of data_2
+    data_1 = as_2d(data_1)
+    m = data_1.shape[1]
+    if labels is None:
+        labels = [str(i) for i in range(m)]
+    n1, mean1, m2_1, m3_1, m4_1 = column_moments(data_1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var1 = m2_1 / (n1 - 1)
+        k2_1, k2_p_1 = column_ksquared(n1, m2_1, m3_1, m4_1)
+        if test_type == "one-sample":
+            t, p = stream.ttest_1samp_from_moments(n1, mean1, var1, pop_mean)
+            table = np.empty(m, dtype=ONE_SAMPLE_FIELDS)
+            table["n"] = n1
+            table["mean"] = mean1
+            table["std"] = np.sqrt(var1)
+            table["k2"] = k2_1
+            table["k2_p"] = k2_p_1
+            table["normal"] = k2_p_1 > sup.ALPHA
+            table["assumptions_met"] = table["normal"]
+        else:
+            data_2 = as_2d(data_2)
+            if data_2.shape[1] != m:
+                raise ValueError("data_1 and data_2 must have the same columns")
+            n2, mean2, m2_2, m3_2, m4_2 = column_moments(data_2)
+            var2 = m2_2 / (n2 - 1)
+            k2_2, k2_p_2 = column_ksquared(n2, m2_2, m3_2, m4_2)
+            t, p = stream.ttest_ind_from_moments(n1, mean1, var1, n2, mean2, var2)
+            lev, lev_p = column_levene([data_1, data_2])
+            bart, bart_p = stream.bartlett_from_moments([n1, n2], [var1, var2])
+            table = np.empty(m, dtype=TWO_SAMPLE_FIELDS)
+            table["n_1"] = n1
+            table["n_2"] = n2
+            table["mean_1"] = mean1
+            table["mean_2"] = mean2
+            table["k2_1"] = k2_1
+            table["k2_p_1"] = k2_p_1
+            table["k2_2"] = k2_2
+            table["k2_p_2"] = k2_p_2
+            table["levene"] = lev
+            table["levene_p"] = lev_p
+            table["bartlett"] = bart
+            table["bartlett_p"] = bart_p
+            table["normal"] = (k2_p_1 > sup.ALPHA) & (k2_p_2 > sup.ALPHA)
+            table["equal_var"] = (lev_p > sup.ALPHA) & (bart_p > sup.ALPHA)
+            table["assumptions_met"] = table["normal"] & table["equal_var"]
+    if tail_type != "two-tailed":
+        p = p / 2
+    table["label"] = labels
+    table["t"] = t
+    table["p"] = p
+    table["conclusion"] = p < sup.ALPHA
+    return table
+
+
+def batch_csv(
+    csvfile,
+    test_type="one-sample",
+    pop_mean=0,
+    tail_type="two-tailed",
+    cols=None,
+    dtype=np.float64,
+):
+    # one-sample: every column; two-sample: consecutive column pairs
+    if cols is None:
+        cols = sup.read_header(csvfile)
+    columns = sup.import_columns(csvfile, cols, dtype)
+    if test_type == "one-sample":
+        data = np.column_stack([columns[c] for c in cols])
+        return batch_ttest(data, None, cols, pop_mean, test_type, tail_type)
+    if len(cols) % 2:
+        raise ValueError("two-sample batch needs an even number of columns")
+    firsts, seconds = cols[0::2], cols[1::2]
+    data_1 = np.column_stack([columns[c] for c in firsts])
+    data_2 = np.column_stack([columns[c] for c in seconds])
+    labels = [f"{a} vs {b}" for a, b in zip(firsts, seconds)]
+    return batch_ttest(data_1, data_2, labels, pop_mean, test_type, tail_type)
+
+
+def export_table_csv(table, save_path, file_name="batch_results.csv"):
+    path = os.path.join(save_path, file_name)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(table.dtype.names)
+        writer.writerows(table.tolist())
+    return path
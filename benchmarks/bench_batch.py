@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+# compares batch.batch_ttest with looping stats_tests.ttest over columns.
+# usage: python benchmarks/bench_batch.py [rows] [cols]
+
+import contextlib
+import io
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import batch  # noqa: E402
+import stats_tests as st  # noqa: E402
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = np.random.default_rng(0)
+    data_1 = rng.normal(0, 1, (rows, cols))
+    data_2 = rng.normal(0.1, 1, (rows, cols))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for j in range(cols):
+            st.ttest(
+                data_1[:, j], data_2[:, j], ["a", "b"], 0, "two-sample", "two-tailed"
+            )
+    loop = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch.batch_ttest(data_1, data_2, test_type="two-sample")
+    vectorized = time.perf_counter() - start
+
+    print(f"{rows} rows x {cols} column pairs")
+    print(f"ttest loop   {loop:8.3f} s")
+    print(f"batch_ttest  {vectorized:8.3f} s  ({loop / vectorized:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+# per-run export cost: export_dict_png against the text exporters, using the
+# result dicts of a real two-sample run. usage: python benchmarks/bench_export.py [repeats]
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import exporters  # noqa: E402
+import stats_tests as st  # noqa: E402
+
+
+def main():
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    rng = np.random.default_rng(0)
+    labels = ["control", "treatment"]
+    with contextlib.redirect_stdout(io.StringIO()):
+        assump_dict, ttest_dict, *_ = st.ttest(
+            rng.normal(0, 1, 500),
+            rng.normal(0.1, 1, 500),
+            labels,
+            0,
+            "two-sample",
+            "two-tailed",
+        )
+    with tempfile.TemporaryDirectory() as tmp:
+        for fmt in exporters.FORMATS:
+            start = time.perf_counter()
+            try:
+                for _ in range(repeats):
+                    exporters.export_results(
+                        assump_dict, "Assumption Checks", labels, tmp, [fmt], True
+                    )
+                    exporters.export_results(
+                        ttest_dict["two-sample"],
+                        "Two Sample T Test",
+                        labels,
+                        tmp,
+                        [fmt],
+                    )
+            except Exception as e:
+                print(f"{fmt:6s} unavailable: {e!r}"[:100])
+                continue
+            per_run = (time.perf_counter() - start) / repeats
+            print(f"{fmt:6s} {per_run * 1000:10.2f} ms per run")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+# start-up regression check for the CLI. times `hy.py --help` and a bare
+# `import hy`, and fails (exit 1) if the median exceeds the budget, if any
+# plotting / dataframe library is imported before it is needed, or if
+# `hy.py --help` imports numpy.
+# usage: python benchmarks/bench_import.py [runs] [budget seconds]
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HY = os.path.join(ROOT, "hy.py")
+HEAVY = ["pandas", "dataframe_image", "matplotlib", "statsmodels", "scipy"]
+
+
+def time_command(cmd, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else 0.5
+    failed = False
+
+    baseline = time_command([sys.executable, "-c", "pass"], runs)
+    cases = {
+        "hy.py --help": [sys.executable, HY, "--help"],
+        "import hy": [sys.executable, "-c", "import hy"],
+    }
+    print(f"interpreter start-up {baseline:.3f} s (median of {runs})")
+    for name, cmd in cases.items():
+        elapsed = time_command(cmd, runs)
+        status = "ok" if elapsed <= budget else "SLOW"
+        failed |= elapsed > budget
+        print(f"{name:16s} {elapsed:.3f} s  [{status}, budget {budget:.2f} s]")
+
+    # modules loaded by `import hy`, and by `hy.py --help` (which builds every
+    # parser, so also must not pull in numpy)
+    checks = {
+        "import hy": ("import sys, hy", HEAVY),
+        "hy.py --help": (
+            "import sys, runpy, contextlib, io; sys.argv = [%r, '--help']\n"
+            "with contextlib.suppress(SystemExit), contextlib.redirect_stdout(io.StringIO()):\n"
+            "    runpy.run_path(%r, run_name='__main__')" % (HY, HY),
+            HEAVY + ["numpy"],
+        ),
+    }
+    for name, (code, modules) in checks.items():
+        report = "\nprint(' '.join(m for m in %r if m in sys.modules))" % modules
+        loaded = subprocess.run(
+            [sys.executable, "-c", code + report],
+            cwd=ROOT,
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.split()
+        if loaded:
+            failed = True
+            print(f"heavy modules imported by `{name}`: {', '.join(loaded)}")
+        else:
+            print(f"no heavy modules imported by `{name}`")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
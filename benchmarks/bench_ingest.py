@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+
+# compares the single-pass columnar loader with the original per-column
+# DictReader loader. usage: python benchmarks/bench_ingest.py [rows] [cols]
+
+import codecs
+import csv
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import supfunc as sup  # noqa: E402
+
+
+def legacy_import_csv_column(csvfile, col, dtype):
+    # import_csv_column as it was before import_csv_columns
+    data = codecs.open(csvfile, "r", encoding="utf-8", errors="ignore")
+    file = csv.DictReader(data)
+    lst = []
+    for i in file:
+        lst.append(dtype(i[col]))
+    array = np.array(lst)
+    return array
+
+
+def write_csv(path, rows, cols, seed=0):
+    rng = np.random.default_rng(seed)
+    data = rng.normal(0, 1, (rows, cols))
+    header = ",".join(f"sample_{i}" for i in range(cols))
+    np.savetxt(path, data, delimiter=",", header=header, comments="", fmt="%.6f")
+    return header.split(",")
+
+
+def measure(func):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    cols = int(sys.argv[2]) if len(sys.argv) > 2 else 2
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.csv")
+        labels = write_csv(path, rows, cols)
+        cases = {
+            "legacy (one pass per column)": lambda: [
+                legacy_import_csv_column(path, c, float) for c in labels
+            ],
+            "import_csv_columns float64": lambda: sup.import_csv_columns(path, labels),
+            "import_csv_columns float32": lambda: sup.import_csv_columns(
+                path, labels, np.float32
+            ),
+        }
+        print(f"{rows} rows x {cols} columns, {os.path.getsize(path) / 1e6:.1f} MB")
+        for name, func in cases.items():
+            elapsed, peak = measure(func)
+            print(f"{name:32s} {elapsed:8.3f} s  peak {peak / 1e6:8.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+# wall-clock comparison of running hy.py once per file against `hy.py batch`.
+# usage: python benchmarks/bench_runner.py [files] [workers] [extra hy.py args]
+# e.g.   python benchmarks/bench_runner.py 200 8 --allcols
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "hy.py")
+
+
+def write_inputs(folder, files, rows=1000, seed=0):
+    rng = np.random.default_rng(seed)
+    for i in range(files):
+        data = np.column_stack([rng.normal(0, 1, rows), rng.normal(0.1, 1, rows)])
+        path = os.path.join(folder, f"input_{i:04d}.csv")
+        np.savetxt(path, data, delimiter=",", header="a,b", comments="", fmt="%.6f")
+
+
+def main():
+    files = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    workers = sys.argv[2] if len(sys.argv) > 2 else str(os.cpu_count())
+    extra = sys.argv[3:]
+    with tempfile.TemporaryDirectory() as tmp:
+        serial_dir = os.path.join(tmp, "serial")
+        pool_dir = os.path.join(tmp, "pool")
+        os.mkdir(serial_dir)
+        os.mkdir(pool_dir)
+        write_inputs(serial_dir, files)
+        write_inputs(pool_dir, files)
+
+        start = time.perf_counter()
+        for name in sorted(os.listdir(serial_dir)):
+            path = os.path.join(serial_dir, name)
+            out = os.path.splitext(path)[0]
+            os.mkdir(out)
+            subprocess.run(
+                [sys.executable, HY, path, "t-two", out] + extra,
+                check=False,
+                stdout=subprocess.DEVNULL,
+            )
+        serial = time.perf_counter() - start
+
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, HY, "batch", pool_dir, "t-two", "-w", workers] + extra,
+            check=False,
+            stdout=subprocess.DEVNULL,
+        )
+        pooled = time.perf_counter() - start
+
+    print(f"{files} files, {workers} workers")
+    print(f"serial CLI  {serial:8.2f} s")
+    print(f"hy.py batch {pooled:8.2f} s  ({serial / pooled:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+
+# stage by stage benchmark suite: csv ingest, normality and variance checks,
+# t-tests, batch t-tests and result export over seeded synthetic datasets.
+# every stage records its best wall time over --repeats runs and its peak
+# traced memory; --save writes a json baseline and --compare flags stages that
+# got slower or heavier than a saved baseline (exit status 1).
+#
+# usage: python benchmarks/bench_suite.py [--rows 100,10000] [--cols 1,10]
+#        python benchmarks/bench_suite.py --full --save baseline.json
+#        python benchmarks/bench_suite.py --compare baseline.json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import assumption_checks as assump  # noqa: E402
+import batch  # noqa: E402
+import exporters  # noqa: E402
+import stats_tests as st  # noqa: E402
+import supfunc as sup  # noqa: E402
+
+DEFAULT_ROWS = [10**2, 10**4, 10**6]
+FULL_ROWS = [10**2, 10**3, 10**4, 10**5, 10**6, 10**7]
+DEFAULT_COLS = [1, 10, 1000]
+# stages faster than this are too noisy to flag
+NOISE_FLOOR = 0.005
+
+
+def dataset_path(data_dir, rows, cols, seed):
+    # normal columns with slightly shifted means, written once per shape
+    path = os.path.join(data_dir, f"bench_{rows}x{cols}_{seed}.csv")
+    if os.path.exists(path):
+        return path
+    rng = np.random.default_rng(seed)
+    shifts = np.linspace(0, 0.2, cols)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        f.write(",".join(f"sample_{i}" for i in range(cols)) + "\n")
+        for start in range(0, rows, 100_000):
+            n = min(100_000, rows - start)
+            np.savetxt(f, rng.normal(shifts, 1, (n, cols)), delimiter=",", fmt="%.6f")
+    os.replace(tmp, path)
+    return path
+
+
+def measure(func, repeats, memory=True):
+    # best wall time of `repeats` runs, then one traced run for peak memory
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    peak = None
+    if memory:
+        tracemalloc.start()
+        func()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return best, peak
+
+
+def stages(path, rows, cols, out_dir, png):
+    # (name, callable) for every stage of one dataset
+    data = sup.import_csv_columns(path)
+    columns = list(data.values())
+    g1 = columns[0]
+    g2 = columns[1] if cols > 1 else columns[0][rows // 2 :]
+    if cols == 1:
+        g1 = g1[: rows // 2]
+    labels = ["sample_a", "sample_b"]
+
+    def ttest():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return st.ttest(g1, g2, labels, 0, "two-sample", "two-tailed")
+
+    assump_dict, ttest_dict, *_ = ttest()
+    found = [
+        ("ingest", lambda: sup.import_csv_columns(path)),
+        (
+            "normality",
+            lambda: assump.check_normality(
+                g1, labels[0], assump.select_normality_tests(len(g1))
+            ),
+        ),
+        (
+            "variance",
+            lambda: assump.check_variance_equality(g1, g2, ["bartletts", "levenes"]),
+        ),
+        ("ttest", ttest),
+    ]
+    if cols > 1:
+        pairs = cols // 2 or 1
+        left = np.column_stack(columns[0 : 2 * pairs : 2])
+        right = np.column_stack(columns[1 : 2 * pairs : 2])
+        found.append(
+            (
+                "batch_ttest",
+                lambda: batch.batch_ttest(left, right, test_type="two-sample"),
+            )
+        )
+    found.append(
+        (
+            "export",
+            lambda: exporters.export_results(
+                assump_dict,
+                "Assumption Checks",
+                labels,
+                out_dir,
+                ["json", "csv", "md"],
+                True,
+            ),
+        )
+    )
+    if png:
+        found.append(
+            (
+                "export_png",
+                lambda: sup.export_dict_png(
+                    assump_dict, True, "Assumption Checks", labels, out_dir, 300, True
+                ),
+            )
+        )
+    return found
+
+
+def run_suite(rows_list, cols_list, seed, repeats, max_cells, data_dir, memory, png):
+    results = []
+    with tempfile.TemporaryDirectory() as out_dir:
+        for rows in rows_list:
+            for cols in cols_list:
+                if rows * cols > max_cells:
+                    continue
+                path = dataset_path(data_dir, rows, cols, seed)
+                for name, func in stages(path, rows, cols, out_dir, png):
+                    try:
+                        seconds, peak = measure(func, repeats, memory)
+                    except Exception as e:
+                        print(f"{name:12s} {rows:>9d} x {cols:<5d} failed: {e!r}")
+                        continue
+                    peak_mb = None if peak is None else peak / 1e6
+                    results.append(
+                        {
+                            "stage": name,
+                            "rows": rows,
+                            "cols": cols,
+                            "seconds": seconds,
+                            "peak_mb": peak_mb,
+                        }
+                    )
+                    mem = "" if peak_mb is None else f"  peak {peak_mb:9.1f} MB"
+                    print(f"{name:12s} {rows:>9d} x {cols:<5d} {seconds:9.4f} s{mem}")
+    return results
+
+
+def environment(seed, repeats):
+    import scipy
+
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "scipy": scipy.__version__,
+        "seed": seed,
+        "repeats": repeats,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, tolerance):
+    # returns the stages slower or heavier than baseline by more than tolerance
+    previous = {(r["stage"], r["rows"], r["cols"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = previous.get((r["stage"], r["rows"], r["cols"]))
+        if old is None:
+            continue
+        ratio = r["seconds"] / old["seconds"] if old["seconds"] else float("inf")
+        slow = ratio > 1 + tolerance and r["seconds"] > NOISE_FLOOR
+        mem_ratio = None
+        heavy = False
+        if r["peak_mb"] is not None and old.get("peak_mb"):
+            mem_ratio = r["peak_mb"] / old["peak_mb"]
+            heavy = mem_ratio > 1 + tolerance and r["peak_mb"] > 1
+        flag = "REGRESSION" if slow or heavy else "ok"
+        mem = "" if mem_ratio is None else f"  memory {mem_ratio:5.2f}x"
+        print(
+            f"{r['stage']:12s} {r['rows']:>9d} x {r['cols']:<5d} "
+            f"time {ratio:5.2f}x{mem}  {flag}"
+        )
+        if slow or heavy:
+            regressions.append(r)
+    return regressions
+
+
+def int_list(value):
+    return [int(float(v)) for v in value.split(",") if v]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="hypy stage benchmark suite")
+    parser.add_argument("--rows", type=int_list, default=DEFAULT_ROWS)
+    parser.add_argument("--cols", type=int_list, default=DEFAULT_COLS)
+    parser.add_argument("--full", action="store_true", help="rows from 10^2 up to 10^7")
+    parser.add_argument(
+        "--max-cells",
+        type=float,
+        default=2e7,
+        help="skip datasets with more rows x cols than this",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument(
+        "--data-dir",
+        default=None,
+        help="keep generated csv files here and reuse them between runs",
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip the traced peak memory run"
+    )
+    parser.add_argument(
+        "--png", action="store_true", help="also time export_dict_png (needs chromium)"
+    )
+    parser.add_argument("--save", help="write results as a json baseline")
+    parser.add_argument("--compare", help="baseline json to check for regressions")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="allowed slowdown / memory growth before a stage is flagged",
+    )
+    args = parser.parse_args()
+
+    rows_list = FULL_ROWS if args.full else args.rows
+    with contextlib.ExitStack() as stack:
+        data_dir = args.data_dir or stack.enter_context(tempfile.TemporaryDirectory())
+        os.makedirs(data_dir, exist_ok=True)
+        results = run_suite(
+            rows_list,
+            args.cols,
+            args.seed,
+            args.repeats,
+            args.max_cells,
+            data_dir,
+            not args.no_memory,
+            args.png,
+        )
+    report = {"environment": environment(args.seed, args.repeats), "results": results}
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline written to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} stage(s) regressed beyond {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+import json
+import os
+import time
+import zipfile
+
+try:
+    import fcntl
+except ImportError:  # windows
+    fcntl = None
+
+# single file output.
+# with --bundle a run is written to a local scratch directory as usual, then
+# appended to one zip archive as <run>/... members plus <run>/index.json, and
+# the scratch directory removed. existing members are never rewritten, so a
+# batch appends run after run through one open archive instead of creating a
+# directory tree per input on the (shared) save path. pngs are stored, text
+# results deflated. a writer holds an exclusive flock on the archive from open
+# to close, so concurrent runs bundling into the same archive (parallel CLI
+# calls, `hypy client` requests on one server) take turns instead of
+# overwriting each other's central directory. where fcntl is missing
+# (windows) archives are not locked.
+
+INDEX_NAME = "index.json"
+DEFAULT_ARCHIVE = "hypy_output.zip"
+BATCH_ARCHIVE = "hypy_batch.zip"
+# already compressed formats, stored as is
+STORED_EXTENSIONS = {".png", ".prof"}
+
+
+def collect(parent_dir, meta=None):
+    # (meta, [(relative path, bytes)]) of a finished hypy_output directory
+    files = []
+    for root, dirs, names in os.walk(parent_dir):
+        dirs.sort()
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            with open(path, "rb") as f:
+                files.append((os.path.relpath(path, parent_dir), f.read()))
+    return dict(meta or {}), files
+
+
+def _run_name(base, taken):
+    # base, else base_1, base_2, ... not yet used by a run in the archive
+    name = base
+    counter = 0
+    while name in taken:
+        counter += 1
+        name = f"{base}_{counter}"
+    return name
+
+
+class BundleWriter:
+    # appends runs to a zip archive, one writer per archive
+    def __init__(self, archive):
+        self.archive = archive
+        # opened read / write (not append: the central directory is rewritten
+        # in place) and created if missing, then locked before zipfile reads it
+        self.file = os.fdopen(os.open(archive, os.O_RDWR | os.O_CREAT, 0o644), "r+b")
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            self.zip = zipfile.ZipFile(self.file, "a", zipfile.ZIP_DEFLATED)
+        except BaseException:
+            self.file.close()
+            raise
+        self.runs = {n.split("/", 1)[0] for n in self.zip.namelist() if "/" in n}
+
+    def add(self, entry, base="run"):
+        # writes one collected run under a fresh top level name, returns it
+        meta, files = entry
+        name = _run_name(base, self.runs)
+        self.runs.add(name)
+        index = []
+        for rel, data in files:
+            arcname = f"{name}/{rel.replace(os.sep, '/')}"
+            ext = os.path.splitext(rel)[1].lower()
+            compress = (
+                zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+            )
+            self.zip.writestr(arcname, data, compress_type=compress)
+            index.append({"path": arcname, "bytes": len(data)})
+        meta.update({"run": name, "created": time.time(), "files": index})
+        self.zip.writestr(f"{name}/{INDEX_NAME}", json.dumps(meta, indent=2))
+        return name
+
+    def close(self):
+        # closing the file releases the lock
+        try:
+            self.zip.close()
+        finally:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+def append(archive, entry, base="run"):
+    # adds one collected run to archive (created if missing), returns its name
+    with BundleWriter(archive) as writer:
+        return writer.add(entry, base)
+
+
+def read_index(archive):
+    # index records of every run in an archive, in write order
+    with zipfile.ZipFile(archive) as zf:
+        return [
+            json.loads(zf.read(n))
+            for n in zf.namelist()
+            if n.count("/") == 1 and n.endswith("/" + INDEX_NAME)
+        ]
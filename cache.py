@@ -0,0 +1,144 @@
+import hashlib
+import json
+import os
+import pickle
+import tempfile
+import numpy as np
+import scipy
+
+# content addressed on-disk result cache.
+# keys hash the raw bytes of the sample arrays together with the test options
+# and the numpy / scipy / hypy versions (plus matplotlib for figures), so a
+# library upgrade never serves a stale result. entries are pickles under <cache_dir>/<key[:2]>/<key>.pkl;
+# a hit refreshes the entry's mtime and eviction removes the least recently
+# used entries once the cache grows past max_bytes.
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "HYPY_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "hypy")
+)
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+class ResultCache:
+    def __init__(self, cache_dir=None, max_bytes=DEFAULT_MAX_BYTES, version=None):
+        # version: hypy's version (hy.__version__), part of every key
+        self.cache_dir = cache_dir or DEFAULT_CACHE_DIR
+        self.version = version
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        # running size estimate, the directory is only walked when it overflows
+        self._bytes = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def key(self, kind, arrays=[], options={}):
+        h = hashlib.blake2b(digest_size=20)
+        meta = {
+            "kind": kind,
+            "options": options,
+            "versions": [self.version, np.__version__, scipy.__version__],
+            "arrays": [],
+        }
+        for a in arrays:
+            a = np.ascontiguousarray(a)
+            meta["arrays"].append([str(a.dtype), list(a.shape)])
+            h.update(memoryview(a).cast("B"))
+        h.update(json.dumps(meta, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pkl")
+
+    def get(self, key, default=None):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            self.misses += 1
+            return default
+        # touch for LRU ordering
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temp file and rename so readers never see partial entries
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            size = f.tell()
+        os.replace(tmp, path)
+        if self._bytes is None:
+            self._bytes = sum(s for _, s, _ in self.entries())
+        else:
+            self._bytes += size
+        if self._bytes > self.max_bytes:
+            self.evict()
+
+    def figure_key(self, kind, data, data_label, dpi):
+        # key of a rendered png, which also depends on the matplotlib version
+        import matplotlib
+
+        options = {
+            "label": data_label,
+            "dpi": dpi,
+            "matplotlib": matplotlib.__version__,
+        }
+        return self.key(f"figure:{kind}", [data], options)
+
+    def memoize(self, kind, arrays, options, compute):
+        # returns the cached value for (kind, arrays, options) or computes it
+        key = self.key(kind, arrays, options)
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def entries(self):
+        # [(mtime, size, path)] for every entry
+        found = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".pkl"):
+                    path = os.path.join(root, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    found.append((st.st_mtime, st.st_size, path))
+        return found
+
+    def evict(self, max_bytes=None):
+        # removes least recently used entries until the cache fits
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        self._bytes = total
+        return removed
+
+    def clear(self):
+        return self.evict(0)
+
+    def info(self):
+        entries = self.entries()
+        return {
+            "cache_dir": self.cache_dir,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+            "max_bytes": self.max_bytes,
+        }
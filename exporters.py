@@ -0,0 +1,160 @@
+import csv
+import io
+import json
+import math
+import os
+
+import profiling
+
+# result exporters. each one renders the assumption / t-test result dicts
+# straight to text, no pandas or browser round trip; png goes through
+# supfunc.export_dict_png and is only used when asked for.
+
+FIELDS = ["title", "section", "test", "tail", "t", "p", "conclusion", "interpretation"]
+
+
+def _scalar(value):
+    # result templates hold some values as one item lists, numpy scalars unboxed
+    if isinstance(value, list) and len(value) == 1:
+        value = value[0]
+    if hasattr(value, "item"):
+        value = value.item()
+    return value
+
+
+def flatten_results(dic, title=""):
+    # yields one flat record per test from flat or nested result dicts
+    def walk(node, path):
+        if not node:
+            return
+        if all(not isinstance(v, dict) for v in node.values()):
+            record = {"title": title, "section": "", "test": ""}
+            if len(path) >= 2:
+                record["section"], record["test"] = path[-2], path[-1]
+            elif path:
+                record["test"] = path[-1]
+            for key, value in node.items():
+                record[key] = _scalar(value)
+            yield record
+            return
+        for key, value in node.items():
+            if isinstance(value, dict):
+                yield from walk(value, path + [key])
+
+    yield from walk(dic, [])
+
+
+def record_fields(records):
+    # FIELDS first, then any extra keys (e.g. resampling details) in order seen
+    fields = list(FIELDS)
+    for r in records:
+        fields.extend(k for k in r if k not in fields)
+    return fields
+
+
+def _json_value(value):
+    # strict json: containers walked, numpy values unboxed, NaN / inf (tests
+    # that did not run) written as null instead of the non-standard NaN
+    if isinstance(value, dict):
+        return {k: _json_value(v) for k, v in value.items()}
+    if hasattr(value, "tolist"):
+        value = value.tolist()
+    if isinstance(value, (list, tuple)):
+        return [_json_value(v) for v in value]
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+def render_json(dic, title="", data_labels=[]):
+    return json.dumps(
+        _json_value({"title": title, "samples": list(data_labels), "results": dic}),
+        indent=2,
+        default=_scalar,
+        allow_nan=False,
+    )
+
+
+def render_jsonl(dic, title="", data_labels=[]):
+    lines = []
+    for record in flatten_results(dic, title):
+        record["samples"] = list(data_labels)
+        lines.append(json.dumps(_json_value(record), default=_scalar, allow_nan=False))
+    return "\n".join(lines) + "\n"
+
+
+def render_csv(dic, title="", data_labels=[]):
+    records = list(flatten_results(dic, title))
+    out = io.StringIO()
+    writer = csv.DictWriter(out, record_fields(records), lineterminator="\n")
+    writer.writeheader()
+    writer.writerows(records)
+    return out.getvalue()
+
+
+def _md_cell(value):
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value).replace("|", "\\|")
+
+
+def render_markdown(dic, title="", data_labels=[]):
+    records = list(flatten_results(dic, title))
+    cols = [
+        c
+        for c in record_fields(records)[1:]
+        if any(c in r and r[c] != "" for r in records)
+    ]
+    lines = [f"### {title}: {', '.join(data_labels)}", ""]
+    lines.append("| " + " | ".join(cols) + " |")
+    lines.append("|" + "---|" * len(cols))
+    for r in records:
+        lines.append("| " + " | ".join(_md_cell(r.get(c, "")) for c in cols) + " |")
+    return "\n".join(lines) + "\n"
+
+
+# format name -> (file extension, renderer)
+EXPORTERS = {
+    "json": (".json", render_json),
+    "jsonl": (".jsonl", render_jsonl),
+    "csv": (".csv", render_csv),
+    "md": (".md", render_markdown),
+}
+FORMATS = list(EXPORTERS) + ["png"]
+
+
+def export_results(
+    dic,
+    title="Title",
+    data_labels=[],
+    save_path="null",
+    formats=["json"],
+    nested=False,
+    dpi=150,
+    highlight_red=False,
+):
+    # writes dic once per requested format, returns the written paths.
+    # result records become plain dicts here, a single record is drawn as a
+    # one row png table
+    from results import TestResult, as_dict
+
+    single = isinstance(dic, TestResult)
+    dic = as_dict(dic)
+    paths = []
+    for fmt in formats:
+        with profiling.stage(f"export:{fmt}"):
+            if fmt == "png":
+                import supfunc as sup
+
+                table = {k: [v] for k, v in dic.items()} if single else dic
+                sup.export_dict_png(
+                    table, nested, title, data_labels, save_path, dpi, highlight_red
+                )
+                paths.append(os.path.join(save_path, f"{title}.png"))
+                continue
+            ext, render = EXPORTERS[fmt]
+            path = os.path.join(save_path, f"{title}{ext}")
+            with open(path, "w", newline="") as f:
+                f.write(render(dic, title, data_labels))
+            paths.append(path)
+    return paths
@@ -0,0 +1,72 @@
+# custom hypy modules
+import profiling
+
+# multiple comparison adjustment of a whole result table at once.
+# the p values of every row are adjusted in one argsort plus a running
+# minimum / maximum (benjamini-hochberg step-up, holm step-down) or a single
+# multiply (bonferroni), and the adjusted conclusion is one comparison with
+# ALPHA over the array. NaN p values (untestable columns) are left NaN and do
+# not count towards the number of tests.
+# numpy is imported inside the functions: the CLI reads METHODS for the
+# --adjust choices while building its parser, and --help must not load numpy.
+
+METHODS = ["bh", "holm", "bonferroni"]
+
+
+def adjust(p, method="bh"):
+    # adjusted p values, same shape and order as p
+    import numpy as np
+
+    p = np.asarray(p, dtype=np.float64)
+    adjusted = np.full(p.shape, np.nan)
+    valid = ~np.isnan(p)
+    pv = p[valid]
+    m = len(pv)
+    if m == 0:
+        return adjusted
+    if method == "bonferroni":
+        adj = pv * m
+    elif method in ("bh", "holm"):
+        order = np.argsort(pv, kind="stable")
+        s = pv[order]
+        if method == "bh":
+            # p_(i) * m / i, made monotone from the largest p down
+            adj_sorted = np.minimum.accumulate((s * m / np.arange(1, m + 1))[::-1])[
+                ::-1
+            ]
+        else:
+            # p_(i) * (m - i + 1), made monotone from the smallest p up
+            adj_sorted = np.maximum.accumulate(s * np.arange(m, 0, -1))
+        adj = np.empty(m)
+        adj[order] = adj_sorted
+    else:
+        raise ValueError(f"unknown adjustment method: {method}")
+    adjusted[valid] = np.minimum(adj, 1.0)
+    return adjusted
+
+
+def classify(p, method="bh", alpha=None):
+    # (adjusted p values, rejected) with the same p < ALPHA rule as the tests
+    import supfunc as sup
+
+    alpha = sup.ALPHA if alpha is None else alpha
+    adjusted = adjust(p, method)
+    return adjusted, adjusted < alpha
+
+
+def adjust_table(table, method="bh", alpha=None):
+    # copy of a batch / pairwise result table with a p_adjusted column after
+    # p and conclusion_adjusted at the end
+    import numpy as np
+
+    with profiling.stage(f"adjust:{method}", len(table)):
+        adjusted, rejected = classify(table["p"], method, alpha)
+        fields = [(name, table.dtype.fields[name][0]) for name in table.dtype.names]
+        fields.insert(table.dtype.names.index("p") + 1, ("p_adjusted", np.float64))
+        fields.append(("conclusion_adjusted", np.bool_))
+        out = np.empty(table.shape, dtype=fields)
+        for name in table.dtype.names:
+            out[name] = table[name]
+        out["p_adjusted"] = adjusted
+        out["conclusion_adjusted"] = rejected
+    return out
@@ -0,0 +1,311 @@
+import gc
+import os
+import queue
+import multiprocessing as mp
+import numpy as np
+from scipy import stats
+
+import profiling
+from samples import as_summary
+
+# diagnostic figure rendering on matplotlib's object oriented Agg API.
+# no pyplot state is touched: each process keeps one Figure + canvas, clears
+# it between jobs and never leaks figures. render_figures fans jobs out to a
+# small worker pool with a bounded job queue; a worker whose resident memory
+# stays above max_rss_mb after dropping its cached figure exits and is
+# replaced, so resident memory per worker is capped.
+
+FIGSIZE = (6.4, 4.8)
+FIGURE_NAMES = {"histogram": "Histogram", "qq-plot": "QQ-Plot"}
+
+# per-process reusable figure, created on first use
+_FIGURE = None
+
+
+def _get_figure():
+    global _FIGURE
+    if _FIGURE is None:
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        _FIGURE = Figure(figsize=FIGSIZE)
+        FigureCanvasAgg(_FIGURE)
+    else:
+        _FIGURE.clear()
+    return _FIGURE
+
+
+def release_figure():
+    # drops the cached figure and its pixel buffer
+    global _FIGURE
+    if _FIGURE is not None:
+        _FIGURE.clear()
+        _FIGURE = None
+    gc.collect()
+
+
+def current_rss():
+    # resident set size of this process in bytes (linux /proc, else peak rss)
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# at most this many points on a qq-plot, larger samples are drawn from evenly
+# spaced order statistics; histograms never get more than HIST_MAX_BINS bars
+QQ_POINTS = 1000
+HIST_MAX_BINS = 1000
+
+
+def _auto_bins(n, lo, hi, iqr):
+    # bin count of numpy's bins="auto" (numpy 2.x): the smaller of the sturges
+    # and freedman-diaconis widths, with freedman-diaconis floored at half the
+    # sqrt width so a tiny iqr cannot ask for millions of bins; capped at
+    # HIST_MAX_BINS
+    if hi <= lo:
+        return 1
+    sturges = (hi - lo) / (np.log2(n) + 1.0)
+    fd = max(2.0 * iqr * n ** (-1.0 / 3.0), (hi - lo) / np.sqrt(n) / 2.0)
+    width = min(fd, sturges)
+    return int(min(np.ceil((hi - lo) / width), HIST_MAX_BINS))
+
+
+def qq_ranks(n, points=QQ_POINTS):
+    # 0-based order statistics drawn on a qq-plot: all of them up to `points`,
+    # else ranks evenly spaced in theoretical quantile so the tails keep
+    # their markers
+    if n <= points:
+        return np.arange(n)
+    z = stats.norm.ppf(np.array([1, n]) / (n + 1.0))
+    p = stats.norm.cdf(np.linspace(z[0], z[1], points))
+    ranks = np.clip(np.round(p * (n + 1)) - 1, 0, n - 1).astype(np.int64)
+    return np.unique(ranks)
+
+
+def histogram_summary(data):
+    # counts and edges in one vectorized pass, plus the fitted normal; bin
+    # range, iqr and moments come from the (shared) SampleSummary
+    sample = as_summary(data)
+    n = len(sample)
+    lo, hi = sample.min, sample.max
+    q1, q3 = sample.quantiles([0.25, 0.75])
+    counts, edges = np.histogram(
+        sample.sorted, _auto_bins(n, lo, hi, q3 - q1), (lo, hi)
+    )
+    # stats.norm.fit: mean and population sd
+    mu, std = sample.mean, sample.std(ddof=0)
+    return {"n": n, "counts": counts, "edges": edges, "mu": mu, "std": std}
+
+
+def qq_summary(data, points=QQ_POINTS):
+    # normal quantiles at positions i / (n + 1) against the sample order
+    # statistics at qq_ranks, read off the summary's sorted view
+    sample = as_summary(data)
+    n = len(sample)
+    ranks = qq_ranks(n, points)
+    return {
+        "n": n,
+        "theoretical": stats.norm.ppf((ranks + 1) / (n + 1.0)),
+        "sample": sample.sorted[ranks],
+        "mu": sample.mean,
+        "std": sample.std(ddof=0),
+    }
+
+
+def sketch_histogram_summary(acc, sketch):
+    # histogram_summary from streaming statistics: a MomentAccumulator and a
+    # QuantileSketch, bucket counts re-binned onto uniform edges
+    q1, q3 = sketch.quantiles([0.25, 0.75])
+    bins = _auto_bins(acc.n, sketch.min, sketch.max, q3 - q1)
+    values, weights = sketch.buckets()
+    # bucket k spans (gamma^(k-1), gamma^k] in magnitude; its count is spread
+    # evenly over that range, through the piecewise linear cdf at the edges
+    gamma = sketch.gamma
+    inner = np.abs(values) * (gamma + 1) / (2 * gamma)
+    outer = np.abs(values) * (gamma + 1) / 2
+    lows = np.clip(np.where(values < 0, -outer, inner), sketch.min, sketch.max)
+    highs = np.clip(np.where(values < 0, -inner, outer), sketch.min, sketch.max)
+    cum = np.cumsum(weights)
+    x = np.column_stack([lows, highs]).ravel()
+    y = np.column_stack([cum - weights, cum]).ravel()
+    edges = np.linspace(sketch.min, sketch.max, bins + 1)
+    counts = np.diff(np.interp(edges, x, y))
+    std = float(np.sqrt(acc.variance(ddof=0)))
+    return {"n": acc.n, "counts": counts, "edges": edges, "mu": acc.mean, "std": std}
+
+
+def sketch_qq_summary(acc, sketch, points=QQ_POINTS):
+    # qq_summary with the order statistics read off the sketch
+    n = acc.n
+    ranks = qq_ranks(n, points)
+    return {
+        "n": n,
+        "theoretical": stats.norm.ppf((ranks + 1) / (n + 1.0)),
+        "sample": sketch.quantiles(ranks / max(n - 1, 1)),
+        "mu": acc.mean,
+        "std": float(np.sqrt(acc.variance(ddof=0))),
+    }
+
+
+def summarize(kind, data):
+    # fixed size plotting summary of a sample, what render jobs carry
+    if isinstance(data, dict):
+        return data
+    return SUMMARIES[kind](data)
+
+
+def draw_histogram(ax, data, data_label=""):
+    h = summarize("histogram", data)
+    edges = h["edges"]
+    # one bar per precomputed bin, same artists as hist(data, bins="auto")
+    ax.hist(
+        edges[:-1],
+        edges,
+        weights=h["counts"],
+        edgecolor="black",
+        density=True,
+        color="b",
+        alpha=0.8,
+    )
+    # normality curve line and mean vertical
+    mu, std = h["mu"], h["std"]
+    xmin, xmax = ax.get_xlim()
+    x = np.linspace(xmin, xmax, 100)
+    ax.plot(x, stats.norm.pdf(x, mu, std), "--", color="red", linewidth=1.5)
+    ax.axvline(mu, color="orange", linestyle="dashed", linewidth=1)
+    ax.set_xlabel("Value")
+    ax.set_ylabel("Frequency")
+    ax.set_title(
+        f"Normalized Histogram with Normal Curve: {data_label}\nμ={round(mu, 4)}, σ={round(std, 4)}"
+    )
+
+
+def draw_qqplot(ax, data, data_label=""):
+    # same construction as statsmodels qqplot(data, line="s"): normal
+    # quantiles at plotting positions i / (n + 1), standardized line
+    q = summarize("qq-plot", data)
+    theoretical, sample = q["theoretical"], q["sample"]
+    ax.plot(theoretical, sample, marker="o", linestyle="none", markerfacecolor="C0")
+    ax.plot(theoretical, theoretical * q["std"] + q["mu"], "r-")
+    ax.set_xlabel("Theoretical Quantiles")
+    ax.set_ylabel("Sample Quantiles")
+    ax.set_title(f"QQ-Plot - {data_label}")
+
+
+SUMMARIES = {"histogram": histogram_summary, "qq-plot": qq_summary}
+SKETCH_SUMMARIES = {
+    "histogram": sketch_histogram_summary,
+    "qq-plot": sketch_qq_summary,
+}
+DRAWERS = {"histogram": draw_histogram, "qq-plot": draw_qqplot}
+
+
+def figure_path(kind, data_label, figs_save_path):
+    return os.path.join(figs_save_path, f"{data_label} - {FIGURE_NAMES[kind]}.png")
+
+
+def render_figure(kind, data, data_label, figs_save_path, dpi=150):
+    # draws one figure onto the reused canvas and writes it as png
+    with profiling.stage(
+        f"figure:{kind}", data["n"] if isinstance(data, dict) else len(data)
+    ):
+        fig = _get_figure()
+        ax = fig.add_subplot()
+        DRAWERS[kind](ax, data, data_label)
+        path = figure_path(kind, data_label, figs_save_path)
+        fig.savefig(path, dpi=dpi)
+        fig.clear()
+    return path
+
+
+def _worker_loop(jobs, results, max_rss):
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        index, args = job
+        try:
+            results.put((index, render_figure(*args), None))
+        except Exception as e:
+            results.put((index, None, repr(e)))
+        if max_rss and current_rss() > max_rss:
+            release_figure()
+            if current_rss() > max_rss:
+                # hand the slot back, parent starts a fresh process
+                results.put((None, os.getpid(), "recycle"))
+                break
+
+
+def render_figures(jobs, workers=0, max_rss_mb=None, max_inflight=None):
+    # renders (kind, data, data_label, figs_save_path, dpi) jobs and returns
+    # the png paths in job order. workers=0 renders in this process
+    jobs = list(jobs)
+    paths = [None] * len(jobs)
+    max_rss = int(max_rss_mb * 1024 * 1024) if max_rss_mb else None
+    if not workers or len(jobs) < 2:
+        for i, job in enumerate(jobs):
+            paths[i] = render_figure(*job)
+            if max_rss and current_rss() > max_rss:
+                release_figure()
+        return paths
+
+    ctx = mp.get_context()
+    # bounded queue: at most max_inflight sample arrays are pickled at once
+    max_inflight = max_inflight or 2 * workers
+    job_q = ctx.Queue(max_inflight)
+    result_q = ctx.Queue()
+    procs = {}
+
+    def start_worker():
+        p = ctx.Process(target=_worker_loop, args=(job_q, result_q, max_rss))
+        p.daemon = True
+        p.start()
+        procs[p.pid] = p
+
+    for _ in range(min(workers, len(jobs))):
+        start_worker()
+    errors = []
+    pending = iter(enumerate(jobs))
+    inflight = 0
+    remaining = len(jobs)
+    try:
+        while remaining:
+            while inflight < max_inflight:
+                job = next(pending, None)
+                if job is None:
+                    break
+                job_q.put(job)
+                inflight += 1
+            try:
+                index, value, error = result_q.get(timeout=1)
+            except queue.Empty:
+                dead = [p for p in procs.values() if p.exitcode not in (None, 0)]
+                if dead:
+                    raise RuntimeError(f"figure worker exited with {dead[0].exitcode}")
+                continue
+            if error == "recycle":
+                procs.pop(value).join()
+                start_worker()
+                continue
+            inflight -= 1
+            remaining -= 1
+            if error:
+                errors.append(f"{jobs[index][2]} {jobs[index][0]}: {error}")
+            paths[index] = value
+    finally:
+        for _ in procs:
+            try:
+                job_q.put(None, timeout=1)
+            except queue.Full:
+                break
+        for p in procs.values():
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+    if errors:
+        raise RuntimeError("figure rendering failed: " + "; ".join(errors))
+    return paths
@@ -0,0 +1,189 @@
+import numpy as np
+from scipy import stats
+
+# custom hypy modules
+import profiling
+import supfunc as sup
+import streaming as stream
+from results import TestResult
+
+# long format (group label, value) analysis over k groups.
+# rows are sorted once by (group, value), after which every group is one
+# contiguous segment: per group sums come from np.add.reduceat over the
+# segment starts and medians are read off by position. normality, levene's /
+# bartlett's across all k groups, one-way anova and every pairwise t-test are
+# computed from the one GroupSummary, no group is sliced out per pair.
+
+GROUP_FIELDS = [
+    ("label", object),
+    ("n", np.int64),
+    ("mean", np.float64),
+    ("std", np.float64),
+    ("median", np.float64),
+    ("k2", np.float64),
+    ("k2_p", np.float64),
+    ("normal", np.bool_),
+]
+
+PAIR_FIELDS = [
+    ("label", object),
+    ("group_1", object),
+    ("group_2", object),
+    ("n_1", np.int64),
+    ("n_2", np.int64),
+    ("mean_1", np.float64),
+    ("mean_2", np.float64),
+    ("t", np.float64),
+    ("p", np.float64),
+    ("conclusion", np.bool_),
+]
+
+
+class GroupSummary:
+    # values sorted by (group, value) plus per group counts and central moments
+    __slots__ = ("labels", "values", "starts", "n", "mean", "m2", "m3", "m4", "median")
+
+    def __init__(self, groups, values):
+        groups = np.asarray(groups)
+        values = np.asarray(values, dtype=np.float64)
+        keep = ~np.isnan(values)
+        if groups.dtype.kind in "US":
+            keep &= groups != ""
+        if not keep.all():
+            groups, values = groups[keep], values[keep]
+        with profiling.stage("group:sort", len(values)):
+            order = np.lexsort((values, groups))
+            groups = groups[order]
+            self.values = values[order]
+            self.starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+        self.labels = [str(label) for label in groups[self.starts]]
+        with profiling.stage("group:moments", len(values)):
+            self.n = np.diff(np.r_[self.starts, len(self.values)])
+            self.mean = np.add.reduceat(self.values, self.starts) / self.n
+            d = self.values - self.expand(self.mean)
+            d2 = d * d
+            self.m2 = np.add.reduceat(d2, self.starts)
+            self.m3 = np.add.reduceat(d2 * d, self.starts)
+            self.m4 = np.add.reduceat(d2 * d2, self.starts)
+            # values are sorted within each group
+            lo = self.starts + (self.n - 1) // 2
+            hi = self.starts + self.n // 2
+            self.median = (self.values[lo] + self.values[hi]) / 2
+
+    @property
+    def k(self):
+        return len(self.labels)
+
+    def expand(self, per_group):
+        # per group array -> one entry per (sorted) row
+        return np.repeat(per_group, self.n)
+
+    def variance(self, ddof=1):
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return self.m2 / (self.n - ddof)
+
+
+def group_table(summary):
+    # one row per group: size, location, spread and k-squared normality
+    with np.errstate(invalid="ignore", divide="ignore"):
+        g1 = np.sqrt(summary.n) * summary.m3 / summary.m2**1.5
+        b2 = summary.n * summary.m4 / summary.m2**2
+        k2, k2_p = stream.ksquared_from_moments(summary.n, g1, b2)
+    table = np.empty(summary.k, dtype=GROUP_FIELDS)
+    table["label"] = summary.labels
+    table["n"] = summary.n
+    table["mean"] = summary.mean
+    table["std"] = np.sqrt(summary.variance())
+    table["median"] = summary.median
+    table["k2"] = k2
+    table["k2_p"] = k2_p
+    table["normal"] = k2_p > sup.ALPHA
+    return table
+
+
+def levene(summary):
+    # levene's test across all groups, median centred as scipy's default
+    k = summary.k
+    z = np.abs(summary.values - summary.expand(summary.median))
+    zbar = np.add.reduceat(z, summary.starts) / summary.n
+    ssw = np.add.reduceat((z - summary.expand(zbar)) ** 2, summary.starts)
+    ntot = summary.n.sum()
+    zall = (summary.n * zbar).sum() / ntot
+    w = (ntot - k) * (summary.n * (zbar - zall) ** 2).sum() / ((k - 1) * ssw.sum())
+    return w, stats.f.sf(w, k - 1, ntot - k)
+
+
+def check_variance_equality(summary, statistical_options=["levenes", "bartletts"]):
+    # k group counterpart of assumption_checks.check_variance_equality
+    variance_tests = {}
+    for j in statistical_options:
+        with profiling.stage(f"variance:{j}", len(summary.values)):
+            if j == "levenes":
+                test_stat, p_value = levene(summary)
+            elif j == "bartletts":
+                test_stat, p_value = stream.bartlett_from_moments(
+                    summary.n, summary.variance()
+                )
+            else:
+                continue
+        variance_tests[j] = TestResult(j, test_stat, p_value)
+    return variance_tests
+
+
+def anova(summary):
+    # one-way anova F test of equal group means
+    k = summary.k
+    ntot = summary.n.sum()
+    grand = (summary.n * summary.mean).sum() / ntot
+    ssb = (summary.n * (summary.mean - grand) ** 2).sum()
+    ssw = summary.m2.sum()
+    df_b, df_w = k - 1, ntot - k
+    f = (ssb / df_b) / (ssw / df_w)
+    return TestResult(
+        "anova",
+        f,
+        stats.f.sf(f, df_b, df_w),
+        extra={"df_between": int(df_b), "df_within": int(df_w)},
+    )
+
+
+def pairwise_ttests(summary, tail_type="two-tailed"):
+    # student's t-test for every pair of groups, from the group moments
+    i, j = np.triu_indices(summary.k, 1)
+    var = summary.variance()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        t, p = stream.ttest_ind_from_moments(
+            summary.n[i], summary.mean[i], var[i], summary.n[j], summary.mean[j], var[j]
+        )
+    if tail_type != "two-tailed":
+        p = p / 2
+    labels = np.array(summary.labels, dtype=object)
+    table = np.empty(len(i), dtype=PAIR_FIELDS)
+    table["label"] = [f"{a} vs {b}" for a, b in zip(labels[i], labels[j])]
+    table["group_1"] = labels[i]
+    table["group_2"] = labels[j]
+    table["n_1"] = summary.n[i]
+    table["n_2"] = summary.n[j]
+    table["mean_1"] = summary.mean[i]
+    table["mean_2"] = summary.mean[j]
+    table["t"] = t
+    table["p"] = p
+    table["conclusion"] = p < sup.ALPHA
+    return table
+
+
+def grouped_analysis(groups, values, tail_type="two-tailed", tests=True):
+    # returns (group table, {test: TestResult} variance checks, anova
+    # TestResult, pairwise table); anova / pairwise are None when tests=False
+    summary = GroupSummary(groups, values)
+    if summary.k < 2:
+        raise ValueError("grouped analysis needs at least two groups")
+    table = group_table(summary)
+    variance = check_variance_equality(summary)
+    if not tests:
+        return table, variance, None, None
+    with profiling.stage("anova", len(summary.values)):
+        f_test = anova(summary)
+    with profiling.stage("pairwise", summary.k * (summary.k - 1) // 2):
+        pairs = pairwise_ttests(summary, tail_type)
+    return table, variance, f_test, pairs
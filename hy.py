@@ -2,16 +2,16 @@
 
 # external libraries
 import argparse
+import contextlib
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from pathlib import Path
-import csv
 
-# delete - only used for test data generation
-import numpy as np
-
-# hypy modules
-import supfunc as sup  # suplimentary functions
-import assumption_checks as assump  # statistical assumptions tests
-import stats_tests as st  # statistical tests
+# hypy modules (and with them numpy / scipy) are imported inside the functions
+# that need them so that --help and argument errors return immediately
 
 __author__ = "Christopher J. Blakeney"
 __version__ = "0.1.0"
@@ -23,18 +23,255 @@ class Documentation:
     no_popmean = "you must provide a population mean if conducting a one-sample t-test"
 
 
-def main():
-    # TEST DATA
-    # Groups with Unequal Variance
-    group1 = np.random.normal(0.5, 15, 100)
-    group2 = np.random.normal(0.75, 5, 100)
+def parse_formats(value):
+    # -f value -> list of formats, unknown ones rejected before any work is done
+    import exporters
 
-    # Groups with Equal Variance
-    group3 = np.random.normal(1, 5, 100)
-    group4 = np.random.normal(0.25, 5, 100)
+    formats = value.split(",")
+    unknown = [fmt for fmt in formats if fmt not in exporters.FORMATS]
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"unknown format(s) {', '.join(unknown)}, choose from {', '.join(exporters.FORMATS)}"
+        )
+    return formats
 
-    # import docs
-    docs = Documentation()
+
+def add_test_options(parser):
+    # options shared by the single file CLI and the batch subcommand
+    import fdr
+
+    # test options
+    test = parser.add_argument_group("test specific")
+    test.add_argument(
+        "-o",
+        "--onetail",
+        action="store_true",
+        default=False,
+        help="change t-test to a one-tailed test, defaults to two-tailed if no input is presented",
+        required=False,
+    )
+    test.add_argument(
+        "-m",
+        "--mean",
+        action="store",
+        default=0,
+        type=float,
+        help="if using t-one, provide population mean of which to compare sample data",
+        required=False,
+    )
+
+    test.add_argument(
+        "--subsample",
+        action="store",
+        default=None,
+        type=int,
+        help="run normality tests on a random subsample of this size (samples larger than it only)",
+    )
+    test.add_argument(
+        "--seed",
+        action="store",
+        default=None,
+        type=int,
+        help="random seed for --subsample and resampling methods",
+    )
+
+    test.add_argument(
+        "--fallback",
+        action="store",
+        default="rank",
+        choices=["rank", "permutation", "none"],
+        help="test to run instead of the t-test when its assumptions fail: rank (mann-whitney u / wilcoxon signed-rank, the default), permutation, or none",
+    )
+    test.add_argument(
+        "--resamples",
+        action="store",
+        default=100000,
+        type=int,
+        help="maximum permutations / resamples for --fallback",
+    )
+    test.add_argument(
+        "--resample-workers",
+        action="store",
+        default=0,
+        type=int,
+        help="worker processes for --fallback and --ci (0 runs in-process)",
+    )
+    test.add_argument(
+        "--mc-tol",
+        action="store",
+        default=None,
+        type=float,
+        help="stop resampling once the monte carlo standard error of p is below this",
+    )
+    test.add_argument(
+        "--parallel",
+        action="store",
+        default=None,
+        choices=["threads", "processes"],
+        help="run the independent assumption tests concurrently, on a shared thread pool or a per-run process pool",
+    )
+    test.add_argument(
+        "--adjust",
+        action="store",
+        default=None,
+        choices=fdr.METHODS,
+        help="with --allcols / --group-by, adjust the p values of the whole result table for multiple comparisons (benjamini-hochberg, holm or bonferroni) and add p_adjusted / conclusion_adjusted columns",
+    )
+    test.add_argument(
+        "--ci",
+        action="store",
+        default=None,
+        choices=["percentile", "bca"],
+        help="add a bootstrap confidence interval for the mean / mean difference",
+    )
+    test.add_argument(
+        "--confidence",
+        action="store",
+        default=0.95,
+        type=float,
+        help="confidence level for --ci",
+    )
+    test.add_argument(
+        "--bootstrap",
+        action="store",
+        default=10000,
+        type=int,
+        help="bootstrap resamples for --ci",
+    )
+    test.add_argument(
+        "--ci-stream",
+        action="store_true",
+        default=False,
+        help="build --ci resamples in fixed size blocks so memory does not grow with the sample",
+    )
+
+    # output options
+    output = parser.add_argument_group("output")
+    output.add_argument(
+        "--stats-only",
+        "--no-figures",
+        dest="stats_only",
+        action="store_true",
+        default=False,
+        help="skip histograms, qq-plots and PNG tables so plotting libraries are never imported",
+    )
+    output.add_argument(
+        "-f",
+        "--format",
+        dest="formats",
+        action="store",
+        default=["json"],
+        type=parse_formats,
+        help="comma separated result formats: json, jsonl, csv, md, png (png is slow and must be asked for)",
+    )
+
+    output.add_argument(
+        "--figure-workers",
+        action="store",
+        default=0,
+        type=int,
+        help="render figures on this many worker processes (0 renders in-process)",
+    )
+    output.add_argument(
+        "--figure-max-rss",
+        action="store",
+        default=None,
+        type=float,
+        help="resident memory cap per figure worker in MB, workers above it are recycled",
+    )
+    output.add_argument(
+        "--bundle",
+        action="store",
+        nargs="?",
+        const=True,
+        default=None,
+        metavar="ARCHIVE",
+        help="write results, summaries and figures into one zip archive (default savepath/hypy_output.zip, for batch ./hypy_batch.zip) instead of a hypy_output directory tree",
+    )
+    output.add_argument(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="write per-stage wall time, cpu time, resident memory change and item counts (plus the process peak rss) to hypy_output/profile.json",
+    )
+    output.add_argument(
+        "--profile-cprofile",
+        action="store_true",
+        default=False,
+        help="with --profile, also dump cProfile output (.prof and .txt) for the slowest stage",
+    )
+
+    # result cache options
+    cache_opts = parser.add_argument_group("cache")
+    cache_opts.add_argument(
+        "--cache",
+        action="store_true",
+        default=False,
+        help="reuse assumption checks, t-tests and figures from earlier runs on the same data",
+    )
+    cache_opts.add_argument(
+        "--cache-dir",
+        action="store",
+        default=None,
+        help="cache location (defaults to $HYPY_CACHE_DIR or ~/.cache/hypy)",
+    )
+    cache_opts.add_argument(
+        "--cache-size",
+        action="store",
+        default=512,
+        type=float,
+        help="cache size limit in MB, least recently used entries are evicted",
+    )
+
+    # input options
+    inputs = parser.add_argument_group("input")
+    inputs.add_argument(
+        "-c",
+        "--columns",
+        action="store",
+        default=None,
+        type=lambda s: s.split(","),
+        help="comma separated sample columns to test (csv header names, npz member / struct field names, arrow / parquet columns), defaults to the first one or two",
+    )
+    inputs.add_argument(
+        "-g",
+        "--group-by",
+        action="store",
+        default=None,
+        help="long format input: column holding the group labels; the value column is the first of --columns (or the first other column). runs levenes / bartletts across all groups, plus one-way anova and pairwise t-tests for t-one / t-two",
+    )
+
+    # large input options
+    large = parser.add_argument_group("large input")
+    large.add_argument(
+        "--stream",
+        action="store_true",
+        default=False,
+        help="read the csv file in chunks and test from sample moments, memory use stays constant (k-squared / bartletts only)",
+    )
+    large.add_argument(
+        "--append",
+        action="store_true",
+        default=False,
+        help="like --stream, but start from the statistics saved by the last --stream / --append run in savepath and read only the rows added since",
+    )
+    large.add_argument(
+        "--chunksize",
+        action="store",
+        default=65536,
+        type=int,
+        help="rows per chunk when using --stream",
+    )
+
+    large.add_argument(
+        "--allcols",
+        action="store_true",
+        default=False,
+        help="test every column at once (t-one: each column, t-two: consecutive column pairs) and write batch_results.csv",
+    )
+
+
+def build_parser():
     # CLI
     parser = argparse.ArgumentParser(
         prog="hypy",
@@ -45,7 +282,7 @@ def main():
     basic = parser.add_argument_group("primary input")
     basic.add_argument(
         "csvfile",
-        help="csv file containing sample data. Please format .csv file according to README.md",
+        help="csv file containing sample data (see README.md), or a .npy / .npz / .arrow / .feather / .parquet file, read without parsing",
     )
     basic.add_argument(
         "test",
@@ -57,25 +294,7 @@ def main():
     # basic.add_argument("csv_column", help="column for sample 1 from spcified csv file")
     basic.add_argument("savepath", default="none", help="statistical output save path")
 
-    # test options
-    test = parser.add_argument_group("test specific")
-    test.add_argument(
-        "-o",
-        "--onetail",
-        action="store_true",
-        default=False,
-        help="change t-test to a one-tailed test, defaults to two-tailed if no input is presented",
-        required=False,
-    )
-    test.add_argument(
-        "-m",
-        "--mean",
-        action="store",
-        default=0,
-        type=float,
-        help="if using t-one, provide population mean of which to compare sample data",
-        required=False,
-    )
+    add_test_options(parser)
 
     # auxilary options
     parser.add_argument(
@@ -86,7 +305,36 @@ def main():
         help="print the first 10 data points from each sample to the console",
     )
 
-    args = parser.parse_args()
+    return parser
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv[1:]
+    # subcommands are dispatched before the single file parser sees argv
+    if argv and argv[0] in SUBCOMMANDS:
+        return SUBCOMMANDS[argv[0]](argv[1:])
+    args = build_parser().parse_args(argv)
+    run(args)
+
+
+def run(args):
+    # runs one input file, args as produced by build_parser. returns the
+    # hypy_output directory written (None when nothing was)
+    if getattr(args, "bundle", None):
+        return run_bundled(args)
+    import profiling  # per-stage timings for --profile
+    import supfunc as sup  # suplimentary functions
+    import batch  # column-wise batch t-tests
+    from samples import SampleSummary  # memoized sort / moments per sample
+
+    if args.profile:
+        profiling.enable(args.profile_cprofile)
+    if args.fallback == "none":
+        args.fallback = None
+    parent_dir = None
+    docs = Documentation()
+    stats_only = args.stats_only
     csvfile = args.csvfile
     test_type = args.test
     popmean = args.mean
@@ -98,37 +346,80 @@ def main():
     else:
         tail_type = "two-tailed"
 
-    # get column (sample) names from input csv file
-    with open(csvfile) as csv_file:
-        csv_reader = csv.reader(csv_file, delimiter=",")
-        col_list = []
-        for row in csv_reader:
-            col_list.append(row)
-            break
+    # get column (sample) names from the input file, or those picked with -c
+    col_list = [sup.read_header(csvfile)]
+    if args.columns:
+        missing = [c for c in args.columns if c not in col_list[0]]
+        if missing:
+            print(f"column(s) not found in {csvfile}: {', '.join(missing)}")
+            return
+        col_list = [args.columns]
 
     # deal with errors and improper usage
-    if save_path != "none":
+    if save_path != "none" and args.group_by:
+        parent_dir = run_grouped(
+            csvfile, col_list[0], test_type, tail_type, save_path, args
+        )
+    elif save_path != "none" and args.allcols:
+        test = "one-sample" if test_type in ["t-one", "assump-one"] else "two-sample"
+        try:
+            table = batch.batch_csv(csvfile, test, popmean, tail_type, args.columns)
+        except ValueError:
+            print(docs.improper_csv_format)
+            return
+        if args.adjust:
+            import fdr
+
+            table = fdr.adjust_table(table, args.adjust)
+        parent_dir = sup.make_unique_dir(os.path.join(save_path, r"hypy_output"))
+        batch.export_table_csv(table, parent_dir)
+    elif (
+        save_path != "none"
+        and (args.stream or args.append)
+        and sup.input_format(csvfile) == "csv"
+    ):
+        # binary inputs skip this: they are memory mapped, not parsed
+        parent_dir = run_streaming(
+            csvfile,
+            col_list[0],
+            test_type,
+            popmean,
+            tail_type,
+            save_path,
+            args.chunksize,
+            args,
+        )
+    elif save_path != "none":
         csv_pass = False
         if test_type in ["t-one", "assump-one"]:
             # set data label for sample one
             try:
                 s1_label = col_list[0][0]
                 # import data
-                s1 = sup.import_csv_column(csvfile, s1_label, float)
+                s1 = sup.import_columns(csvfile, [s1_label])[s1_label]
+                # one summary per sample, shared by the tests and figures
+                s1 = SampleSummary(sup.drop_nan(s1))
                 csv_pass = True
             except IndexError:
                 print(docs.improper_csv_format)
             if csv_pass:
                 # one sample ttest and assumption check
-                assump_dict, ttest_dict, nr, vr, summary_str = st.ttest(
-                    group1, None, [s1_label], 1, "one-sample", tail_type
+                assump_dict, ttest_dict, nr, vr, summary_str = run_ttest(
+                    args,
+                    s1,
+                    None,
+                    [s1_label],
+                    popmean,
+                    "one-sample",
+                    tail_type,
                 )
                 # build directory
                 parent_dir, a_dir, figs_dir, stats_dir = sup.build_hypy_directory(
-                    save_path
+                    save_path, figs=not stats_only
                 )
                 # export assumption checks
-                sup.export_dict_png(
+                export_table(
+                    args,
                     assump_dict,
                     False,
                     "Assumption Checks",
@@ -138,22 +429,22 @@ def main():
                     False,
                 )
                 # export figures
-                assump.check_normality(
-                    group1,
-                    s1_label,
-                    [],
-                    ["histogram", "qq-plot"],
-                    figs_dir,
-                    300,
-                )
+                if not stats_only:
+                    with profiling.stage("figures", 2):
+                        render_figures(args, [(s1, s1_label)], figs_dir)
                 # export assumption summary
                 sup.export_assump_summary(a_dir, summary_str)
-            if test_type == "t-one" and popmean != 0 and nr:
+            if (
+                test_type == "t-one"
+                and popmean != 0
+                and (nr or args.fallback or args.ci)
+            ):
                 # one sample t-test
                 # add ttest path
                 ttest_dir = sup.build_testdir(parent_dir, "ttest")
                 # export ttest as png
-                sup.export_dict_png(
+                export_table(
+                    args,
                     ttest_dict["one-sample"],
                     False,
                     "One Sample T Test",
@@ -169,23 +460,32 @@ def main():
             try:
                 s1_label = col_list[0][0]
                 s2_label = col_list[0][1]
-                s1 = sup.import_csv_column(csvfile, s1_label, float)
-                s2 = sup.import_csv_column(csvfile, s2_label, float)
+                # both columns read in a single pass, blank cells dropped
+                cols = sup.import_columns(csvfile, [s1_label, s2_label])
+                s1 = SampleSummary(sup.drop_nan(cols[s1_label]))
+                s2 = SampleSummary(sup.drop_nan(cols[s2_label]))
                 csv_pass = True
             except IndexError:
                 print(docs.improper_csv_format)
                 SystemExit(1)
             if csv_pass:
                 # two sample t-test and two-sample assumption check
-                assump_dict, ttest_dict, nr, vr, summary_str = st.ttest(
-                    group3, group4, [s1_label, s2_label], 0, "two-sample", tail_type
+                assump_dict, ttest_dict, nr, vr, summary_str = run_ttest(
+                    args,
+                    s1,
+                    s2,
+                    [s1_label, s2_label],
+                    0,
+                    "two-sample",
+                    tail_type,
                 )
                 # build directory
                 parent_dir, a_dir, figs_dir, stats_dir = sup.build_hypy_directory(
-                    save_path
+                    save_path, figs=not stats_only
                 )
                 # export assumption checks
-                sup.export_dict_png(
+                export_table(
+                    args,
                     assump_dict,
                     True,
                     "Assumption Checks",
@@ -195,30 +495,18 @@ def main():
                     True,
                 )
                 # export figures
-                assump.check_normality(
-                    s1,
-                    s1_label,
-                    [],
-                    ["histogram", "qq-plot"],
-                    figs_dir,
-                    300,
-                )
-                assump.check_normality(
-                    s2,
-                    s2_label,
-                    [],
-                    ["histogram", "qq-plot"],
-                    figs_dir,
-                    300,
-                )
+                if not stats_only:
+                    with profiling.stage("figures", 4):
+                        render_figures(args, [(s1, s1_label), (s2, s2_label)], figs_dir)
                 # export assumption summary
                 sup.export_assump_summary(a_dir, summary_str)
                 # if ttest
-                if test_type == "t-two" and nr and vr:
+                if test_type == "t-two" and ((nr and vr) or args.fallback or args.ci):
                     # add ttest path
                     ttest_dir = sup.build_testdir(parent_dir, "ttest")
                     # export ttest as png
-                    sup.export_dict_png(
+                    export_table(
+                        args,
                         ttest_dict["two-sample"],
                         False,
                         "Two Sample T Test",
@@ -228,6 +516,641 @@ def main():
                         False,
                     )
 
+    if args.profile:
+        if parent_dir is not None:
+            print(f"profile written to {profiling.write_report(parent_dir)}")
+        profiling.disable()
+    return parent_dir
+
+
+def run_bundled(args):
+    # --bundle: runs into a local scratch directory and appends the result to
+    # one zip archive. batch workers (args.bundle_defer) hand the collected
+    # files back instead, the batch parent is the archive's only writer
+    import shutil
+    import tempfile
+    import bundle
+
+    if args.append:
+        print(
+            "--append keeps its saved state in savepath directories, it cannot be combined with --bundle"
+        )
+        return None
+    scratch = tempfile.mkdtemp(prefix="hypy_")
+    job = argparse.Namespace(**vars(args))
+    job.bundle = None
+    job.savepath = scratch
+    try:
+        parent_dir = run(job)
+        if parent_dir is None:
+            return None
+        meta = {"input": os.path.abspath(args.csvfile), "test": args.test}
+        entry = bundle.collect(parent_dir, meta)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    if getattr(args, "bundle_defer", False):
+        return entry
+    archive = args.bundle
+    if not isinstance(archive, str):
+        archive = os.path.join(args.savepath, bundle.DEFAULT_ARCHIVE)
+    base = Path(args.csvfile).stem
+    name = bundle.append(archive, entry, base)
+    print(f"results bundled into {archive} as {name}/")
+    return archive
+
+
+def run_streaming(
+    csvfile, header, test_type, popmean, tail_type, save_path, chunksize, args
+):
+    # constant memory path: one chunked pass, tests computed from moments
+    import profiling
+    import supfunc as sup
+    import streaming as stream  # out-of-core moments and tests
+    import incremental  # saved statistics for --append
+
+    docs = Documentation()
+    n_samples = 1 if test_type in ["t-one", "assump-one"] else 2
+    if len(header) < n_samples:
+        print(docs.improper_csv_format)
+        return
+    labels = header[:n_samples]
+    state = incremental.find_state(save_path, csvfile) if args.append else None
+    accs, sketches, offset, new_rows = incremental.update(
+        csvfile, labels, state, chunksize, complete_rows=args.append
+    )
+    if args.append:
+        print(f">  Read {new_rows} new rows, {accs[labels[0]].n} rows in total")
+    with profiling.stage("tests"):
+        assump_dict, ttest_dict, nr, vr, summary_str = stream.stream_ttest(
+            accs[labels[0]],
+            accs[labels[1]] if n_samples == 2 else None,
+            labels,
+            popmean,
+            tail_type,
+        )
+    parent_dir, a_dir, figs_dir, stats_dir = sup.build_hypy_directory(
+        save_path, figs=not args.stats_only
+    )
+    incremental.save_state(parent_dir, csvfile, offset, accs, sketches)
+    if not args.stats_only:
+        import figures
+
+        # histograms and qq-plots from the moments and quantile sketches
+        with profiling.stage("figures"):
+            jobs = [
+                (
+                    kind,
+                    figures.SKETCH_SUMMARIES[kind](accs[label], sketches[label]),
+                    label,
+                    figs_dir,
+                    300,
+                )
+                for label in labels
+                for kind in ["histogram", "qq-plot"]
+            ]
+            figures.render_figures(jobs, args.figure_workers, args.figure_max_rss)
+    export_table(
+        args, assump_dict, True, "Assumption Checks", labels, stats_dir, 300, True
+    )
+    sup.export_assump_summary(a_dir, summary_str)
+    test = "one-sample" if n_samples == 1 else "two-sample"
+    if test_type in ["t-one", "t-two"] and test in ttest_dict:
+        ttest_dir = sup.build_testdir(parent_dir, "ttest")
+        title = "One Sample T Test" if n_samples == 1 else "Two Sample T Test"
+        export_table(
+            args,
+            ttest_dict[test],
+            False,
+            title,
+            labels,
+            ttest_dir,
+            300,
+            False,
+        )
+    return parent_dir
+
+
+def run_grouped(csvfile, header, test_type, tail_type, save_path, args):
+    # long format input: k groups sorted once, all tests from group summaries
+    import profiling
+    import supfunc as sup
+    import batch  # structured table csv export
+    import grouped
+
+    docs = Documentation()
+    values_col = [c for c in header if c != args.group_by]
+    if args.group_by not in sup.read_header(csvfile) or not values_col:
+        print(docs.improper_csv_format)
+        return
+    value_label = values_col[0]
+    groups, values = sup.import_long_columns(csvfile, args.group_by, value_label)
+    run_tests = test_type in ["t-one", "t-two"]
+    try:
+        with profiling.stage("tests"):
+            table, variance, f_test, pairs = grouped.grouped_analysis(
+                groups, values, tail_type, run_tests
+            )
+    except ValueError:
+        print(docs.improper_csv_format)
+        return
+    print(f">  {len(table)} groups, {table['n'].sum()} values of {value_label}")
+    parent_dir, a_dir, figs_dir, stats_dir = sup.build_hypy_directory(
+        save_path, figs=False
+    )
+    batch.export_table_csv(table, stats_dir, "group_summary.csv")
+    export_table(
+        args,
+        {"Variance Equality": variance},
+        True,
+        "Assumption Checks",
+        [value_label],
+        stats_dir,
+        300,
+        True,
+    )
+    normal = table["normal"].all()
+    equal_var = all(r.conclusion for r in variance.values())
+    summary_str = (
+        f"{len(table)} groups of {value_label} (grouped by {args.group_by}) were checked.\n"
+        f"Normality (k-squared, per group): {'ACCEPTED' if normal else 'REJECTED'}"
+        f"{'' if normal else ' for ' + ', '.join(table['label'][~table['normal']])}.\n"
+        f"Equal variance (levenes, bartletts): {'ACCEPTED' if equal_var else 'REJECTED'}."
+    )
+    sup.export_assump_summary(a_dir, summary_str)
+    if run_tests:
+        ttest_dir = sup.build_testdir(parent_dir, "ttest")
+        export_table(
+            args, f_test, False, "One-Way ANOVA", [value_label], ttest_dir, 300, False
+        )
+        if args.adjust:
+            import fdr
+
+            pairs = fdr.adjust_table(pairs, args.adjust)
+        batch.export_table_csv(pairs, ttest_dir, "pairwise_ttests.csv")
+    return parent_dir
+
+
+def make_cache(args):
+    # ResultCache when --cache is given, else None
+    if not getattr(args, "cache", False):
+        return None
+    import cache
+
+    return cache.ResultCache(
+        args.cache_dir, int(args.cache_size * 1024 * 1024), __version__
+    )
+
+
+def run_ttest(args, group_1, group_2, labels, popmean, test_type, tail_type):
+    # stats_tests.ttest, memoized as a whole and per assumption check
+    import profiling
+    import stats_tests as st  # statistical tests
+    from samples import as_array
+
+    result_cache = make_cache(args)
+
+    def compute():
+        return st.ttest(
+            group_1,
+            group_2,
+            labels,
+            popmean,
+            test_type,
+            tail_type,
+            args.subsample,
+            args.seed,
+            result_cache,
+            args.fallback,
+            args.resamples,
+            args.resample_workers,
+            args.mc_tol,
+            args.ci,
+            args.confidence,
+            args.bootstrap,
+            args.ci_stream,
+            args.parallel,
+        )
+
+    unseeded = args.seed is None and (
+        args.subsample or args.fallback == "permutation" or args.ci
+    )
+    if result_cache is None or unseeded:
+        with profiling.stage("tests"):
+            return compute()
+    arrays = [as_array(group_1)]
+    if group_2 is not None:
+        arrays.append(as_array(group_2))
+    options = {
+        "labels": labels,
+        "popmean": popmean,
+        "test_type": test_type,
+        "tail_type": tail_type,
+        "subsample": args.subsample,
+        "seed": args.seed,
+        "fallback": args.fallback,
+        "resamples": args.resamples,
+        "mc_tol": args.mc_tol,
+        "ci": args.ci,
+        "confidence": args.confidence,
+        "bootstrap": args.bootstrap,
+        "ci_stream": args.ci_stream,
+    }
+    with profiling.stage("tests"):
+        return result_cache.memoize("ttest", arrays, options, compute)
+
+
+def summarized(jobs):
+    # render jobs carrying fixed size plot summaries instead of the samples,
+    # so neither drawing nor shipping jobs to workers grows with n
+    import figures
+
+    return [(kind, figures.summarize(kind, data), *rest) for kind, data, *rest in jobs]
+
+
+def render_figures(args, samples, figs_dir):
+    # histogram and qq-plot for each (data, label), optionally on a worker pool
+    import figures
+    from samples import as_array
+
+    jobs = [
+        (kind, data, label, figs_dir, 300)
+        for data, label in samples
+        for kind in ["histogram", "qq-plot"]
+    ]
+    result_cache = make_cache(args)
+    if result_cache is None:
+        figures.render_figures(
+            summarized(jobs), args.figure_workers, args.figure_max_rss
+        )
+        return
+    # restore cached pngs, render the rest and store them
+    keys = [result_cache.figure_key(j[0], as_array(j[1]), j[2], j[4]) for j in jobs]
+    todo = []
+    for job, key in zip(jobs, keys):
+        png = result_cache.get(key)
+        if png is None:
+            todo.append((job, key))
+        else:
+            with open(figures.figure_path(job[0], job[2], figs_dir), "wb") as f:
+                f.write(png)
+    todo = list(zip(summarized([job for job, _ in todo]), [key for _, key in todo]))
+    paths = figures.render_figures(
+        [job for job, _ in todo], args.figure_workers, args.figure_max_rss
+    )
+    for (_, key), path in zip(todo, paths):
+        with open(path, "rb") as f:
+            result_cache.put(key, f.read())
+
+
+def export_table(args, dic, nested, title, labels, save_path, dpi, highlight):
+    # writes a result table in every format requested with --format
+    import exporters
+
+    formats = args.formats
+    if args.stats_only:
+        formats = [f for f in formats if f != "png"]
+    exporters.export_results(
+        dic, title, labels, save_path, formats, nested, dpi, highlight
+    )
+
+
+def collect_inputs(inputs):
+    # expands directories, glob patterns and manifest files (.txt, one path
+    # per line) into an ordered, de-duplicated list of csv files
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            found = sorted(glob.glob(os.path.join(item, "*.csv")))
+        elif item.endswith(".txt") and os.path.isfile(item):
+            base = os.path.dirname(os.path.abspath(item))
+            with open(item) as manifest:
+                lines = [line.strip() for line in manifest]
+            found = [
+                os.path.join(base, line)
+                for line in lines
+                if line and not line.startswith("#")
+            ]
+        elif glob.has_magic(item):
+            found = sorted(glob.glob(item))
+        else:
+            found = [item]
+        files.extend(os.path.abspath(f) for f in found)
+    return list(dict.fromkeys(files))
+
+
+def _init_worker(stats_only=False):
+    # runs once per worker process so imports are paid per worker, not per file
+    import supfunc  # noqa: F401
+    import stats_tests  # noqa: F401
+    import batch  # noqa: F401
+
+    if stats_only:
+        return
+    import matplotlib.figure  # noqa: F401
+    import matplotlib.backends.backend_agg  # noqa: F401
+    import figures  # noqa: F401
+    import dataframe_image  # noqa: F401
+
+
+def _run_file(args):
+    # output goes to <input dir>/<input stem>/hypy_output, with --bundle the
+    # collected files are returned for the parent to append to the archive
+    save_path = os.path.splitext(args.csvfile)[0]
+    if not args.bundle:
+        os.makedirs(save_path, exist_ok=True)
+    args.savepath = save_path
+    start = time.perf_counter()
+    entry = run(args)
+    return time.perf_counter() - start, entry if args.bundle else None
+
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(
+        prog="hypy batch",
+        description="run the same test over many csv files on a process pool.",
+    )
+    parser.add_argument(
+        "inputs",
+        nargs="+",
+        help="csv files, directories, glob patterns or .txt manifests listing csv paths",
+    )
+    parser.add_argument(
+        "test",
+        action="store",
+        choices=["assump-one", "assump-two", "t-one", "t-two"],
+        help="test to run on every input",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        action="store",
+        default=os.cpu_count(),
+        type=int,
+        help="number of worker processes (defaults to the cpu count)",
+    )
+    add_test_options(parser)
+    args = parser.parse_args(argv)
+
+    files = collect_inputs(args.inputs)
+    if not files:
+        print("no input files found")
+        return 1
+    jobs = []
+    for f in files:
+        job = argparse.Namespace(**vars(args))
+        del job.inputs, job.workers
+        job.csvfile = f
+        job.bundle_defer = True
+        jobs.append(job)
+
+    writer = None
+    if args.bundle:
+        import bundle
+
+        archive = args.bundle if isinstance(args.bundle, str) else bundle.BATCH_ARCHIVE
+        writer = bundle.BundleWriter(archive)
+    start = time.perf_counter()
+    failed = 0
+    with contextlib.ExitStack() as stack:
+        if writer is not None:
+            stack.enter_context(writer)
+        pool = stack.enter_context(
+            ProcessPoolExecutor(
+                max_workers=args.workers,
+                initializer=_init_worker,
+                initargs=(args.stats_only,),
+            )
+        )
+        futures = {pool.submit(_run_file, job): job.csvfile for job in jobs}
+        for future in as_completed(futures):
+            try:
+                elapsed, entry = future.result()
+                where = ""
+                if writer is not None and entry is not None:
+                    name = writer.add(entry, Path(futures[future]).stem)
+                    where = f" -> {writer.archive}:{name}/"
+                print(f"> {futures[future]} ({elapsed:.2f} s){where}")
+            except Exception as e:
+                failed += 1
+                print(f"> FAILED {futures[future]}: {e!r}")
+    wall = time.perf_counter() - start
+    print(f"{len(files) - failed}/{len(files)} files in {wall:.2f} s")
+    return 1 if failed else 0
+
+
+def cache_main(argv):
+    import cache
+
+    parser = argparse.ArgumentParser(
+        prog="hypy cache", description="inspect or invalidate the result cache."
+    )
+    parser.add_argument(
+        "action",
+        choices=["info", "clear", "prune"],
+        help="info: show size, clear: invalidate every entry, prune: evict down to --cache-size",
+    )
+    parser.add_argument("--cache-dir", action="store", default=None)
+    parser.add_argument("--cache-size", action="store", default=512, type=float)
+    args = parser.parse_args(argv)
+    result_cache = cache.ResultCache(
+        args.cache_dir, int(args.cache_size * 1024 * 1024), __version__
+    )
+    if args.action == "clear":
+        print(f"removed {result_cache.clear()} entries")
+    elif args.action == "prune":
+        print(f"removed {result_cache.evict()} entries")
+    info = result_cache.info()
+    print(
+        f"{info['cache_dir']}: {info['entries']} entries, "
+        f"{info['bytes'] / 1e6:.1f} MB of {info['max_bytes'] / 1e6:.1f} MB"
+    )
+    return 0
+
+
+def add_connection_options(parser):
+    import server
+
+    parser.add_argument("--host", action="store", default=server.DEFAULT_HOST)
+    parser.add_argument("--port", action="store", default=server.DEFAULT_PORT, type=int)
+    parser.add_argument(
+        "--socket",
+        action="store",
+        default=None,
+        help="unix socket path, used instead of --host / --port",
+    )
+
+
+def serve_main(argv):
+    import asyncio
+    import server
+
+    parser = argparse.ArgumentParser(
+        prog="hypy serve",
+        description="keep hypy and its libraries loaded and answer requests from `hypy client`.",
+    )
+    add_connection_options(parser)
+    parser.add_argument(
+        "-w",
+        "--workers",
+        action="store",
+        default=os.cpu_count(),
+        type=int,
+        help="warm worker processes, i.e. requests run at once (defaults to the cpu count)",
+    )
+    parser.add_argument(
+        "--max-queue",
+        action="store",
+        default=64,
+        type=int,
+        help="requests allowed to wait for a worker before the server answers busy",
+    )
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(
+            server.serve(
+                args.host, args.port, args.socket, args.workers, args.max_queue
+            )
+        )
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def client_main(argv):
+    # same arguments as a plain hy.py run, sent to a running `hypy serve`
+    import server
+
+    connection = argparse.ArgumentParser(prog="hypy client", allow_abbrev=False)
+    add_connection_options(connection)
+    connection.add_argument("--retries", action="store", default=50, type=int)
+    conn, rest = connection.parse_known_args(argv)
+    parser = build_parser()
+    parser.prog = "hypy client"
+    args = parser.parse_args(rest)
+    # the server may run elsewhere in the file system
+    args.csvfile = os.path.abspath(args.csvfile)
+    args.savepath = os.path.abspath(args.savepath)
+    if args.cache_dir:
+        args.cache_dir = os.path.abspath(args.cache_dir)
+    if isinstance(args.bundle, str):
+        args.bundle = os.path.abspath(args.bundle)
+    try:
+        reply = server.request(
+            {"args": vars(args)}, conn.host, conn.port, conn.socket, conn.retries
+        )
+    except OSError as e:
+        print(f"could not reach the hypy server: {e}")
+        return 1
+    sys.stdout.write(reply.get("stdout") or "")
+    if not reply.get("ok"):
+        print(reply.get("error") or "request failed")
+        return 1
+    return 0
+
+
+def power_main(argv):
+    import power
+    import batch  # structured table csv export
+
+    parser = argparse.ArgumentParser(
+        prog="hypy power",
+        description="power or minimum sample size of a t-test over a grid of effect sizes, alphas, tail types and group ratios. grid values are comma separated, or start:stop:step ranges.",
+    )
+    parser.add_argument("test", action="store", choices=["t-one", "t-two"])
+    parser.add_argument(
+        "-e",
+        "--effect",
+        action="store",
+        required=True,
+        type=power.parse_grid,
+        help="effect sizes (cohen's d)",
+    )
+    parser.add_argument(
+        "-a", "--alpha", action="store", default="0.05", type=power.parse_grid
+    )
+    parser.add_argument(
+        "-t",
+        "--tails",
+        action="store",
+        default=["two"],
+        type=lambda s: s.split(","),
+        help="one, two or one,two",
+    )
+    parser.add_argument(
+        "-r",
+        "--ratio",
+        action="store",
+        default="1",
+        type=power.parse_grid,
+        help="t-two only: group size ratios n_2 / n_1",
+    )
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument(
+        "-n",
+        "--n",
+        action="store",
+        type=power.parse_grid,
+        help="sample sizes (n_1 for t-two): report the power at each",
+    )
+    target.add_argument(
+        "-p",
+        "--power",
+        action="store",
+        type=power.parse_grid,
+        help="target powers: report the smallest n (n_1 for t-two) reaching each",
+    )
+    parser.add_argument(
+        "--out", action="store", default=None, help="write the whole table to this csv"
+    )
+    parser.add_argument(
+        "--rows",
+        action="store",
+        default=20,
+        type=int,
+        help="table rows to print (all of them are written with --out)",
+    )
+    args = parser.parse_args(argv)
+
+    if any(t not in ("one", "two") for t in args.tails):
+        parser.error("--tails takes one, two or one,two")
+    tails = [1 if t == "one" else 2 for t in args.tails]
+    test = "one-sample" if args.test == "t-one" else "two-sample"
+    start = time.perf_counter()
+    try:
+        if args.n is not None:
+            table = power.power_table(
+                args.effect, args.alpha, tails, args.ratio, args.n, test
+            )
+        else:
+            table = power.sample_size_table(
+                args.effect, args.alpha, tails, args.ratio, args.power, test
+            )
+    except ValueError as e:
+        print(e)
+        return 1
+    elapsed = time.perf_counter() - start
+    names = table.dtype.names
+    print("  ".join(f"{name:>10}" for name in names))
+    for row in table[: args.rows]:
+        print("  ".join(f"{value:>10.4g}" for value in row.tolist()))
+    if len(table) > args.rows:
+        print(f"... {len(table) - args.rows} more rows")
+    if args.out:
+        out_dir, out_name = os.path.split(os.path.abspath(args.out))
+        batch.export_table_csv(table, out_dir, out_name)
+        print(f"table written to {args.out}")
+    print(f"{len(table)} grid points in {elapsed:.2f} s")
+    return 0
+
+
+SUBCOMMANDS = {
+    "batch": batch_main,
+    "cache": cache_main,
+    "power": power_main,
+    "serve": serve_main,
+    "client": client_main,
+}
+
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,115 @@
+import glob
+import hashlib
+import json
+import os
+import time
+
+import profiling
+import supfunc as sup
+from streaming import MomentAccumulator, QuantileSketch
+
+# incremental re-analysis of growing csv files.
+# a streaming run saves, next to its results (hypy_output*/state.json), the
+# per-sample moments, a quantile sketch and the byte offset up to which the
+# file was read. an --append run picks the newest state for the same file,
+# reads only the bytes past that offset and merges them in, so an update
+# costs O(new rows). the file is re-read from scratch when it no longer
+# starts with the bytes the state was built from (rewritten, truncated).
+
+STATE_NAME = "state.json"
+STATE_VERSION = 1
+# bytes hashed at the start of the file and just before the saved offset
+FINGERPRINT_BYTES = 65536
+
+
+def fingerprint(csvfile, offset):
+    # hash of the head of the file and of the bytes just before offset
+    h = hashlib.blake2b(digest_size=16)
+    with open(csvfile, "rb") as f:
+        h.update(f.read(min(offset, FINGERPRINT_BYTES)))
+        tail = max(0, offset - FINGERPRINT_BYTES)
+        f.seek(tail)
+        h.update(f.read(offset - tail))
+    return h.hexdigest()
+
+
+def find_state(save_path, csvfile):
+    # newest saved state for csvfile under save_path/hypy_output*, or None
+    csvfile = os.path.abspath(csvfile)
+    found = []
+    for path in glob.glob(os.path.join(save_path, "hypy_output*", STATE_NAME)):
+        try:
+            with open(path) as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if state.get("version") == STATE_VERSION and state.get("csvfile") == csvfile:
+            found.append((state.get("updated", 0), path, state))
+    if not found:
+        return None
+    return max(found, key=lambda x: x[:2])[2]
+
+
+def state_is_current(state, csvfile, cols):
+    # true when the file still extends the bytes the state was built from
+    offset = state["offset"]
+    try:
+        size = os.path.getsize(csvfile)
+    except OSError:
+        return False
+    return (
+        size >= offset
+        and all(c in state["samples"] for c in cols)
+        and fingerprint(csvfile, offset) == state["fingerprint"]
+    )
+
+
+def update(csvfile, cols, state=None, chunk_rows=65536, complete_rows=False):
+    # returns ({label: MomentAccumulator}, {label: QuantileSketch}, offset,
+    # rows read). with a current state only rows past its offset are read.
+    # complete_rows (--append) stops at the last newline: a row a writer is
+    # still appending is read by the next update, not parsed half written
+    start, stop = sup.csv_data_range(csvfile, complete_rows)
+    if complete_rows:
+        deferred = os.path.getsize(csvfile) - stop
+        if deferred:
+            print(
+                f">  {deferred} bytes after the last complete row of {csvfile} "
+                "deferred to the next --append"
+            )
+    accs = {c: MomentAccumulator() for c in cols}
+    sketches = {c: QuantileSketch() for c in cols}
+    if state is not None and state_is_current(state, csvfile, cols):
+        for c in cols:
+            accs[c] = MomentAccumulator.from_dict(state["samples"][c]["moments"])
+            sketches[c] = QuantileSketch.from_dict(state["samples"][c]["sketch"])
+        start = state["offset"]
+    rows = 0
+    with profiling.stage("ingest") as timer:
+        chunks = sup.iter_csv_range(csvfile, start, stop, cols, chunk_rows=chunk_rows)
+        for chunk in chunks:
+            for c, values in chunk.items():
+                accs[c].update(values)
+                sketches[c].update(values)
+            rows += len(values)
+        timer.count(rows * len(cols))
+    return accs, sketches, stop, rows
+
+
+def save_state(parent_dir, csvfile, offset, accs, sketches):
+    # writes state.json into a hypy_output directory
+    state = {
+        "version": STATE_VERSION,
+        "csvfile": os.path.abspath(csvfile),
+        "offset": offset,
+        "fingerprint": fingerprint(csvfile, offset),
+        "updated": time.time(),
+        "samples": {
+            c: {"moments": accs[c].to_dict(), "sketch": sketches[c].to_dict()}
+            for c in accs
+        },
+    }
+    path = os.path.join(parent_dir, STATE_NAME)
+    with open(path, "w") as f:
+        json.dump(state, f)
+    return path
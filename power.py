@@ -0,0 +1,195 @@
+import numpy as np
+from scipy import stats
+
+# custom hypy modules
+import profiling
+
+# power and minimum sample size of the t-tests hypy runs, over whole grids.
+# every combination of effect size (cohen's d), alpha, tail type, group ratio
+# (n_2 / n_1, two-sample only) and n or target power is one row, and power is
+# evaluated for all rows at once from the noncentral t distribution:
+#   one-sample  df = n - 1,        ncp = d * sqrt(n)
+#   two-sample  df = n_1 + n_2 - 2, ncp = d * sqrt(n_1 * n_2 / (n_1 + n_2))
+# with n_2 = ceil(ratio * n_1) (student's pooled t-test, as stats_tests).
+# minimum n starts every row at the normal approximation and then moves the
+# rows that are still short (or have room below) one step at a time, each
+# step one array evaluation over the remaining rows instead of a root find
+# per grid point.
+
+# the opposite tail of a two-tailed test is below norm.sf(ncp), so it is
+# skipped past this noncentrality (< 1e-12 of power)
+LOWER_TAIL_MAX_NCP = 7.0
+# smallest n (n_1 for two-sample) with a positive df
+MIN_N = 2
+# sample size searches give up (n = -1) past this
+MAX_N = 10**9
+
+POWER_FIELDS = [
+    ("effect", np.float64),
+    ("alpha", np.float64),
+    ("tails", np.int64),
+    ("ratio", np.float64),
+    ("n_1", np.int64),
+    ("n_2", np.int64),
+    ("power", np.float64),
+]
+
+SAMPLE_SIZE_FIELDS = [
+    ("effect", np.float64),
+    ("alpha", np.float64),
+    ("tails", np.int64),
+    ("ratio", np.float64),
+    ("target", np.float64),
+    ("n_1", np.int64),
+    ("n_2", np.int64),
+    ("power", np.float64),
+]
+
+
+def parse_grid(text):
+    # "0.2,0.5,0.8" or "start:stop:step" (stop included) -> float array
+    values = []
+    for part in text.split(","):
+        if ":" in part:
+            start, stop, step = (float(x) for x in part.split(":"))
+            values.extend(np.arange(start, stop + step / 2, step))
+        else:
+            values.append(float(part))
+    return np.array(values, dtype=np.float64)
+
+
+def group_sizes(n_1, ratio, test_type="two-sample"):
+    # (n_1, n_2) arrays, n_2 is 0 for a one-sample test
+    n_1 = np.asarray(n_1, dtype=np.int64)
+    if test_type == "one-sample":
+        return n_1, np.zeros_like(n_1)
+    return n_1, np.ceil(ratio * n_1 - 1e-9).astype(np.int64)
+
+
+def ttest_power(effect, n_1, alpha=0.05, tails=2, ratio=1.0, test_type="one-sample"):
+    # power of the t-test at each (broadcast) grid point
+    effect = np.abs(np.asarray(effect, dtype=np.float64))
+    n_1, n_2 = group_sizes(n_1, ratio, test_type)
+    if test_type == "one-sample":
+        df = n_1 - 1.0
+        ncp = effect * np.sqrt(n_1)
+    else:
+        df = n_1 + n_2 - 2.0
+        ncp = effect * np.sqrt(n_1 * n_2 / (n_1 + n_2))
+    df, ncp, alpha, tails = np.broadcast_arrays(df, ncp, alpha, tails)
+    crit = stats.t.isf(alpha / tails, df)
+    power = np.array(stats.nct.sf(crit, df, ncp), dtype=np.float64)
+    lower = (tails == 2) & (ncp < LOWER_TAIL_MAX_NCP)
+    if lower.any():
+        # P(T < -crit | ncp) as P(T > crit | -ncp): nct.cdf returns nan for
+        # some tiny lower tails, the mirrored sf does not
+        power[lower] += stats.nct.sf(crit[lower], df[lower], -ncp[lower])
+    return power
+
+
+def normal_sample_size(
+    effect, alpha=0.05, tails=2, ratio=1.0, power=0.8, test_type="one-sample"
+):
+    # n (n_1) of the z-test with the same effect, alpha and power
+    z = stats.norm.isf(alpha / tails) + stats.norm.isf(1 - power)
+    n = (z / np.abs(effect)) ** 2
+    if test_type != "one-sample":
+        n = n * (1 + 1 / ratio)
+    return n
+
+
+def sample_size(
+    effect, alpha=0.05, tails=2, ratio=1.0, power=0.8, test_type="one-sample"
+):
+    # (smallest n_1 with power >= target, its power) at each grid point
+    effect, alpha, tails, ratio, power = (
+        a.ravel()
+        for a in np.broadcast_arrays(
+            np.abs(np.asarray(effect, dtype=np.float64)), alpha, tails, ratio, power
+        )
+    )
+    if (effect == 0).any():
+        raise ValueError("effect sizes must be non-zero")
+    if ((power <= 0) | (power >= 1)).any():
+        raise ValueError("target power must be between 0 and 1")
+    guess = normal_sample_size(effect, alpha, tails, ratio, power, test_type)
+    n = np.clip(np.ceil(guess), MIN_N, MAX_N).astype(np.int64)
+
+    def evaluate(rows, at):
+        return ttest_power(
+            effect[rows], at, alpha[rows], tails[rows], ratio[rows], test_type
+        )
+
+    achieved = evaluate(slice(None), n)
+    met = achieved >= power
+    # t has heavier tails than z, so most rows are short of the target by a
+    # few n; step those up until every row reaches it
+    rows = np.flatnonzero(~met)
+    while len(rows):
+        n[rows] += 1
+        achieved[rows] = evaluate(rows, n[rows])
+        rows = rows[(achieved[rows] < power[rows]) & (n[rows] < MAX_N)]
+    # rows whose approximation overshot (the second tail, tiny effects) step down
+    rows = np.flatnonzero(met & (n > MIN_N))
+    while len(rows):
+        below = evaluate(rows, n[rows] - 1)
+        keep = below >= power[rows]
+        rows = rows[keep]
+        n[rows] -= 1
+        achieved[rows] = below[keep]
+        rows = rows[n[rows] > MIN_N]
+    n[achieved < power] = -1
+    return n, achieved
+
+
+def grid(axes):
+    # every combination of the given 1-D axes, each raveled to one row per point
+    return [a.ravel() for a in np.meshgrid(*axes, indexing="ij")]
+
+
+def power_table(effects, alphas, tails, ratios, ns, test_type="one-sample"):
+    # power at every (effect, alpha, tails, ratio, n) combination
+    if test_type == "one-sample":
+        ratios = [1.0]
+    effect, alpha, tail, ratio, n = grid(
+        [
+            effects,
+            alphas,
+            np.asarray(tails, dtype=np.int64),
+            ratios,
+            np.asarray(ns, dtype=np.int64),
+        ]
+    )
+    with profiling.stage("power", len(effect)):
+        n_1, n_2 = group_sizes(n, ratio, test_type)
+        table = np.empty(len(effect), dtype=POWER_FIELDS)
+        table["effect"] = effect
+        table["alpha"] = alpha
+        table["tails"] = tail
+        table["ratio"] = ratio
+        table["n_1"] = n_1
+        table["n_2"] = n_2
+        table["power"] = ttest_power(effect, n_1, alpha, tail, ratio, test_type)
+    return table
+
+
+def sample_size_table(effects, alphas, tails, ratios, targets, test_type="one-sample"):
+    # minimum n at every (effect, alpha, tails, ratio, target power) combination
+    if test_type == "one-sample":
+        ratios = [1.0]
+    effect, alpha, tail, ratio, target = grid(
+        [effects, alphas, np.asarray(tails, dtype=np.int64), ratios, targets]
+    )
+    with profiling.stage("sample size", len(effect)):
+        n, achieved = sample_size(effect, alpha, tail, ratio, target, test_type)
+        n_1, n_2 = group_sizes(n, ratio, test_type)
+        table = np.empty(len(effect), dtype=SAMPLE_SIZE_FIELDS)
+        table["effect"] = effect
+        table["alpha"] = alpha
+        table["tails"] = tail
+        table["ratio"] = ratio
+        table["target"] = target
+        table["n_1"] = n_1
+        table["n_2"] = np.where(n_1 < 0, -1, n_2)
+        table["power"] = achieved
+    return table
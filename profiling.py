@@ -0,0 +1,194 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# lightweight stage instrumentation.
+# `with profiling.stage("name", items):` records wall time, cpu time, the
+# change in resident memory and an item count per stage name. while profiling is off, stage() hands back
+# one shared no-op context, so instrumented code pays a function call and a
+# global lookup. enable(cprofile=True) also runs every top level stage under
+# its own cProfile.Profile so the slowest one can be dumped with the report.
+
+REPORT_NAME = "profile.json"
+
+_ENABLED = False
+_CPROFILE = False
+_STAGES = {}
+_PROFILES = {}
+_DEPTH = 0
+_START = None
+_THREAD = None
+
+
+class _NoStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def count(self, items):
+        pass
+
+
+_NO_STAGE = _NoStage()
+
+
+def _current_rss():
+    # resident set size of this process right now in bytes, from
+    # /proc/self/statm (linux only, None elsewhere)
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def _peak_rss():
+    # process lifetime high-water mark of the resident set size in bytes
+    try:
+        import resource
+    except ImportError:  # windows
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macos bytes
+    return rss if sys.platform == "darwin" else rss * 1024
+
+
+class _Stage:
+    __slots__ = ("name", "items", "wall", "cpu", "rss", "profile")
+
+    def __init__(self, name, items):
+        self.name = name
+        self.items = items
+        self.profile = None
+
+    def __enter__(self):
+        global _DEPTH
+        if _CPROFILE and _DEPTH == 0:
+            if self.name not in _PROFILES:
+                import cProfile
+
+                _PROFILES[self.name] = cProfile.Profile()
+            self.profile = _PROFILES[self.name]
+            self.profile.enable()
+        _DEPTH += 1
+        self.rss = _current_rss()
+        self.cpu = time.process_time()
+        self.wall = time.perf_counter()
+        return self
+
+    def count(self, items):
+        # item count known only once the stage has run
+        self.items = items
+
+    def __exit__(self, *exc):
+        global _DEPTH
+        wall = time.perf_counter() - self.wall
+        cpu = time.process_time() - self.cpu
+        rss = _current_rss()
+        _DEPTH -= 1
+        if self.profile is not None:
+            self.profile.disable()
+        record = _STAGES.get(self.name)
+        if record is None:
+            record = _STAGES[self.name] = {
+                "stage": self.name,
+                "depth": _DEPTH,
+                "calls": 0,
+                "wall_s": 0.0,
+                "cpu_s": 0.0,
+                "items": 0,
+                "rss_delta_mb": None,
+            }
+        record["calls"] += 1
+        record["wall_s"] += wall
+        record["cpu_s"] += cpu
+        if self.items is not None:
+            record["items"] += int(self.items)
+        if rss is not None and self.rss is not None:
+            # net resident memory the stage's calls left behind (negative when
+            # they freed more than they kept); short lived peaks inside a
+            # stage are not visible here, see the report's peak_rss_mb
+            delta = (record["rss_delta_mb"] or 0.0) + (rss - self.rss) / 1024 / 1024
+            record["rss_delta_mb"] = round(delta, 2)
+        return False
+
+
+def stage(name, items=None):
+    # context manager timing one stage; items counts what the stage processed.
+    # stages entered on other threads (e.g. --parallel assumption checks) are
+    # not recorded, their time shows up in the stage that waits for them
+    if not _ENABLED or threading.get_ident() != _THREAD:
+        return _NO_STAGE
+    return _Stage(name, items)
+
+
+def enabled():
+    return _ENABLED
+
+
+def enable(cprofile=False):
+    # starts a fresh report
+    global _ENABLED, _CPROFILE, _DEPTH, _START, _THREAD
+    _STAGES.clear()
+    _PROFILES.clear()
+    _DEPTH = 0
+    _ENABLED = True
+    _CPROFILE = cprofile
+    _START = (time.perf_counter(), time.process_time())
+    _THREAD = threading.get_ident()
+
+
+def disable():
+    global _ENABLED, _CPROFILE
+    _ENABLED = False
+    _CPROFILE = False
+
+
+def report():
+    # stages in first-use order plus run totals; peak_rss_mb is the process
+    # high-water mark so far, not attributable to any one stage
+    wall = cpu = None
+    if _START is not None:
+        wall = time.perf_counter() - _START[0]
+        cpu = time.process_time() - _START[1]
+    rss = _peak_rss()
+    return {
+        "wall_s": wall,
+        "cpu_s": cpu,
+        "peak_rss_mb": None if rss is None else round(rss / 1024 / 1024, 2),
+        "stages": list(_STAGES.values()),
+    }
+
+
+def slowest_stage():
+    # name of the top level stage with the most wall time
+    top = [s for s in _STAGES.values() if s["depth"] == 0]
+    if not top:
+        return None
+    return max(top, key=lambda s: s["wall_s"])["stage"]
+
+
+def write_report(save_path, top=30):
+    # writes profile.json into save_path; with cprofile on, also the raw
+    # profile of the slowest stage (.prof) and its top functions (.txt)
+    data = report()
+    name = slowest_stage()
+    if _CPROFILE and name in _PROFILES:
+        import pstats
+
+        base = os.path.join(save_path, "profile_" + name.replace(":", "_"))
+        _PROFILES[name].dump_stats(base + ".prof")
+        with open(base + ".txt", "w") as f:
+            stats = pstats.Stats(_PROFILES[name], stream=f)
+            stats.sort_stats("cumulative").print_stats(top)
+        data["cprofile"] = {"stage": name, "path": base + ".prof"}
+    path = os.path.join(save_path, REPORT_NAME)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+    return path
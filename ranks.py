@@ -0,0 +1,124 @@
+import numpy as np
+from scipy import stats
+
+# custom hypy modules
+import profiling
+from samples import as_summary
+
+# rank based tests: mann-whitney u (two samples) and wilcoxon signed-rank
+# (one sample against a population mean / median).
+# in memory, ranks come from one argsort of the pooled values, with average
+# ranks and the tie term sum(t^3 - t) from the lengths of equal runs. past
+# RANK_MAX_N pooled values no rank array is built: u is counted from the two
+# sorted samples (searchsorted over their distinct values, in chunks), so the
+# extra memory is the sorted views that SampleSummary keeps anyway (used
+# at any size once both summaries hold them).
+# small samples get scipy's exact distribution, larger ones the normal
+# approximation with tie and continuity correction.
+
+# pooled sizes above this use the sorted-merge path
+RANK_MAX_N = 5_000_000
+# at or below these sizes scipy computes the exact p value
+EXACT_MAX_N = 8
+WILCOXON_EXACT_MAX_N = 50
+# distinct values handled per searchsorted block in the merge path
+CHUNK_VALUES = 1_000_000
+
+
+def rankdata(values):
+    # (average ranks from 1, tie term sum(t^3 - t)) in one argsort pass
+    values = np.asarray(values)
+    n = len(values)
+    order = np.argsort(values, kind="stable")
+    s = values[order]
+    starts = np.flatnonzero(np.r_[True, s[1:] != s[:-1]])
+    counts = np.diff(np.r_[starts, n]).astype(np.float64)
+    ranks = np.empty(n, dtype=np.float64)
+    ranks[order] = np.repeat(starts + (counts + 1) / 2, counts.astype(np.int64))
+    return ranks, float((counts**3 - counts).sum())
+
+
+def _runs(sorted_values):
+    # distinct values of a sorted array and their counts
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    counts = np.diff(np.r_[starts, len(sorted_values)]).astype(np.float64)
+    return sorted_values[starts], counts
+
+
+def u_from_sorted(xs, ys, chunk_values=CHUNK_VALUES):
+    # (u of xs against ys, pooled tie term) from two sorted arrays:
+    # u = sum over x of #(y < x) + #(y == x) / 2
+    xv, xc = _runs(xs)
+    yv, yc = _runs(ys)
+    u = 0.0
+    ties = float((xc**3 - xc).sum() + (yc**3 - yc).sum())
+    for start in range(0, len(xv), chunk_values):
+        v = xv[start : start + chunk_values]
+        c = xc[start : start + chunk_values]
+        below = np.searchsorted(ys, v, side="left")
+        equal = np.searchsorted(ys, v, side="right") - below
+        u += float((c * (below + equal / 2)).sum())
+        # runs shared by both samples: (cx + cy)^3 - cx^3 - cy^3
+        ties += float((3 * c * equal * (c + equal)).sum())
+    return u, ties
+
+
+def _normal_p(excess, sigma):
+    # two-sided p of |statistic - mean| = excess, with continuity correction
+    z = (excess - 0.5) / sigma if sigma > 0 else np.nan
+    return z, float(min(1.0, 2 * stats.norm.sf(z)))
+
+
+def mannwhitneyu(group_1, group_2):
+    # (u of group_1, two-sided p, details); groups are arrays or summaries
+    x, y = as_summary(group_1), as_summary(group_2)
+    n1, n2 = len(x), len(y)
+    n = n1 + n2
+    if min(n1, n2) <= EXACT_MAX_N:
+        result = stats.mannwhitneyu(x.data, y.data, alternative="two-sided")
+        return float(result.statistic), float(result.pvalue), {"approximation": "auto"}
+    with profiling.stage("rank:mann-whitney-u", n):
+        # summaries sorted by earlier tests make the merge path the cheaper one
+        if n <= RANK_MAX_N and not (x.has_sorted and y.has_sorted):
+            ranks, ties = rankdata(np.concatenate([x.data, y.data]))
+            u1 = float(ranks[:n1].sum()) - n1 * (n1 + 1) / 2
+            path = "argsort"
+        else:
+            u1, ties = u_from_sorted(x.sorted, y.sorted)
+            path = "sorted merge"
+    mu = n1 * n2 / 2
+    sigma = np.sqrt(n1 * n2 / 12 * ((n + 1) - ties / (n * (n - 1))))
+    z, p = _normal_p(abs(u1 - mu), sigma)
+    return u1, p, {"approximation": "normal", "z": float(z), "ranking": path}
+
+
+def wilcoxon(data, pop_mean=0):
+    # (w+, two-sided p, details): signed-rank test of data - pop_mean,
+    # zero differences dropped as scipy's default zero_method="wilcox"
+    d = as_summary(data).data - pop_mean
+    d = d[d != 0]
+    n = len(d)
+    if n <= WILCOXON_EXACT_MAX_N:
+        # scipy reports min(w+, w-) here, only its p value is taken
+        ranks, _ = rankdata(np.abs(d))
+        result = stats.wilcoxon(d, correction=True)
+        return (
+            float(ranks[d > 0].sum()),
+            float(result.pvalue),
+            {"approximation": "auto"},
+        )
+    with profiling.stage("rank:wilcoxon", n):
+        if n <= RANK_MAX_N:
+            ranks, ties = rankdata(np.abs(d))
+            w_plus = float(ranks[d > 0].sum())
+            path = "argsort"
+        else:
+            pos = np.sort(d[d > 0])
+            neg = np.sort(-d[d < 0])
+            u, ties = u_from_sorted(pos, neg)
+            w_plus = u + len(pos) * (len(pos) + 1) / 2
+            path = "sorted merge"
+    mu = n * (n + 1) / 4
+    sigma = np.sqrt(n * (n + 1) * (2 * n + 1) / 24 - ties / 48)
+    z, p = _normal_p(abs(w_plus - mu), sigma)
+    return w_plus, p, {"approximation": "normal", "z": float(z), "ranking": path}
@@ -0,0 +1,256 @@
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+
+# resampling based inference for when the t-test assumptions fail.
+# work is split into batches; batch i always draws from child i of one
+# SeedSequence, so results depend on the seed only, not on the worker count.
+# each batch is a single array operation: a (batch, n) matrix of sign flips or
+# shuffled samples is reduced to one statistic per row.
+
+# upper bound on elements in one batch matrix (~128 MB of float64)
+MAX_BATCH_ELEMENTS = 2**24
+
+# sample data of the current worker process, set once by _init_worker
+_DATA = {}
+
+
+def _init_worker(data):
+    _DATA.clear()
+    _DATA.update(data)
+
+
+def batch_rows(n, batch_size):
+    # rows per batch matrix so a batch stays under MAX_BATCH_ELEMENTS
+    return int(max(1, min(batch_size, MAX_BATCH_ELEMENTS // max(n, 1))))
+
+
+def _perm_batch(seed, rows):
+    # returns how many of `rows` permutations are at least as extreme as the
+    # observed statistic, per alternative: [two-sided, greater, less]
+    rng = np.random.default_rng(seed)
+    if "diff" in _DATA:
+        # one-sample sign flip on deviations from the population mean
+        d = _DATA["diff"]
+        signs = rng.integers(0, 2, size=(rows, len(d)), dtype=np.int8) * 2 - 1
+        stat = signs @ d / len(d)
+    else:
+        # a permutation only matters through which k values land in the
+        # smaller group: take the k smallest of one row of random keys
+        pooled = _DATA["pooled"]
+        n, n1 = len(pooled), _DATA["n1"]
+        k = min(n1, n - n1)
+        keys = rng.random((rows, n))
+        idx = np.argpartition(keys, k - 1, axis=1)[:, :k]
+        del keys
+        s_small = pooled[idx].sum(axis=1)
+        s1 = s_small if k == n1 else _DATA["total"] - s_small
+        stat = s1 / n1 - (_DATA["total"] - s1) / (n - n1)
+    obs = _DATA["observed"]
+    # relative tolerance so ties with the observed value count as extreme
+    eps = 1e-12 * max(abs(obs), 1.0)
+    return np.array(
+        [
+            np.count_nonzero(np.abs(stat) >= abs(obs) - eps),
+            np.count_nonzero(stat >= obs - eps),
+            np.count_nonzero(stat <= obs + eps),
+        ]
+    )
+
+
+def _run_batches(batch_func, data, rows, n_batches, seed, workers, on_result):
+    # runs batch_func(child_seed, rows) for each batch and hands the results
+    # to on_result in batch order, stopping early once it returns True
+    children = np.random.SeedSequence(seed).spawn(n_batches)
+    if not workers or workers < 2:
+        _init_worker(data)
+        for child in children:
+            if on_result(batch_func(child, rows)):
+                break
+        return
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(data,)
+    ) as pool:
+        window = 2 * workers
+        futures = [pool.submit(batch_func, c, rows) for c in children[:window]]
+        next_batch = window
+        for future in futures:
+            if on_result(future.result()):
+                for f in futures:
+                    f.cancel()
+                break
+            if next_batch < n_batches:
+                futures.append(pool.submit(batch_func, children[next_batch], rows))
+                next_batch += 1
+
+
+def permutation_test(
+    group_1,
+    group_2=None,
+    pop_mean=0,
+    n_permutations=100000,
+    tail_type="two-tailed",
+    seed=None,
+    workers=0,
+    batch_size=1000,
+    tol=None,
+):
+    # one-sample sign-flip test of mean == pop_mean, or two-sample test of
+    # equal means. one-tailed tests use the direction of the observed effect.
+    # with tol set, stops once the monte carlo standard error of p is below it
+    group_1 = np.asarray(group_1, dtype=np.float64)
+    if group_2 is None:
+        diff = group_1 - pop_mean
+        observed = diff.mean()
+        data = {"diff": diff, "observed": observed}
+        n = len(diff)
+    else:
+        group_2 = np.asarray(group_2, dtype=np.float64)
+        pooled = np.concatenate([group_1, group_2])
+        observed = group_1.mean() - group_2.mean()
+        data = {
+            "pooled": pooled,
+            "n1": len(group_1),
+            "total": pooled.sum(),
+            "observed": observed,
+        }
+        n = len(pooled)
+    rows = batch_rows(n, batch_size)
+    n_batches = -(-n_permutations // rows)
+    if tail_type == "two-tailed":
+        column = 0
+    else:
+        column = 1 if observed >= 0 else 2
+
+    def p_value(counts, done):
+        # (b + 1) / (m + 1) never reports an exact zero
+        return (counts[column] + 1) / (done + 1)
+
+    counts = np.zeros(3, dtype=np.int64)
+    done = 0
+
+    def on_result(batch_counts):
+        nonlocal counts, done
+        counts += batch_counts
+        done += rows
+        if tol is None or done < 1000:
+            return False
+        p = p_value(counts, done)
+        return np.sqrt(p * (1 - p) / done) < tol
+
+    _run_batches(_perm_batch, data, rows, n_batches, seed, workers, on_result)
+    p = p_value(counts, done)
+    return {
+        "statistic": float(observed),
+        "p": float(p),
+        "n_permutations": int(done),
+        "mc_error": float(np.sqrt(p * (1 - p) / done)),
+    }
+
+
+def _resample_means(rng, x, rows, chunk_cols):
+    # means of `rows` bootstrap resamples of x built from random index
+    # matrices; with chunk_cols only a (rows, chunk_cols) block exists at once
+    n = len(x)
+    dtype = np.int32 if n < 2**31 else np.int64
+    if not chunk_cols or chunk_cols >= n:
+        return x[rng.integers(0, n, size=(rows, n), dtype=dtype)].mean(axis=1)
+    sums = np.zeros(rows)
+    for start in range(0, n, chunk_cols):
+        cols = min(chunk_cols, n - start)
+        sums += x[rng.integers(0, n, size=(rows, cols), dtype=dtype)].sum(axis=1)
+    return sums / n
+
+
+def _boot_batch(seed, rows):
+    rng = np.random.default_rng(seed)
+    chunk_cols = _DATA["chunk_cols"]
+    stat = _resample_means(rng, _DATA["x1"], rows, chunk_cols)
+    if "x2" in _DATA:
+        stat = stat - _resample_means(rng, _DATA["x2"], rows, chunk_cols)
+    return stat
+
+
+def _jackknife_acceleration(samples, signs):
+    # BCa acceleration from the analytic leave-one-out means of each sample,
+    # signs[j] is the sign of sample j's mean in the statistic (+1, -1 for
+    # group_2 of a difference of means)
+    nums, dens = 0.0, 0.0
+    for x, sign in zip(samples, signs):
+        n = len(x)
+        theta_i = sign * (x.sum() - x) / (n - 1)
+        u = (n - 1) * (theta_i.mean() - theta_i)
+        nums += np.sum(u**3) / n**3
+        dens += np.sum(u**2) / n**2
+    return nums / (6 * dens**1.5) if dens > 0 else 0.0
+
+
+def bootstrap_ci(
+    group_1,
+    group_2=None,
+    n_resamples=10000,
+    confidence=0.95,
+    method="percentile",
+    seed=None,
+    workers=0,
+    batch_size=1000,
+    streaming=False,
+):
+    # percentile or BCa interval for the mean of group_1, or the difference
+    # of means group_1 - group_2. resamples are drawn in batches of index
+    # matrices capped at MAX_BATCH_ELEMENTS; streaming=True caps each batch at
+    # a fixed block of columns too, so memory does not grow with n
+    from scipy import stats
+
+    samples = [np.asarray(group_1, dtype=np.float64)]
+    if group_2 is not None:
+        samples.append(np.asarray(group_2, dtype=np.float64))
+    observed = samples[0].mean() - (samples[1].mean() if group_2 is not None else 0)
+    n = max(len(x) for x in samples)
+    if streaming:
+        rows = batch_rows(min(n, 2**16), batch_size)
+        chunk_cols = max(1, MAX_BATCH_ELEMENTS // rows)
+    else:
+        rows = batch_rows(n, batch_size)
+        chunk_cols = None
+    data = {"x1": samples[0], "chunk_cols": chunk_cols}
+    if group_2 is not None:
+        data["x2"] = samples[1]
+    n_batches = -(-n_resamples // rows)
+    boot = np.empty(n_batches * rows)
+    done = 0
+
+    def on_result(stat):
+        nonlocal done
+        boot[done : done + rows] = stat
+        done += rows
+        return False
+
+    _run_batches(_boot_batch, data, rows, n_batches, seed, workers, on_result)
+    boot = boot[:n_resamples]
+
+    alpha = (1 - confidence) / 2
+    if method == "bca":
+        z0 = stats.norm.ppf(
+            (
+                np.count_nonzero(boot < observed)
+                + 0.5 * np.count_nonzero(boot == observed)
+            )
+            / len(boot)
+        )
+        a = _jackknife_acceleration(samples, [1, -1][: len(samples)])
+        z = stats.norm.ppf([alpha, 1 - alpha])
+        levels = stats.norm.cdf(z0 + (z0 + z) / (1 - a * (z0 + z)))
+    elif method == "percentile":
+        levels = np.array([alpha, 1 - alpha])
+    else:
+        raise ValueError(f"unknown bootstrap interval: {method}")
+    low, high = np.quantile(boot, levels)
+    return {
+        "statistic": float(observed),
+        "ci_low": float(low),
+        "ci_high": float(high),
+        "confidence": confidence,
+        "method": method,
+        "resamples": int(len(boot)),
+        "std_error": float(boot.std(ddof=1)),
+    }
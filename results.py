@@ -0,0 +1,75 @@
+import math
+
+import supfunc as sup
+
+# compact result records.
+# one TestResult per test that was actually run: the statistic and p value as
+# plain floats, conclusion / interpretation derived from p on demand instead of
+# stored strings. the old nested dict layout is only built by to_dict / as_dict
+# at export time; item access (result["p"]) keeps dict style readers working.
+
+# dict key -> attribute
+_ALIASES = {"t": "statistic"}
+
+
+class TestResult:
+    __slots__ = ("test", "statistic", "p", "tail", "extra")
+
+    def __init__(self, test, statistic=math.nan, p=math.nan, tail=None, extra=None):
+        self.test = test
+        self.statistic = float(statistic)
+        self.p = float(p)
+        self.tail = tail
+        # optional extra fields, e.g. resampling details
+        self.extra = extra
+
+    @property
+    def ran(self):
+        return not math.isnan(self.p)
+
+    @property
+    def conclusion(self):
+        return sup.interpret_p(self.p, self.test)[0] if self.ran else False
+
+    @property
+    def interpretation(self):
+        return sup.interpret_p(self.p, self.test)[1] if self.ran else ""
+
+    def update(self, fields):
+        if self.extra is None:
+            self.extra = {}
+        self.extra.update(fields)
+
+    def __getitem__(self, key):
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        try:
+            return getattr(self, _ALIASES.get(key, key))
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def to_dict(self):
+        # the historical result dict
+        dic = {} if self.tail is None else {"tail": self.tail}
+        dic["t"] = self.statistic
+        dic["p"] = self.p
+        conclusion, interpretation = (
+            sup.interpret_p(self.p, self.test) if self.ran else (False, "")
+        )
+        dic["conclusion"] = conclusion
+        dic["interpretation"] = interpretation
+        if self.extra:
+            dic.update(self.extra)
+        return dic
+
+    def __repr__(self):
+        return f"TestResult({self.test!r}, t={self.statistic:.6g}, p={self.p:.6g})"
+
+
+def as_dict(results):
+    # converts (nested dicts of) TestResults to the plain dict layout
+    if isinstance(results, TestResult):
+        return results.to_dict()
+    if isinstance(results, dict):
+        return {k: as_dict(v) for k, v in results.items()}
+    return results
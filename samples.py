@@ -0,0 +1,127 @@
+import numpy as np
+
+import profiling
+from streaming import MomentAccumulator
+
+# per-sample summary shared by every test and plot of a run.
+# the sorted values, the central moment sums and the absolute deviations from
+# the median are computed on first use and kept, so a sample is sorted once
+# and its moments taken in one pass however many normality / variance tests,
+# t-tests and figures read them. summaries of NaN free samples only.
+
+
+class SampleSummary:
+    __slots__ = ("data", "_sorted", "_moments", "_abs_dev", "_mad")
+
+    def __init__(self, data):
+        self.data = np.asarray(data)
+        self._sorted = None
+        self._moments = None
+        self._abs_dev = None
+        self._mad = None
+
+    def __len__(self):
+        return len(self.data)
+
+    @property
+    def n(self):
+        return len(self.data)
+
+    def prepare(self):
+        # fills the sort and the moments, e.g. before tests read them from
+        # several threads at once
+        self.sorted
+        self.moments
+        return self
+
+    @property
+    def has_sorted(self):
+        return self._sorted is not None
+
+    @property
+    def sorted(self):
+        if self._sorted is None:
+            with profiling.stage("summary:sort", self.n):
+                self._sorted = np.sort(self.data)
+        return self._sorted
+
+    @property
+    def moments(self):
+        # MomentAccumulator of the sample (n, mean, m2, m3, m4)
+        if self._moments is None:
+            with profiling.stage("summary:moments", self.n):
+                x = self.data
+                mean = x.mean(dtype=np.float64)
+                d = x - mean
+                d2 = d * d
+                self._moments = MomentAccumulator(
+                    self.n,
+                    float(mean),
+                    float(d2.sum()),
+                    float((d2 * d).sum()),
+                    float((d2 * d2).sum()),
+                )
+        return self._moments
+
+    @property
+    def mean(self):
+        return self.moments.mean
+
+    def variance(self, ddof=1):
+        return self.moments.variance(ddof)
+
+    def std(self, ddof=1):
+        return float(np.sqrt(self.variance(ddof)))
+
+    @property
+    def min(self):
+        return float(self.sorted[0])
+
+    @property
+    def max(self):
+        return float(self.sorted[-1])
+
+    @property
+    def median(self):
+        s = self.sorted
+        return float((s[(self.n - 1) // 2] + s[self.n // 2]) / 2)
+
+    @property
+    def abs_dev(self):
+        # |x - median|, the centred values of levene's test
+        if self._abs_dev is None:
+            self._abs_dev = np.abs(self.data - self.median)
+        return self._abs_dev
+
+    @property
+    def mad(self):
+        # median absolute deviation (unscaled)
+        if self._mad is None:
+            self._mad = float(np.median(self.abs_dev))
+        return self._mad
+
+    def quantiles(self, q):
+        # linear interpolation quantiles, as np.quantile, read off the sort
+        s = self.sorted
+        pos = np.asarray(q, dtype=np.float64) * (self.n - 1)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, self.n - 1)
+        return s[lo] + (s[hi] - s[lo]) * (pos - lo)
+
+    def standardized_sorted(self):
+        # sorted values as z scores (sample sd), for the ecdf normality tests
+        return (self.sorted - self.mean) / self.std(ddof=1)
+
+
+def as_summary(data):
+    # the SampleSummary itself, or a new one over an array
+    if isinstance(data, SampleSummary):
+        return data
+    return SampleSummary(data)
+
+
+def as_array(data):
+    # raw values of a SampleSummary or array, e.g. for cache keys
+    if isinstance(data, SampleSummary):
+        return data.data
+    return data
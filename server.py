@@ -0,0 +1,203 @@
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+# long lived hypy server.
+# requests are single json lines, {"args": {...}} with the argparse namespace
+# of an ordinary hy.py command line, answered with one json line. runs happen
+# on a process pool whose workers import numpy / scipy / matplotlib / pandas /
+# dataframe_image once at start up, so a request costs only its compute time.
+# at most `workers` requests run at once and at most `max_queue` wait for a
+# slot; past that the server answers {"ok": false, "busy": true} right away
+# and the client backs off and retries.
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# modules imported by every worker before its first request
+WARM_MODULES = [
+    "numpy",
+    "scipy.stats",
+    "assumption_checks",
+    "stats_tests",
+    "streaming",
+    "exporters",
+    "figures",
+    "pandas",
+    "dataframe_image",
+]
+
+
+def _warm_worker():
+    import importlib
+
+    for name in WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+    try:
+        import figures
+
+        figures._get_figure()
+    except ImportError:
+        pass
+
+
+def _ping():
+    return os.getpid()
+
+
+def _run_request(options):
+    # runs one hy.py command inside a warm worker, returns (stdout, error)
+    import hy
+
+    out = io.StringIO()
+    error = None
+    with contextlib.redirect_stdout(out):
+        try:
+            hy.run(argparse.Namespace(**options))
+        except SystemExit as e:
+            if e.code not in (None, 0):
+                error = f"exited with {e.code}"
+        except Exception:
+            error = traceback.format_exc()
+    return out.getvalue(), error
+
+
+class Busy(Exception):
+    pass
+
+
+class HypyServer:
+    def __init__(self, workers=None, max_queue=64):
+        self.workers = workers or os.cpu_count()
+        self.max_queue = max_queue
+        self.pool = None
+        self.slots = None
+        self.waiting = 0
+        self.served = 0
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self.slots = asyncio.Semaphore(self.workers)
+        self.pool = ProcessPoolExecutor(self.workers, initializer=_warm_worker)
+        # one task per worker so every process is started and warmed up front
+        await asyncio.gather(
+            *[loop.run_in_executor(self.pool, _ping) for _ in range(self.workers)]
+        )
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+
+    async def submit(self, options):
+        # waits for a free worker unless max_queue requests already wait
+        if self.waiting >= self.max_queue:
+            raise Busy()
+        self.waiting += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.pool, _run_request, options)
+        finally:
+            self.slots.release()
+            self.served += 1
+
+    async def handle(self, reader, writer):
+        # one json request per line, until the client closes the connection
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                reply = await self.reply(line)
+                writer.write(json.dumps(reply).encode() + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def reply(self, line):
+        try:
+            request = json.loads(line)
+        except ValueError:
+            return {"ok": False, "error": "request is not valid json"}
+        if request.get("ping"):
+            return {
+                "ok": True,
+                "workers": self.workers,
+                "waiting": self.waiting,
+                "served": self.served,
+            }
+        if not isinstance(request.get("args"), dict):
+            return {"ok": False, "error": "request needs an 'args' object"}
+        start = time.perf_counter()
+        try:
+            stdout, error = await self.submit(request["args"])
+        except Busy:
+            return {"ok": False, "busy": True, "error": "server busy"}
+        return {
+            "ok": error is None,
+            "stdout": stdout,
+            "error": error,
+            "elapsed": time.perf_counter() - start,
+        }
+
+
+async def serve(
+    host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, workers=None, max_queue=64
+):
+    server = HypyServer(workers, max_queue)
+    await server.start()
+    try:
+        if path:
+            listener = await asyncio.start_unix_server(server.handle, path)
+            where = path
+        else:
+            listener = await asyncio.start_server(server.handle, host, port)
+            where = f"{host}:{port}"
+        print(f"hypy server on {where} with {server.workers} warm workers", flush=True)
+        # SIGINT / SIGTERM stop the server cleanly (socket file removed)
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError):
+                loop.add_signal_handler(sig, stop.set)
+        async with listener:
+            await stop.wait()
+    finally:
+        server.close()
+        if path and os.path.exists(path):
+            os.unlink(path)
+
+
+def request(options, host=DEFAULT_HOST, port=DEFAULT_PORT, path=None, retries=50):
+    # sends one request and returns the reply, backing off while busy
+    payload = json.dumps(options).encode() + b"\n"
+    delay = 0.05
+    for attempt in range(retries + 1):
+        if path:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(path)
+        else:
+            sock = socket.create_connection((host, port))
+        with sock, sock.makefile("rb") as f:
+            sock.sendall(payload)
+            reply = json.loads(f.readline() or b"{}")
+        if not reply.get("busy") or attempt == retries:
+            return reply
+        time.sleep(delay)
+        delay = min(delay * 2, 2.0)
+    return reply
@@ -1,9 +1,266 @@
-import numpy as np
-from scipy import stats
+import contextlib
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 
 # custom hypy modules
 import assumption_checks as assump
-import supfunc as sup
+import profiling
+import streaming as stream
+from results import TestResult
+from samples import as_array, as_summary
+
+# parallel="threads" / "processes" runs every assumption test of a t-test
+# (each normality test of each sample, each variance test) as its own task,
+# so the checks take about as long as the slowest test. threads share one
+# pool across runs; a process pool is started per run with the samples sent
+# to each worker once by _init_worker, after which a task only names its
+# samples and test. processes are never picked automatically: on the
+# benchmarks so far the pickling and start-up cost more than the GIL does.
+_POOL = None
+
+# samples of the current worker process, set once by _init_worker
+_SAMPLES = {}
+
+
+def _thread_pool():
+    # shared thread pool, created on first use and reused by later runs
+    global _POOL
+    if _POOL is None:
+        _POOL = ThreadPoolExecutor(thread_name_prefix="hypy-assumptions")
+    return _POOL
+
+
+def _init_worker(samples):
+    _SAMPLES.clear()
+    _SAMPLES.update({key: as_summary(data) for key, data in samples.items()})
+
+
+def _run_test(samples, kind, keys, label, test):
+    # one assumption test on the named samples, {test: TestResult}
+    if kind == "normality":
+        return assump.check_normality(samples[keys[0]], label, [test])
+    return assump.check_variance_equality(samples[keys[0]], samples[keys[1]], [test])
+
+
+def _run_worker_test(kind, keys, label, test):
+    return _run_test(_SAMPLES, kind, keys, label, test)
+
+
+def _normality_options(tests, subsample, seed):
+    return {"tests": tests, "subsample": subsample, "seed": seed}
+
+
+def _check_normality(data, label, tests, subsample, seed, cache):
+    # unseeded subsamples differ run to run, so they are never cached
+    if cache is None or (subsample and seed is None):
+        return assump.check_normality(
+            data, label, tests, subsample=subsample, seed=seed
+        )
+    return cache.memoize(
+        "normality",
+        [data.data],
+        _normality_options(tests, subsample, seed),
+        lambda: assump.check_normality(
+            data, label, tests, subsample=subsample, seed=seed
+        ),
+    )
+
+
+def _check_variance(group_1, group_2, tests, cache):
+    if cache is None:
+        return assump.check_variance_equality(group_1, group_2, tests)
+    return cache.memoize(
+        "variance",
+        [group_1.data, group_2.data],
+        {"tests": tests},
+        lambda: assump.check_variance_equality(group_1, group_2, tests),
+    )
+
+
+def check_assumptions(
+    groups,
+    labels,
+    normal_tests,
+    variance_tests,
+    subsample=None,
+    seed=None,
+    cache=None,
+    parallel=None,
+):
+    # ([{test: TestResult} per sample], {test: TestResult} or None): normality
+    # of every group, variance equality when there are two. groups are arrays
+    # or SampleSummary objects, all checks of a group share one summary
+    groups = [as_summary(g) for g in groups]
+    if not parallel:
+        normality = [
+            _check_normality(g, label, tests, subsample, seed, cache)
+            for g, label, tests in zip(groups, labels, normal_tests)
+        ]
+        variance = None
+        if len(groups) == 2:
+            variance = _check_variance(groups[0], groups[1], variance_tests, cache)
+        return normality, variance
+
+    # samples by key: ("data", i) the full group, ("normality", i) the data
+    # its normality tests read, which is a subsample when one is drawn
+    samples = {}
+    # units: (cache kind, arrays, options, cacheable, [(kind, keys, label,
+    # test)] one per test)
+    units = []
+    cacheable = cache is not None and not (subsample and seed is None)
+    for i, (g, label, tests) in enumerate(zip(groups, labels, normal_tests)):
+        samples[("data", i)] = g
+        # any subsample is drawn once per sample, as the sequential path does
+        data = g
+        if subsample and len(g) > subsample:
+            data = as_summary(assump.subsample_data(g.data, subsample, seed))
+        samples[("normality", i)] = data
+        jobs = [("normality", [("normality", i)], label, t) for t in tests]
+        options = _normality_options(tests, subsample, seed)
+        units.append(("normality", [g.data], options, cacheable, jobs))
+    if len(groups) == 2:
+        jobs = [("variance", [("data", 0), ("data", 1)], "", t) for t in variance_tests]
+        units.append(
+            (
+                "variance",
+                [g.data for g in groups],
+                {"tests": variance_tests},
+                cache is not None,
+                jobs,
+            )
+        )
+
+    with profiling.stage(f"assumptions:{parallel}", sum(len(u[4]) for u in units)):
+        results = []
+        for name, arrays, options, cacheable, jobs in units:
+            key = cache.key(name, arrays, options) if cacheable else None
+            hit = cache.get(key) if cacheable else None
+            results.append((key, hit, jobs if hit is None else []))
+        pending = [job for _, _, jobs in results for job in jobs]
+        with contextlib.ExitStack() as stack:
+            if parallel == "processes" and pending:
+                used = {k for job in pending for k in job[1]}
+                pool = stack.enter_context(
+                    ProcessPoolExecutor(
+                        max_workers=min(len(pending), os.cpu_count() or 1),
+                        initializer=_init_worker,
+                        initargs=({k: samples[k].data for k in used},),
+                    )
+                )
+                run, bound = _run_worker_test, ()
+            else:
+                pool = _thread_pool()
+                # sort and moments once per sample (concurrently) before the
+                # tests read them from several threads
+                list(pool.map(lambda s: s.prepare(), set(samples.values())))
+                run, bound = _run_test, (samples,)
+            futures = [
+                [pool.submit(run, *bound, *job) for job in jobs]
+                for _, _, jobs in results
+            ]
+            merged = []
+            for (key, hit, _), unit_futures in zip(results, futures):
+                if hit is None:
+                    hit = {}
+                    for future in unit_futures:
+                        hit.update(future.result())
+                    if key is not None:
+                        cache.put(key, hit)
+                merged.append(hit)
+    variance = merged.pop() if len(groups) == 2 else None
+    return merged, variance
+
+
+def fallback_test(
+    method,
+    group_1,
+    group_2,
+    pop_mean=0,
+    tail_type="two-tailed",
+    seed=None,
+    n_resamples=100000,
+    workers=0,
+    mc_tol=None,
+):
+    # distribution free replacement for the t-test, same record layout.
+    # "rank": mann-whitney u / wilcoxon signed-rank, "permutation": monte
+    # carlo permutation test. groups are arrays or SampleSummary objects
+    test = "one-sample" if group_2 is None else "two-sample"
+    if method == "rank":
+        import ranks
+
+        with profiling.stage("fallback:rank", len(group_1)):
+            if group_2 is None:
+                name = "wilcoxon signed-rank"
+                statistic, p, details = ranks.wilcoxon(group_1, pop_mean)
+            else:
+                name = "mann-whitney u"
+                statistic, p, details = ranks.mannwhitneyu(group_1, group_2)
+        if tail_type != "two-tailed":
+            p = p / 2
+        return TestResult(test, statistic, p, tail_type, {"method": name, **details})
+
+    import resampling
+
+    if method == "permutation":
+        with profiling.stage("fallback:permutation") as timer:
+            result = resampling.permutation_test(
+                as_array(group_1),
+                as_array(group_2),
+                pop_mean,
+                n_resamples,
+                tail_type,
+                seed,
+                workers,
+                tol=mc_tol,
+            )
+            timer.count(result["n_permutations"])
+        return TestResult(
+            test,
+            result["statistic"],
+            result["p"],
+            tail_type,
+            {
+                "method": "permutation",
+                "permutations": result["n_permutations"],
+                "mc_error": result["mc_error"],
+            },
+        )
+    raise ValueError(f"unknown fallback method: {method}")
+
+
+def confidence_interval(
+    method,
+    group_1,
+    group_2=None,
+    confidence=0.95,
+    n_resamples=10000,
+    seed=None,
+    workers=0,
+    streaming=False,
+):
+    # bootstrap interval for the mean, or the mean difference with group_2,
+    # as extra fields for a t-test entry
+    import resampling
+
+    with profiling.stage(f"bootstrap:{method}", n_resamples):
+        result = resampling.bootstrap_ci(
+            group_1,
+            group_2,
+            n_resamples,
+            confidence,
+            method,
+            seed,
+            workers,
+            streaming=streaming,
+        )
+    return {
+        "ci_method": method,
+        "confidence": confidence,
+        "ci_low": result["ci_low"],
+        "ci_high": result["ci_high"],
+        "ci_resamples": result["resamples"],
+    }
 
 
 def ttest(
@@ -13,62 +270,88 @@ def ttest(
     pop_mean=0,
     test_type="",
     tail_type="",
+    subsample=None,
+    seed=None,
+    cache=None,
+    fallback=None,
+    n_resamples=100000,
+    workers=0,
+    mc_tol=None,
+    ci=None,
+    confidence=0.95,
+    n_boot=10000,
+    ci_stream=False,
+    parallel=None,
 ):
+    # one summary per sample, shared by the assumption checks and the t-test;
+    # group_1 / group_2 stay the raw arrays for the resampling methods
+    sample_1 = as_summary(group_1)
+    group_1 = sample_1.data
+    sample_2 = None
+    if group_2 is not None:
+        sample_2 = as_summary(group_2)
+        group_2 = sample_2.data
+
     # keep track of assumption pass / fail
     normal_r = True
     variance_r = True
 
-    ttest_dict = {
-        "one-sample": {
-            "tail": ["two-tailed"],
-            "t": [0.0],
-            "p": [0.0],
-            "conclusion": [False],
-            "interpretation": [""],
-        },
-        "two-sample": {
-            "tail": ["two-tailed"],
-            "t": [0.0],
-            "p": [0.0],
-            "conclusion": [False],
-            "interpretation": [""],
-        },
-    }
+    # only the requested test gets a record; it stays empty (nan) if not run
+    tail = "two-tailed" if tail_type == "two-tailed" else "one-tailed"
+    ttest_dict = {}
+    if test_type in ["one-sample", "two-sample"]:
+        ttest_dict[test_type] = TestResult(test_type, tail=tail)
 
     # first, check all required assumptions to know if we can conduct T test
-    normal_tests = ["shapiro-wilks", "k-squared"]
+    # normality tests are picked from the sample size (see select_normality_tests)
+    n_normal = len(group_1) if subsample is None else min(len(group_1), subsample)
+    normal_tests = assump.select_normality_tests(n_normal)
     variance_tests = ["bartletts", "levenes"]
+    # keyed by the output names directly: sample labels and "Variance Equality"
     assumption_dict = {}
+    s1_key = data_labels[0].title()
+
+    # every assumption check up front, concurrently with parallel set
+    groups = [sample_1]
+    tests = [normal_tests]
+    if test_type == "two-sample":
+        n_normal_2 = len(group_2) if subsample is None else min(len(group_2), subsample)
+        groups.append(sample_2)
+        tests.append(assump.select_normality_tests(n_normal_2))
+    normality, variance_tests_dict = check_assumptions(
+        groups,
+        data_labels,
+        tests,
+        variance_tests,
+        subsample,
+        seed,
+        cache,
+        parallel,
+    )
 
     # one-sample
-    norm_tests_dict = assump.check_normality(group_1, data_labels[0], normal_tests)
+    norm_tests_dict = normality[0]
     s1_norm_test_counter = 0
     s2_norm_test_counter = 0
     variance_test_counter = 0
     fail_count = 0
-    assumption_dict["s1 normality tests"] = norm_tests_dict
+    assumption_dict[s1_key] = norm_tests_dict
     summary_str = ""
 
     failed_output = "NO T-TEST CONDUCTED: input data did not satisfy assumptions of normality/equal variance. Please consider transforming your data or using nonparametric statistical methods. Assumption test summary placed in save path."
 
     # if assumptions are met, continue with test, if not, print failure
-    for test in assumption_dict["s1 normality tests"]:
-        if assumption_dict["s1 normality tests"][test]["conclusion"]:
+    for test in assumption_dict[s1_key]:
+        if assumption_dict[s1_key][test]["conclusion"]:
             s1_norm_test_counter += 1
-    if s1_norm_test_counter == len(assumption_dict["s1 normality tests"]):
+    if s1_norm_test_counter == len(assumption_dict[s1_key]):
         # conduct one-sample t-test
         if test_type == "one-sample" and pop_mean != 0:
-            o_stat, o_p_value = stats.ttest_1samp(group_1, pop_mean)
-            ttest_dict["one-sample"]["t"] = o_stat
-            if tail_type == "two-tailed":
-                ttest_dict["one-sample"]["p"] = o_p_value
-                sup.test_p_value(o_p_value, "one-sample", ttest_dict)
-            else:
-                ttest_dict["one-sample"]["tail"] = "one-tailed"
-                ttest_dict["one-sample"]["p"] = float(o_p_value) / 2
-                sup.test_p_value(
-                    ttest_dict["one-sample"]["p"], "one-sample", ttest_dict
-                )
+            with profiling.stage("ttest:one-sample", len(group_1)):
+                o_stat, o_p_value = stream.ttest_1samp(sample_1.moments, pop_mean)
+            if tail_type != "two-tailed":
+                o_p_value = float(o_p_value) / 2
+            ttest_dict["one-sample"] = TestResult("one-sample", o_stat, o_p_value, tail)
             normal_r = True
             norm_str = (
                 "REJECTED\n Consequently, no t-test was carried out for this data."
@@ -91,59 +374,76 @@ def ttest(
         print(">  Normality assumption failed")
         fail_count += 1
         normal_r = False
+        if fallback and test_type == "one-sample":
+            ttest_dict["one-sample"] = fallback_test(
+                fallback,
+                sample_1,
+                None,
+                pop_mean,
+                tail_type,
+                seed,
+                n_resamples,
+                workers,
+                mc_tol,
+            )
         SystemExit(1)
 
     # two-sample
     if test_type == "two-sample":
         # create second dict entry for group 2 normality tests
-        assumption_dict["s2 normality tests"] = assump.check_normality(
-            group_2, data_labels[1], normal_tests
-        )
-        variance_tests_dict = assump.check_variance_equality(
-            group_1, group_2, variance_tests
-        )
-        assumption_dict["homogeneity of variance tests"] = variance_tests_dict
+        s2_key = data_labels[1].title()
+        assumption_dict[s2_key] = normality[1]
+        assumption_dict["Variance Equality"] = variance_tests_dict
 
-        for n_test in assumption_dict["s2 normality tests"]:
-            if assumption_dict["s2 normality tests"][n_test]["conclusion"]:
+        for n_test in assumption_dict[s2_key]:
+            if assumption_dict[s2_key][n_test]["conclusion"]:
                 s2_norm_test_counter += 1
-        for v_test in assumption_dict["homogeneity of variance tests"]:
-            if assumption_dict["homogeneity of variance tests"][v_test]["conclusion"]:
+        for v_test in assumption_dict["Variance Equality"]:
+            if assumption_dict["Variance Equality"][v_test]["conclusion"]:
                 variance_test_counter += 1
         if (
-            s2_norm_test_counter == len(assumption_dict["s2 normality tests"])
-            and s1_norm_test_counter == len(assumption_dict["s1 normality tests"])
-            and variance_test_counter
-            == len(assumption_dict["homogeneity of variance tests"])
+            s2_norm_test_counter == len(assumption_dict[s2_key])
+            and s1_norm_test_counter == len(assumption_dict[s1_key])
+            and variance_test_counter == len(assumption_dict["Variance Equality"])
         ):
             # conduct ttest
-            t_stat, t_p_value = stats.ttest_1samp(group_1, pop_mean)
-            ttest_dict["two-sample"]["t"] = t_stat
-            if tail_type == "two-tailed":
-                ttest_dict["two-sample"]["p"] = t_p_value
-                sup.test_p_value(t_p_value, "two-sample", ttest_dict)
-            else:
-                ttest_dict["two-sample"]["tail"] = "one-tailed"
-                ttest_dict["two-sample"]["p"] = float(t_p_value) / 2
-                sup.test_p_value(
-                    ttest_dict["two-sample"]["p"], "two-sample", ttest_dict
-                )
+            with profiling.stage("ttest:two-sample", len(group_1) + len(group_2)):
+                t_stat, t_p_value = stream.ttest_ind(sample_1.moments, sample_2.moments)
+            if tail_type != "two-tailed":
+                t_p_value = float(t_p_value) / 2
+            ttest_dict["two-sample"] = TestResult("two-sample", t_stat, t_p_value, tail)
         else:
             print(">  Equal variances assumption failed")
             fail_count += 1
             variance_r = False
+            if fallback:
+                ttest_dict["two-sample"] = fallback_test(
+                    fallback,
+                    sample_1,
+                    sample_2,
+                    pop_mean,
+                    tail_type,
+                    seed,
+                    n_resamples,
+                    workers,
+                    mc_tol,
+                )
             SystemExit(1)
-    # change dict names for output
-    sup.change_dict_key(assumption_dict, "s1 normality tests", data_labels[0].title())
-    if test_type == "two-sample":
-        sup.change_dict_key(
-            assumption_dict, "s2 normality tests", data_labels[1].title()
+    # bootstrap interval, reported whether or not the t-test itself ran
+    if ci and test_type in ttest_dict:
+        ttest_dict[test_type].update(
+            confidence_interval(
+                ci,
+                group_1,
+                group_2 if test_type == "two-sample" else None,
+                confidence,
+                n_boot,
+                seed,
+                workers,
+                ci_stream,
+            )
         )
-    sup.change_dict_key(
-        assumption_dict, "homogeneity of variance tests", "Variance Equality"
-    )
-
-    if fail_count == 2:
+    if fail_count == 2 and not fallback:
         print(failed_output)
 
     return assumption_dict, ttest_dict, normal_r, variance_r, summary_str
@@ -0,0 +1,381 @@
+import math
+import numpy as np
+from scipy import stats
+
+# custom hypy modules
+from results import TestResult
+
+# out-of-core t-tests and moment based assumption checks.
+# samples are read in fixed size chunks and reduced to mergeable sufficient
+# statistics (n, mean, M2, M3, M4), so memory use does not depend on file size.
+# chunks are combined with the pairwise update of Chan, Golub & LeVeque, which
+# keeps float64 results within ~1e-10 relative of scipy's in-memory
+# ttest_1samp / ttest_ind / normaltest / bartlett (STREAM_RTOL below).
+# shapiro-wilks and levene's test need order statistics / medians of the full
+# sample and are therefore not available in streaming mode.
+STREAM_RTOL = 1e-9
+
+
+class MomentAccumulator:
+    # running count, mean and central moment sums of a sample
+    __slots__ = ("n", "mean", "m2", "m3", "m4")
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, m3=0.0, m4=0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+        self.m3 = m3
+        self.m4 = m4
+
+    @classmethod
+    def from_array(cls, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        n = len(values)
+        if n == 0:
+            return cls()
+        mean = values.mean()
+        d = values - mean
+        d2 = d * d
+        return cls(
+            n,
+            float(mean),
+            float(d2.sum()),
+            float((d2 * d).sum()),
+            float((d2 * d2).sum()),
+        )
+
+    def update(self, values):
+        # folds a chunk of raw values (NaN ignored) into the accumulator
+        self.merge(MomentAccumulator.from_array(values))
+        return self
+
+    def merge(self, other):
+        # combines two partial results, M3 / M4 terms from Pebay (2008)
+        na, nb = self.n, other.n
+        if nb == 0:
+            return self
+        if na == 0:
+            self.n, self.mean = other.n, other.mean
+            self.m2, self.m3, self.m4 = other.m2, other.m3, other.m4
+            return self
+        n = na + nb
+        delta = other.mean - self.mean
+        delta_n = delta / n
+        m2 = self.m2 + other.m2 + delta * delta_n * na * nb
+        m3 = (
+            self.m3
+            + other.m3
+            + delta * delta_n**2 * na * nb * (na - nb)
+            + 3 * delta_n * (na * other.m2 - nb * self.m2)
+        )
+        m4 = (
+            self.m4
+            + other.m4
+            + delta * delta_n**3 * na * nb * (na * na - na * nb + nb * nb)
+            + 6 * delta_n**2 * (na * na * other.m2 + nb * nb * self.m2)
+            + 4 * delta_n * (na * other.m3 - nb * self.m3)
+        )
+        self.n = n
+        self.mean = self.mean + delta_n * nb
+        self.m2, self.m3, self.m4 = m2, m3, m4
+        return self
+
+    def variance(self, ddof=1):
+        return self.m2 / (self.n - ddof)
+
+    def skewness(self):
+        # biased sample skewness g1, as scipy.stats.skew
+        return math.sqrt(self.n) * self.m3 / self.m2**1.5
+
+    def kurtosis(self):
+        # pearson (non-excess) kurtosis b2, as scipy.stats.kurtosis(fisher=False)
+        return self.n * self.m4 / self.m2**2
+
+    def to_dict(self):
+        return {
+            "n": self.n,
+            "mean": self.mean,
+            "m2": self.m2,
+            "m3": self.m3,
+            "m4": self.m4,
+        }
+
+    @classmethod
+    def from_dict(cls, dic):
+        return cls(dic["n"], dic["mean"], dic["m2"], dic["m3"], dic["m4"])
+
+
+class QuantileSketch:
+    # mergeable quantile sketch with relative error (DDSketch, Masson et al.
+    # 2019). values land in log spaced buckets, bucket k holding
+    # (gamma^(k-1), gamma^k]; any quantile is returned within `accuracy`
+    # relative error and merging two sketches adds their bucket counts
+    __slots__ = ("accuracy", "gamma", "positive", "negative", "zeros", "min", "max")
+
+    # magnitudes below this are counted as zero
+    MIN_VALUE = 1e-12
+
+    def __init__(self, accuracy=0.01):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.min = math.inf
+        self.max = -math.inf
+
+    @property
+    def n(self):
+        return sum(self.positive.values()) + sum(self.negative.values()) + self.zeros
+
+    def _add(self, store, magnitudes):
+        keys = np.ceil(np.log(magnitudes) / math.log(self.gamma)).astype(np.int64)
+        keys, counts = np.unique(keys, return_counts=True)
+        for k, c in zip(keys.tolist(), counts.tolist()):
+            store[k] = store.get(k, 0) + c
+
+    def update(self, values):
+        # folds a chunk of raw values (NaN ignored) into the sketch
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return self
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        pos = values > self.MIN_VALUE
+        neg = values < -self.MIN_VALUE
+        self._add(self.positive, values[pos])
+        self._add(self.negative, -values[neg])
+        self.zeros += int(len(values) - pos.sum() - neg.sum())
+        return self
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("cannot merge sketches of different accuracy")
+        for store, other_store in [
+            (self.positive, other.positive),
+            (self.negative, other.negative),
+        ]:
+            for k, c in other_store.items():
+                store[k] = store.get(k, 0) + c
+        self.zeros += other.zeros
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def buckets(self):
+        # (representative values, counts) in ascending value order
+        neg = sorted(self.negative, reverse=True)
+        pos = sorted(self.positive)
+        scale = 2 / (self.gamma + 1)
+        values = np.concatenate(
+            [
+                -scale * self.gamma ** np.array(neg, dtype=np.float64),
+                np.zeros(1 if self.zeros else 0),
+                scale * self.gamma ** np.array(pos, dtype=np.float64),
+            ]
+        )
+        counts = np.array(
+            [self.negative[k] for k in neg]
+            + ([self.zeros] if self.zeros else [])
+            + [self.positive[k] for k in pos],
+            dtype=np.int64,
+        )
+        return values, counts
+
+    def quantiles(self, q):
+        # approximate quantiles for the probabilities q (scalar or array)
+        values, counts = self.buckets()
+        if len(counts) == 0:
+            return np.full(np.shape(q), np.nan)
+        rank = np.asarray(q, dtype=np.float64) * (counts.sum() - 1)
+        idx = np.searchsorted(np.cumsum(counts), rank, side="right")
+        return np.clip(values[np.minimum(idx, len(values) - 1)], self.min, self.max)
+
+    def to_dict(self):
+        # json friendly, bucket keys as strings
+        return {
+            "accuracy": self.accuracy,
+            "positive": {str(k): c for k, c in self.positive.items()},
+            "negative": {str(k): c for k, c in self.negative.items()},
+            "zeros": self.zeros,
+            "min": self.min if self.n else None,
+            "max": self.max if self.n else None,
+        }
+
+    @classmethod
+    def from_dict(cls, dic):
+        sketch = cls(dic["accuracy"])
+        sketch.positive = {int(k): c for k, c in dic["positive"].items()}
+        sketch.negative = {int(k): c for k, c in dic["negative"].items()}
+        sketch.zeros = dic["zeros"]
+        if dic["min"] is not None:
+            sketch.min, sketch.max = dic["min"], dic["max"]
+        return sketch
+
+
+def stream_array(data, chunk_rows=65536):
+    # reduces an array (or np.memmap) chunk by chunk
+    acc = MomentAccumulator()
+    for start in range(0, len(data), chunk_rows):
+        acc.update(data[start : start + chunk_rows])
+    return acc
+
+
+def skewtest_z(n, g1):
+    # D'Agostino skewness z-score, mirrors scipy.stats.skewtest.
+    # n and g1 (biased skewness) may be scalars or arrays
+    n = np.asarray(n, dtype=np.float64)
+    y = g1 * np.sqrt(((n + 1) * (n + 3)) / (6.0 * (n - 2)))
+    beta2 = (
+        3.0
+        * (n * n + 27 * n - 70)
+        * (n + 1)
+        * (n + 3)
+        / ((n - 2.0) * (n + 5) * (n + 7) * (n + 9))
+    )
+    w2 = -1 + np.sqrt(2 * (beta2 - 1))
+    delta = 1 / np.sqrt(0.5 * np.log(w2))
+    alpha = np.sqrt(2.0 / (w2 - 1))
+    y = np.where(y == 0, 1, y)
+    return delta * np.log(y / alpha + np.sqrt((y / alpha) ** 2 + 1))
+
+
+def kurtosistest_z(n, b2):
+    # Anscombe & Glynn kurtosis z-score, mirrors scipy.stats.kurtosistest.
+    # n and b2 (pearson kurtosis) may be scalars or arrays
+    n = np.asarray(n, dtype=np.float64)
+    e = 3.0 * (n - 1) / (n + 1)
+    varb2 = 24.0 * n * (n - 2) * (n - 3) / ((n + 1) * (n + 1.0) * (n + 3) * (n + 5))
+    x = (b2 - e) / np.sqrt(varb2)
+    sqrtbeta1 = (
+        6.0
+        * (n * n - 5 * n + 2)
+        / ((n + 7) * (n + 9))
+        * np.sqrt((6.0 * (n + 3) * (n + 5)) / (n * (n - 2) * (n - 3)))
+    )
+    a = 6.0 + 8.0 / sqrtbeta1 * (2.0 / sqrtbeta1 + np.sqrt(1 + 4.0 / sqrtbeta1**2))
+    term1 = 1 - 2 / (9.0 * a)
+    denom = 1 + x * np.sqrt(2 / (a - 4.0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        term2 = np.sign(denom) * np.where(
+            denom == 0, np.nan, np.power((1 - 2.0 / a) / np.abs(denom), 1 / 3.0)
+        )
+    return (term1 - term2) / np.sqrt(2 / (9.0 * a))
+
+
+def ksquared_from_moments(n, g1, b2):
+    # D'Agostino-Pearson K^2 statistic and p-value, element-wise over arrays
+    k2 = skewtest_z(n, g1) ** 2 + kurtosistest_z(n, b2) ** 2
+    return k2, stats.chi2.sf(k2, 2)
+
+
+def bartlett_from_moments(ni, vi):
+    # bartlett's statistic and p-value from counts and variances (ddof=1).
+    # groups run along axis 0, extra axes are tested independently
+    ni = np.asarray(ni, dtype=np.float64)
+    vi = np.asarray(vi, dtype=np.float64)
+    k = ni.shape[0]
+    ntot = ni.sum(axis=0)
+    spsq = np.sum((ni - 1) * vi, axis=0) / (ntot - k)
+    numer = (ntot - k) * np.log(spsq) - np.sum((ni - 1) * np.log(vi), axis=0)
+    denom = 1 + 1.0 / (3 * (k - 1)) * (
+        np.sum(1.0 / (ni - 1), axis=0) - 1.0 / (ntot - k)
+    )
+    t = numer / denom
+    return t, stats.chi2.sf(t, k - 1)
+
+
+def ttest_1samp_from_moments(n, mean, var, pop_mean):
+    # one-sample t statistic and two-sided p-value, element-wise
+    t = (mean - pop_mean) / np.sqrt(var / n)
+    return t, 2 * stats.t.sf(np.abs(t), n - 1)
+
+
+def ttest_ind_from_moments(n_1, mean_1, var_1, n_2, mean_2, var_2):
+    # student's two-sample t-test (pooled variance), as scipy.stats.ttest_ind
+    df = n_1 + n_2 - 2
+    pooled = ((n_1 - 1) * var_1 + (n_2 - 1) * var_2) / df
+    t = (mean_1 - mean_2) / np.sqrt(pooled * (1.0 / n_1 + 1.0 / n_2))
+    return t, 2 * stats.t.sf(np.abs(t), df)
+
+
+def ksquared(acc):
+    k2, p = ksquared_from_moments(acc.n, acc.skewness(), acc.kurtosis())
+    return float(k2), float(p)
+
+
+def bartlett(accs):
+    t, p = bartlett_from_moments([a.n for a in accs], [a.variance() for a in accs])
+    return float(t), float(p)
+
+
+def ttest_1samp(acc, pop_mean):
+    t, p = ttest_1samp_from_moments(acc.n, acc.mean, acc.variance(), pop_mean)
+    return float(t), float(p)
+
+
+def ttest_ind(acc_1, acc_2):
+    t, p = ttest_ind_from_moments(
+        acc_1.n, acc_1.mean, acc_1.variance(), acc_2.n, acc_2.mean, acc_2.variance()
+    )
+    return float(t), float(p)
+
+
+def stream_normality(acc):
+    # moment based normality check, same layout as check_normality
+    return {"k-squared": TestResult("k-squared", *ksquared(acc))}
+
+
+def stream_variance_equality(accs):
+    # moment based variance check, same layout as check_variance_equality
+    return {"bartletts": TestResult("bartletts", *bartlett(accs))}
+
+
+def stream_ttest(acc_1, acc_2=None, data_labels=[], pop_mean=0, tail_type="two-tailed"):
+    # streaming counterpart of stats_tests.ttest, returns the same tuple
+    normal_r = True
+    variance_r = True
+    summary_str = ""
+    ttest_dict = {}
+    assumption_dict = {data_labels[0].title(): stream_normality(acc_1)}
+    normal_r = assumption_dict[data_labels[0].title()]["k-squared"]["conclusion"]
+    if acc_2 is None:
+        test = "one-sample"
+        if pop_mean == 0:
+            print("Please provide a population mean of which to compare your sample")
+            return assumption_dict, ttest_dict, normal_r, variance_r, summary_str
+        run = normal_r
+    else:
+        test = "two-sample"
+        assumption_dict[data_labels[1].title()] = stream_normality(acc_2)
+        assumption_dict["Variance Equality"] = stream_variance_equality([acc_1, acc_2])
+        normal_r = (
+            normal_r
+            and assumption_dict[data_labels[1].title()]["k-squared"]["conclusion"]
+        )
+        variance_r = assumption_dict["Variance Equality"]["bartletts"]["conclusion"]
+        run = normal_r and variance_r
+    if not normal_r:
+        print(">  Normality assumption failed")
+    if not variance_r:
+        print(">  Equal variances assumption failed")
+    if run:
+        if test == "one-sample":
+            t, p = ttest_1samp(acc_1, pop_mean)
+        else:
+            t, p = ttest_ind(acc_1, acc_2)
+        if tail_type != "two-tailed":
+            p = p / 2
+        ttest_dict[test] = TestResult(test, t, p, tail_type)
+    summary_str = (
+        f"A streaming {test} t-test was attempted on {', '.join(data_labels)}.\n"
+        f"Assumptions were checked from sample moments (k-squared"
+        f"{', bartletts' if acc_2 is not None else ''}); shapiro-wilks and levenes\n"
+        f"require the full sample and were not run.\n"
+        f"Normality: {'ACCEPTED' if normal_r else 'REJECTED'}"
+        f"{'' if acc_2 is None else ', equal variance: ' + ('ACCEPTED' if variance_r else 'REJECTED')}.\n"
+        f"{'A t-test was carried out.' if run else 'Consequently, no t-test was carried out for this data.'}"
+    )
+    return assumption_dict, ttest_dict, normal_r, variance_r, summary_str
@@ -1,10 +1,9 @@
 import os
-import dataframe_image as dfi
-import pandas as pd
 import csv
-import codecs
 import numpy as np
 
+import profiling
+
 # set alpha threshold
 global ALPHA
 ALPHA = 0.05
@@ -14,14 +13,363 @@ def change_dict_key(dic, old_key, new_key, default=None):
     dic[new_key] = dic.pop(old_key, default)
 
 
-def import_csv_column(csvfile, col, dtype):
-    data = codecs.open(csvfile, "r", encoding="utf-8", errors="ignore")
-    file = csv.DictReader(data)
-    lst = []
-    for i in file:
-        lst.append(dtype(i[col]))
-    array = np.array(lst)
-    return array
+def read_csv_header(csvfile):
+    # returns the column labels from the first row of a csv file
+    with open(csvfile, "r", newline="", encoding="utf-8-sig", errors="ignore") as f:
+        return next(csv.reader(f), [])
+
+
+def parse_float_cells(cells, dtype=np.float64):
+    # converts a list of csv cells to an array, unparseable cells become NaN
+    try:
+        return np.array(cells, dtype=dtype)
+    except ValueError:
+        pass
+    # blank (missing) cells, the usual reason the fast path fails: written as
+    # "nan" and the chunk converted in one call again
+    try:
+        return np.array([cell.strip() or "nan" for cell in cells], dtype=dtype)
+    except ValueError:
+        pass
+    # junk cells: numpy cannot tell which cell failed, so only these chunks
+    # fall back to a per-cell python float() loop
+    out = np.empty(len(cells), dtype=dtype)
+    for i, cell in enumerate(cells):
+        try:
+            out[i] = float(cell)
+        except ValueError:
+            out[i] = np.nan
+    return out
+
+
+def iter_csv_chunks(csvfile, cols=None, dtype=np.float64, chunk_rows=16384):
+    # yields {label: array} for successive blocks of rows, parsing the file once
+    with open(csvfile, "r", newline="", encoding="utf-8-sig", errors="ignore") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        yield from _iter_rows(reader, header, cols, dtype, chunk_rows, csvfile)
+
+
+def csv_data_range(csvfile, complete_rows=False, block=65536):
+    # (first data byte, end of data): the byte range holding rows right now.
+    # with complete_rows the range ends after the last newline instead of at
+    # the end of the file, so a row still being appended is left for the
+    # next read, which resumes from the returned stop
+    with open(csvfile, "rb") as f:
+        start = len(f.readline())
+        stop = os.fstat(f.fileno()).st_size
+        if not complete_rows:
+            return start, stop
+        while stop > start:
+            lo = max(start, stop - block)
+            f.seek(lo)
+            newline = f.read(stop - lo).rfind(b"\n")
+            if newline >= 0:
+                return start, lo + newline + 1
+            stop = lo
+        return start, start
+
+
+def iter_csv_range(csvfile, start, stop, cols=None, dtype=np.float64, chunk_rows=16384):
+    # as iter_csv_chunks, for the rows between byte offsets start and stop only
+    import codecs
+
+    header = read_csv_header(csvfile)
+
+    def lines(f, remaining):
+        while remaining > 0:
+            line = f.readline(remaining)
+            if not line:
+                break
+            remaining -= len(line)
+            yield line
+
+    with open(csvfile, "rb") as f:
+        f.seek(start)
+        text = codecs.iterdecode(lines(f, stop - start), "utf-8", errors="ignore")
+        reader = csv.reader(text)
+        yield from _iter_rows(reader, header, cols, dtype, chunk_rows, csvfile)
+
+
+def _iter_rows(reader, header, cols, dtype, chunk_rows, csvfile):
+    if cols is None:
+        cols = header
+    try:
+        idx = [header.index(c) for c in cols]
+    except ValueError:
+        raise KeyError(f"column not found in {csvfile}: {cols}")
+    cells = [[] for _ in idx]
+    count = 0
+    for row in reader:
+        if not row:
+            continue
+        width = len(row)
+        for i, cell in zip(idx, cells):
+            cell.append(row[i] if i < width else "")
+        count += 1
+        if count == chunk_rows:
+            yield _cells_to_chunk(cols, cells, dtype)
+            cells = [[] for _ in idx]
+            count = 0
+    if count:
+        yield _cells_to_chunk(cols, cells, dtype)
+
+
+def _cells_to_chunk(cols, cells, dtype):
+    return {col: parse_float_cells(c, dtype) for col, c in zip(cols, cells)}
+
+
+def import_csv_columns(csvfile, cols=None, dtype=np.float64, chunk_rows=16384):
+    # single pass multi-column loader, returns {label: array} with NaN for
+    # missing / unparseable cells. buffers grow by doubling then shrink in place
+    dtype = np.dtype(dtype)
+    buffers = {}
+    n = 0
+    with profiling.stage("ingest") as timer:
+        for chunk in iter_csv_chunks(csvfile, cols, dtype, chunk_rows):
+            if not chunk:
+                break
+            m = len(next(iter(chunk.values())))
+            for col, values in chunk.items():
+                buf = buffers.get(col)
+                if buf is None:
+                    buf = buffers[col] = np.empty(max(chunk_rows, m), dtype=dtype)
+                elif n + m > len(buf):
+                    buf.resize(max(2 * len(buf), n + m), refcheck=False)
+                buf[n : n + m] = values
+            n += m
+        timer.count(n * len(buffers))
+    if cols is None:
+        cols = list(buffers) or read_csv_header(csvfile)
+    columns = {}
+    for col in cols:
+        buf = buffers.get(col, np.empty(0, dtype=dtype))
+        buf.resize(n, refcheck=False)
+        columns[col] = buf
+    return columns
+
+
+# binary inputs by file extension, everything else is read as csv
+BINARY_FORMATS = {
+    ".npy": "npy",
+    ".npz": "npz",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+    ".parquet": "parquet",
+    ".pq": "parquet",
+}
+
+
+def input_format(path):
+    return BINARY_FORMATS.get(os.path.splitext(str(path))[1].lower(), "csv")
+
+
+def _array_labels(shape, dtype, name=None):
+    # column labels of an array: one per field of a structured array, else one
+    # per column of a 2-D array ("<name>_<i>"), a named 1-D array is one column
+    if dtype.names:
+        return list(dtype.names)
+    if len(shape) == 1 and name:
+        return [name]
+    prefix = name or "column"
+    return [f"{prefix}_{i}" for i in range(int(np.prod(shape[1:], dtype=np.int64)))]
+
+
+def _array_columns(arr, name=None):
+    # {label: column view} of a (memory mapped) array. structured arrays give
+    # one column per field, 2-D arrays one per column (strided views of a C
+    # order file, contiguous ones of a fortran order file)
+    labels = _array_labels(arr.shape, arr.dtype, name)
+    if arr.dtype.names:
+        return {field: arr[field] for field in labels}
+    arr = arr.reshape(len(arr), -1)
+    return {label: arr[:, i] for i, label in enumerate(labels)}
+
+
+def _npy_header(f):
+    # (shape, fortran order, dtype) of the .npy stream at f, which is left at
+    # the start of the array data
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        return np.lib.format.read_array_header_1_0(f)
+    return np.lib.format.read_array_header_2_0(f)
+
+
+def _npz_member(path, zf, info):
+    # memory maps an uncompressed .npz member in place, else reads it
+    import struct
+    import zipfile
+
+    if info.compress_type != zipfile.ZIP_STORED:
+        with zf.open(info) as f:
+            return np.lib.format.read_array(f)
+    with open(path, "rb") as f:
+        f.seek(info.header_offset)
+        local = f.read(30)
+        name_len, extra_len = struct.unpack("<HH", local[26:30])
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+        shape, fortran, dtype = _npy_header(f)
+        offset = f.tell()
+    order = "F" if fortran else "C"
+    return np.memmap(path, dtype, "r", offset, shape, order)
+
+
+def _binary_columns(path, fmt, cols=None):
+    # {label: array} without parsing: .npy / .npz are memory mapped, arrow
+    # and parquet files read only the projected columns
+    if fmt == "npy":
+        columns = _array_columns(np.load(path, mmap_mode="r"))
+    elif fmt == "npz":
+        import zipfile
+
+        columns = {}
+        with zipfile.ZipFile(path) as zf:
+            for info in zf.infolist():
+                name = info.filename.removesuffix(".npy")
+                # skip members that hold none of the requested columns
+                if cols is not None and not any(
+                    c == name or c.startswith(name + "_") for c in cols
+                ):
+                    continue
+                columns.update(_array_columns(_npz_member(path, zf, info), name))
+    else:
+        if fmt == "parquet":
+            import pyarrow.parquet as pq
+
+            table = pq.read_table(path, columns=cols, memory_map=True)
+        else:
+            import pyarrow.feather as feather
+
+            table = feather.read_table(path, columns=cols, memory_map=True)
+        columns = {
+            name: _arrow_to_numpy(table.column(name)) for name in table.column_names
+        }
+    if cols is None:
+        return columns
+    missing = [c for c in cols if c not in columns]
+    if missing:
+        raise KeyError(f"column not found in {path}: {missing}")
+    return {c: columns[c] for c in cols}
+
+
+def _arrow_to_numpy(column):
+    # zero copy for single chunk, null free numeric columns; nulls become NaN
+    import pyarrow as pa
+
+    if column.num_chunks == 1 and column.null_count == 0:
+        try:
+            return column.chunk(0).to_numpy(zero_copy_only=True)
+        except pa.ArrowInvalid:
+            pass
+    return column.cast(pa.float64()).fill_null(np.nan).to_numpy()
+
+
+def read_header(path):
+    # column labels of a csv or binary input
+    fmt = input_format(path)
+    if fmt == "csv":
+        return read_csv_header(path)
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).names
+    if fmt == "arrow":
+        import pyarrow as pa
+
+        with pa.memory_map(str(path)) as source:
+            return pa.ipc.open_file(source).schema.names
+    if fmt == "npy":
+        with open(path, "rb") as f:
+            shape, _, dtype = _npy_header(f)
+        return _array_labels(shape, dtype)
+    # npz: only the .npy header at the start of each member is read (and, for
+    # compressed members, decompressed), never the arrays
+    import zipfile
+
+    labels = []
+    with zipfile.ZipFile(path) as zf:
+        for member in zf.namelist():
+            with zf.open(member) as f:
+                shape, _, dtype = _npy_header(f)
+            labels.extend(_array_labels(shape, dtype, member.removesuffix(".npy")))
+    return labels
+
+
+def import_columns(path, cols=None, dtype=None):
+    # {label: array} from a csv or binary input. binary columns keep their
+    # stored dtype unless dtype is given, so memory mapped data is not copied
+    fmt = input_format(path)
+    if fmt == "csv":
+        return import_csv_columns(path, cols, dtype or np.float64)
+    with profiling.stage("ingest") as timer:
+        columns = _binary_columns(path, fmt, cols)
+        if dtype is not None:
+            columns = {c: v.astype(dtype, copy=False) for c, v in columns.items()}
+        timer.count(sum(len(v) for v in columns.values()))
+    return columns
+
+
+def drop_nan(values):
+    # values without NaN entries; the input itself (no copy) when there are none
+    mask = np.isnan(values)
+    return values[~mask] if mask.any() else values
+
+
+def import_long_columns(path, group_col, value_col, dtype=np.float64):
+    # (group labels, values) of long format data in one pass: labels are kept
+    # as read (strings for csv), values parsed like import_columns
+    fmt = input_format(path)
+    with profiling.stage("ingest") as timer:
+        if fmt == "csv":
+            with open(
+                path, "r", newline="", encoding="utf-8-sig", errors="ignore"
+            ) as f:
+                reader = csv.reader(f)
+                header = next(reader, [])
+                missing = [c for c in [group_col, value_col] if c not in header]
+                if missing:
+                    raise KeyError(f"column not found in {path}: {missing}")
+                g, v = header.index(group_col), header.index(value_col)
+                width = max(g, v) + 1
+                groups, cells = [], []
+                for row in reader:
+                    if len(row) < width:
+                        row = row + [""] * (width - len(row))
+                    groups.append(row[g])
+                    cells.append(row[v])
+            groups = np.array(groups)
+            values = parse_float_cells(cells, dtype)
+        elif fmt in ["parquet", "arrow"]:
+            columns = _binary_columns(path, fmt, [value_col])
+            values = columns[value_col].astype(dtype, copy=False)
+            if fmt == "parquet":
+                import pyarrow.parquet as pq
+
+                table = pq.read_table(path, columns=[group_col], memory_map=True)
+            else:
+                import pyarrow.feather as feather
+
+                table = feather.read_table(path, columns=[group_col], memory_map=True)
+            groups = table.column(group_col).to_numpy()
+            if groups.dtype == object:
+                groups = groups.astype(str)
+        else:
+            columns = _binary_columns(path, fmt, [group_col, value_col])
+            groups = np.asarray(columns[group_col])
+            values = columns[value_col].astype(dtype, copy=False)
+        timer.count(2 * len(values))
+    return groups, values
+
+
+def nan_mask(columns):
+    # returns {label: bool array} flagging missing / unparseable cells
+    return {col: np.isnan(values) for col, values in columns.items()}
+
+
+def import_csv_column(csvfile, col, dtype=float):
+    # kept for existing callers, see import_csv_columns
+    return import_csv_columns(csvfile, [col], np.dtype(dtype))[col]
 
 
 def export_dict_png(
@@ -33,6 +381,10 @@ def export_dict_png(
     dpi=150,
     highlight_red=False,
 ):
+    # pandas / dataframe_image are slow to import, only load them for PNGs
+    import dataframe_image as dfi
+    import pandas as pd
+
     # deal with nested garbage
     if nested:
         df = pd.DataFrame.from_dict(
@@ -54,7 +406,8 @@ def export_dict_png(
         )
     if highlight_red:
         styled_df = styled_df.applymap(highlight_fail)
-    dfi.export(styled_df, stat_save_path, dpi=dpi)
+    with profiling.stage("dataframe_image", len(df)):
+        dfi.export(styled_df, stat_save_path, dpi=dpi)
 
 
 def highlight_fail(cell):
@@ -64,32 +417,45 @@ def highlight_fail(cell):
         return "color: black"
 
 
-def test_p_value(p, test, result_dict):
-    # check whether t-test, wherein interpretation flipped
+def interpret_p(p, test):
+    # (conclusion, interpretation) for a p value, t-tests flip the wording
     t = False
-    # set interpretations based on input dict
+    # set interpretations based on the test
     if test in ["bartletts", "levenes"]:
         less_p = "likely NOT homogeneous"
         greater_p = "likely homogeneous"
-    elif test in ["shapiro-wilks", "k-squared", "kolmogorov-smirnov"]:
+    elif test in [
+        "shapiro-wilks",
+        "k-squared",
+        "kolmogorov-smirnov",
+        "anderson-darling",
+    ]:
         less_p = "likely NOT normally distributed"
         greater_p = "likely normally distributed"
     elif test in ["one-sample", "two-sample"]:
         less_p = "likely from the same population"
         greater_p = "likely NOT from the same population"
         t = True
+    elif test == "anova":
+        less_p = "group means likely differ"
+        greater_p = "group means likely equal"
+        t = True
     # test p
     if p < ALPHA and not t:
-        result_dict[test]["interpretation"] = less_p
+        return False, less_p
     elif p < ALPHA and t:
-        result_dict[test]["interpretation"] = less_p
-        result_dict[test]["conclusion"] = True
+        return True, less_p
     elif p > ALPHA and t:
-        result_dict[test]["conclusion"] = False
-        result_dict[test]["interpretation"] = greater_p
+        return False, greater_p
     else:
-        result_dict[test]["conclusion"] = True
-        result_dict[test]["interpretation"] = greater_p
+        return True, greater_p
+
+
+def test_p_value(p, test, result_dict):
+    # fills in conclusion / interpretation of result_dict[test]
+    conclusion, interpretation = interpret_p(p, test)
+    result_dict[test]["conclusion"] = conclusion
+    result_dict[test]["interpretation"] = interpretation
 
 
 def build_hypy_directory(save_path="null", figs=True, stats=True, ttest=True):
@@ -106,17 +472,18 @@ def build_hypy_directory(save_path="null", figs=True, stats=True, ttest=True):
     # ------>Histogram.png
     # ------>Q-Q Plot.png
     if save_path != "null":
-        parent_path = uniquify_dir(os.path.join(save_path, r"hypy_output"))
+        parent_path = make_unique_dir(os.path.join(save_path, r"hypy_output"))
         assumptions_path = os.path.join(parent_path, r"assumption_tests")
-        path_structure = [parent_path, assumptions_path]
+        path_structure = [assumptions_path]
         figs_path = os.path.join(assumptions_path, r"figures")
         stats_path = os.path.join(assumptions_path, r"stats")
         if figs:
             path_structure.append(figs_path)
         if stats:
             path_structure.append(stats_path)
-        for path in path_structure:
-            os.mkdir(path)
+        with profiling.stage("directories", len(path_structure)):
+            for path in path_structure:
+                os.mkdir(path)
     else:
         print("Please provide save path to build directory")
     return parent_path, assumptions_path, figs_path, stats_path
@@ -127,21 +494,26 @@ def build_testdir(parent_path, test):
     ttest_path = os.path.join(parent_path, r"t_test")
     if test == "ttest":
         path_structure.append(ttest_path)
-    for path in path_structure:
-        os.mkdir(path)
+    with profiling.stage("directories", len(path_structure)):
+        for path in path_structure:
+            os.mkdir(path)
     return ttest_path
 
 
-def uniquify_dir(path):
-    counter = 1
-    while os.path.exists(path):
-        if path[-1:].isnumeric():
-            counter = int(path[-1:]) + 1
-            path = path.replace(path[-1:], str(counter))
-        else:
-            path = path + "_" + str(counter)
-        counter += 1
-    return path
+def make_unique_dir(path):
+    # creates path, else path_1, path_2, ... and returns the one created.
+    # os.mkdir either creates the directory or fails, so concurrent runs can
+    # never end up with the same name (no exists() probing)
+    candidate = path
+    counter = 0
+    with profiling.stage("directories", 1):
+        while True:
+            try:
+                os.mkdir(candidate)
+                return candidate
+            except FileExistsError:
+                counter += 1
+                candidate = f"{path}_{counter}"
 
 
 def export_assump_summary(savepath, string):
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from statsmodels.stats.diagnostic import lilliefors, normal_ad
+
+import assumption_checks as ac
+
+
+def _samples():
+    # normal through heavily skewed data, A^2 from ~0.2 to several thousand
+    rng = np.random.default_rng(8)
+    yield rng.normal(size=50)
+    yield rng.normal(size=5000)
+    yield rng.standard_t(5, size=400)
+    yield rng.standard_t(3, size=2000)
+    for n in [30, 200, 1000, 8000, 50000]:
+        yield rng.exponential(size=n)
+        yield rng.lognormal(sigma=1.5, size=n)
+
+
+@pytest.mark.parametrize("data", list(_samples()))
+def test_anderson_darling_matches_statsmodels(data):
+    a2, p = ac.anderson_darling(data)
+    expected_a2, expected_p = normal_ad(data)
+    # statsmodels takes log(1 - cdf) directly, which loses precision and then
+    # overflows in the far tail, A^2 here uses log sf
+    if np.isfinite(expected_a2):
+        assert a2 == pytest.approx(expected_a2, rel=1e-5)
+    assert p == pytest.approx(expected_p, rel=1e-6, abs=1e-12)
+
+
+def test_anderson_darling_covers_large_statistics():
+    a2s = [ac.anderson_darling(data)[0] for data in _samples()]
+    assert min(a2s) < 0.6 and max(a2s) > 153.467
+
+
+def test_anderson_darling_rejects_large_exponential_sample():
+    data = np.random.default_rng(0).exponential(size=8000)
+    results = ac.check_normality(data, statistical_options=["anderson-darling"])
+    result = results["anderson-darling"]
+    assert result.statistic > 300
+    assert result.p == 0.0
+
+
+def _lilliefors_samples():
+    rng = np.random.default_rng(7)
+    yield rng.normal(size=30)
+    yield rng.normal(size=300)
+    yield rng.normal(size=3000)
+    yield rng.standard_t(4, size=300)
+    yield rng.standard_t(10, size=2000)
+    yield rng.exponential(size=80)
+    yield rng.uniform(size=150)
+
+
+@pytest.mark.parametrize("data", list(_lilliefors_samples()))
+def test_lilliefors_matches_statsmodels(data):
+    d, p = ac.lilliefors(data)
+    expected_d, expected_p = lilliefors(data, pvalmethod="approx")
+    assert d == pytest.approx(expected_d, rel=1e-12)
+    if expected_p < 0.1:
+        # both use the Dallal-Wilkinson approximation below 0.1
+        assert p == pytest.approx(expected_p, rel=1e-9)
+    else:
+        # above it this follows R nortest's polynomial in the modified
+        # statistic, statsmodels interpolates a table
+        assert p > 0.1 and p == pytest.approx(expected_p, abs=0.1)
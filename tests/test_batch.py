@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+import batch
+
+
+def _columns(seed=3):
+    rng = np.random.default_rng(seed)
+    data = rng.normal(0.1, 1.0, size=(500, 6)) * np.arange(1, 7)
+    data[rng.integers(0, 500, size=15), rng.integers(0, 6, size=15)] = np.nan
+    return data
+
+
+def _column(data, j):
+    x = data[:, j]
+    return x[~np.isnan(x)]
+
+
+def test_one_sample_columns_match_scipy():
+    data = _columns()
+    table = batch.batch_ttest(data, pop_mean=0.2)
+    for j, row in enumerate(table):
+        x = _column(data, j)
+        assert row["n"] == len(x)
+        assert (row["t"], row["p"]) == pytest.approx(
+            tuple(stats.ttest_1samp(x, 0.2)), rel=1e-9
+        )
+        assert (row["k2"], row["k2_p"]) == pytest.approx(
+            tuple(stats.normaltest(x)), rel=1e-9
+        )
+
+
+def test_two_sample_columns_match_scipy():
+    data_1, data_2 = _columns(3), _columns(4)[:400]
+    table = batch.batch_ttest(data_1, data_2, test_type="two-sample")
+    for j, row in enumerate(table):
+        x, y = _column(data_1, j), _column(data_2, j)
+        assert (row["t"], row["p"]) == pytest.approx(
+            tuple(stats.ttest_ind(x, y)), rel=1e-9
+        )
+        assert (row["levene"], row["levene_p"]) == pytest.approx(
+            tuple(stats.levene(x, y)), rel=1e-9
+        )
+        assert (row["bartlett"], row["bartlett_p"]) == pytest.approx(
+            tuple(stats.bartlett(x, y)), rel=1e-9
+        )
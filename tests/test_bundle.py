@@ -0,0 +1,37 @@
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import bundle
+
+
+def _entry(i):
+    return {"input": f"run{i}.csv"}, [("a.txt", f"result {i}\n".encode() * 50)]
+
+
+def _append_many(archive, worker, count):
+    return [bundle.append(archive, _entry(worker * 100 + i), "r") for i in range(count)]
+
+
+def test_runs_get_distinct_names(tmp_path):
+    archive = tmp_path / "out.zip"
+    names = [bundle.append(archive, _entry(i), "r") for i in range(3)]
+    assert names == ["r", "r_1", "r_2"]
+    index = bundle.read_index(archive)
+    assert [r["run"] for r in index] == names
+    assert index[1]["input"] == "run1.csv"
+    assert index[1]["files"] == [{"path": "r_1/a.txt", "bytes": 450}]
+
+
+def test_concurrent_appends_keep_every_run(tmp_path):
+    archive = str(tmp_path / "out.zip")
+    workers, count = 4, 20
+    with ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_append_many, archive, w, count) for w in range(workers)]
+        names = [name for f in futures for name in f.result()]
+    assert len(set(names)) == workers * count
+    with zipfile.ZipFile(archive) as zf:
+        assert zf.testzip() is None
+        assert len(zf.namelist()) == 2 * workers * count
+        contents = {zf.read(f"{name}/a.txt") for name in names}
+    assert len(contents) == workers * count
+    assert len(bundle.read_index(archive)) == workers * count
@@ -0,0 +1,33 @@
+import matplotlib
+import numpy as np
+
+import cache
+
+
+def test_keys_depend_on_the_hypy_version(tmp_path):
+    data = np.arange(10.0)
+    old = cache.ResultCache(tmp_path, version="0.1.0")
+    new = cache.ResultCache(tmp_path, version="0.2.0")
+    assert old.key("ttest", [data]) == old.key("ttest", [data.copy()])
+    assert old.key("ttest", [data]) != new.key("ttest", [data])
+
+
+def test_figure_keys_depend_on_the_matplotlib_version(tmp_path, monkeypatch):
+    result_cache = cache.ResultCache(tmp_path, version="0.1.0")
+    data = np.arange(10.0)
+    before = result_cache.figure_key("histogram", data, "a", 300)
+    monkeypatch.setattr(matplotlib, "__version__", "0.0.1")
+    assert result_cache.figure_key("histogram", data, "a", 300) != before
+
+
+def test_memoize_computes_once(tmp_path):
+    result_cache = cache.ResultCache(tmp_path, version="0.1.0")
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"p": 0.5}
+
+    for _ in range(2):
+        assert result_cache.memoize("ttest", [np.ones(3)], {}, compute) == {"p": 0.5}
+    assert len(calls) == 1
@@ -0,0 +1,15 @@
+import pytest
+
+import hy
+
+
+def test_format_list_is_parsed():
+    args = hy.build_parser().parse_args(["data.csv", "t-two", "out", "-f", "md,csv"])
+    assert args.formats == ["md", "csv"]
+
+
+def test_unknown_format_is_rejected_by_the_parser(tmp_path, capsys):
+    with pytest.raises(SystemExit):
+        hy.main(["data.csv", "t-two", str(tmp_path), "-f", "md,xml"])
+    assert "unknown format(s) xml" in capsys.readouterr().err
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,37 @@
+import json
+import math
+
+import numpy as np
+import pytest
+
+import exporters
+import results
+
+
+def _strict(constant):
+    raise ValueError(f"non-standard json constant {constant}")
+
+
+def _results():
+    # a test that ran next to one that did not (NaN t / p), with a numpy and
+    # an infinite extra field
+    ran = results.TestResult("one-sample", 2.5, 0.02, extra={"ci_low": np.float64(0.1)})
+    skipped = results.TestResult("one-sample", extra={"effect": np.float64(math.inf)})
+    return results.as_dict({"a": ran, "b": skipped})
+
+
+def test_json_writes_non_finite_values_as_null():
+    text = exporters.render_json(_results(), "t", ["a", "b"])
+    data = json.loads(text, parse_constant=_strict)
+    assert data["results"]["b"]["t"] is None
+    assert data["results"]["b"]["p"] is None
+    assert data["results"]["b"]["effect"] is None
+    assert data["results"]["a"]["p"] == pytest.approx(0.02)
+    assert data["results"]["a"]["ci_low"] == pytest.approx(0.1)
+
+
+def test_jsonl_writes_non_finite_values_as_null():
+    text = exporters.render_jsonl(_results(), "t", ["a", "b"])
+    records = [json.loads(line, parse_constant=_strict) for line in text.splitlines()]
+    assert records
+    assert any(value is None for record in records for value in record.values())
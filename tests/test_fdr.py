@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from statsmodels.stats.multitest import multipletests
+
+import batch
+import fdr
+
+STATSMODELS_METHODS = {"bh": "fdr_bh", "holm": "holm", "bonferroni": "bonferroni"}
+
+
+def _p_values(m=2000):
+    rng = np.random.default_rng(24)
+    p = rng.uniform(size=m)
+    p[: m // 10] = rng.uniform(0, 1e-4, size=m // 10)
+    # ties, as columns with identical results give
+    p[-20:] = p[-40:-20]
+    return p
+
+
+@pytest.mark.parametrize("method", fdr.METHODS)
+def test_adjust_matches_statsmodels(method):
+    p = _p_values()
+    adjusted, rejected = fdr.classify(p, method, 0.05)
+    expected_reject, expected, _, _ = multipletests(
+        p, 0.05, STATSMODELS_METHODS[method]
+    )
+    np.testing.assert_allclose(adjusted, expected, rtol=1e-12, atol=1e-15)
+    np.testing.assert_array_equal(rejected, expected < 0.05)
+
+
+@pytest.mark.parametrize("method", fdr.METHODS)
+def test_nan_p_values_are_not_counted(method):
+    p = _p_values(200)
+    with_nan = np.insert(p, [3, 50, 120], np.nan)
+    adjusted = fdr.adjust(with_nan, method)
+    assert np.isnan(adjusted[[3, 51, 122]]).all()
+    np.testing.assert_allclose(adjusted[~np.isnan(with_nan)], fdr.adjust(p, method))
+
+
+def test_unknown_method_is_rejected():
+    with pytest.raises(ValueError):
+        fdr.adjust([0.1, 0.2], "sidak")
+
+
+def test_adjust_table_adds_columns():
+    rng = np.random.default_rng(3)
+    table = batch.batch_ttest(rng.normal(0.1, 1, size=(200, 30)))
+    adjusted = fdr.adjust_table(table, "holm")
+    names = adjusted.dtype.names
+    assert names[names.index("p") + 1] == "p_adjusted"
+    assert names[-1] == "conclusion_adjusted"
+    np.testing.assert_array_equal(adjusted["p"], table["p"])
+    np.testing.assert_allclose(adjusted["p_adjusted"], fdr.adjust(table["p"], "holm"))
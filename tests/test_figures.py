@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+import figures
+
+
+def _samples():
+    rng = np.random.default_rng(18)
+    yield rng.normal(size=50)
+    yield rng.normal(size=20000)
+    yield rng.exponential(size=3000)
+    yield rng.standard_cauchy(size=5000)
+    # mostly one value: iqr 0, so numpy falls back to half the sqrt width
+    yield np.concatenate([np.zeros(5000), rng.normal(size=20)])
+    # a tight core with far outliers: tiny iqr next to a wide range
+    yield np.concatenate([rng.normal(0, 1e-4, 4000), [-50.0, 50.0]])
+    yield np.round(rng.normal(size=1000), 1)
+
+
+@pytest.mark.parametrize("data", list(_samples()))
+def test_histogram_bins_match_numpy_auto(data):
+    expected = len(np.histogram_bin_edges(data, "auto")) - 1
+    summary = figures.histogram_summary(data)
+    assert len(summary["counts"]) == min(expected, figures.HIST_MAX_BINS)
+    if expected <= figures.HIST_MAX_BINS:
+        counts, edges = np.histogram(data, "auto")
+        np.testing.assert_array_equal(summary["counts"], counts)
+        np.testing.assert_allclose(summary["edges"], edges)
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+import grouped
+
+
+def _long(seed=19):
+    rng = np.random.default_rng(seed)
+    labels = np.array([f"grp{i}" for i in range(5)])
+    groups = labels[rng.integers(0, 5, size=4000)]
+    values = rng.normal(size=4000)
+    values += np.searchsorted(labels, groups) * 0.05
+    values[rng.integers(0, 4000, size=20)] = np.nan
+    return groups, values
+
+
+def _split(groups, values):
+    keep = ~np.isnan(values)
+    groups, values = groups[keep], values[keep]
+    labels = sorted(set(groups))
+    return labels, [values[groups == g] for g in labels]
+
+
+def test_group_table_matches_numpy():
+    groups, values = _long()
+    table, _, _, _ = grouped.grouped_analysis(groups, values, tests=False)
+    labels, samples = _split(groups, values)
+    assert list(table["label"]) == labels
+    for row, x in zip(table, samples):
+        assert row["n"] == len(x)
+        assert row["mean"] == pytest.approx(x.mean(), rel=1e-12)
+        assert row["std"] == pytest.approx(x.std(ddof=1), rel=1e-12)
+        assert row["median"] == np.median(x)
+        assert (row["k2"], row["k2_p"]) == pytest.approx(tuple(stats.normaltest(x)))
+
+
+def test_variance_and_anova_match_scipy():
+    groups, values = _long()
+    _, variance, f_test, pairs = grouped.grouped_analysis(groups, values)
+    _, samples = _split(groups, values)
+    levene = variance["levenes"]
+    assert (levene.statistic, levene.p) == pytest.approx(tuple(stats.levene(*samples)))
+    bartlett = variance["bartletts"]
+    assert (bartlett.statistic, bartlett.p) == pytest.approx(
+        tuple(stats.bartlett(*samples))
+    )
+    assert (f_test.statistic, f_test.p) == pytest.approx(
+        tuple(stats.f_oneway(*samples))
+    )
+    assert len(pairs) == 10
+    for row in pairs:
+        i, j = (int(g[-1]) for g in (row["group_1"], row["group_2"]))
+        expected = stats.ttest_ind(samples[i], samples[j])
+        assert (row["t"], row["p"]) == pytest.approx(tuple(expected))
@@ -0,0 +1,75 @@
+import json
+
+import numpy as np
+import pytest
+from scipy import stats
+
+import hy
+import incremental
+import streaming as stream
+import supfunc as sup
+
+
+def _write(path, text, mode="w"):
+    with open(path, mode, newline="") as f:
+        f.write(text)
+
+
+def test_data_range_stops_after_the_last_complete_row(tmp_path):
+    path = tmp_path / "data.csv"
+    _write(path, "a,b\n1,2\n3,4\n5,")
+    assert sup.csv_data_range(path) == (4, path.stat().st_size)
+    start, stop = sup.csv_data_range(path, complete_rows=True)
+    assert (start, stop) == (4, len("a,b\n1,2\n3,4\n"))
+    _write(path, "a,b\n")
+    assert sup.csv_data_range(path, complete_rows=True) == (4, 4)
+
+
+def _no_trailing_newline(path):
+    values = np.array([3.1, 2.4, 5.6, 4.2, 3.3, 6.1, 2.9, 4.8, 7.5])
+    _write(path, "a\n" + "\n".join(str(v) for v in values))
+    return values
+
+
+def test_stream_reads_a_final_row_without_newline(tmp_path):
+    path = tmp_path / "data.csv"
+    values = _no_trailing_newline(path)
+    accs, _, offset, new_rows = incremental.update(path, ["a"])
+    assert (new_rows, accs["a"].n, offset) == (9, 9, path.stat().st_size)
+    assert stream.ttest_1samp(accs["a"], 1.0) == pytest.approx(
+        tuple(stats.ttest_1samp(values, 1.0))
+    )
+
+
+def test_stream_run_counts_a_final_row_without_newline(tmp_path):
+    path = tmp_path / "data.csv"
+    _no_trailing_newline(path)
+    hy.main([str(path), "t-one", str(tmp_path), "-m", "1", "--stream", "--stats-only"])
+    with open(tmp_path / "hypy_output" / incremental.STATE_NAME) as f:
+        assert json.load(f)["samples"]["a"]["moments"]["n"] == 9
+
+
+def test_row_appended_in_two_writes_is_read_once(tmp_path, capsys):
+    path = tmp_path / "data.csv"
+    rows = np.random.default_rng(15).normal(size=(40, 2))
+    lines = [f"{a},{b}\n" for a, b in rows]
+    _write(path, "a,b\n" + "".join(lines[:20]) + lines[20][:5])
+    accs, sketches, offset, new_rows = incremental.update(
+        path, ["a", "b"], complete_rows=True
+    )
+    assert new_rows == 20
+    assert "5 bytes after the last complete row" in capsys.readouterr().out
+    (tmp_path / "hypy_output").mkdir()
+    incremental.save_state(tmp_path / "hypy_output", path, offset, accs, sketches)
+
+    _write(path, lines[20][5:] + "".join(lines[21:]), "a")
+    state = incremental.find_state(str(tmp_path), str(path))
+    accs, _, offset, new_rows = incremental.update(
+        path, ["a", "b"], state, complete_rows=True
+    )
+    assert new_rows == 20
+    assert offset == path.stat().st_size
+    for col, values in zip(["a", "b"], rows.T):
+        assert accs[col].n == 40
+        assert accs[col].mean == pytest.approx(values.mean(), rel=1e-12)
+        assert accs[col].variance() == pytest.approx(values.var(ddof=1), rel=1e-10)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+from statsmodels.stats.power import TTestIndPower, TTestPower
+
+import power
+
+ALTERNATIVES = {1: "larger", 2: "two-sided"}
+
+
+def _reference_power(effect, n_1, alpha, tails, ratio, test_type):
+    if test_type == "one-sample":
+        return TTestPower().power(effect, n_1, alpha, alternative=ALTERNATIVES[tails])
+    return TTestIndPower().power(
+        effect, n_1, alpha, ratio=ratio, alternative=ALTERNATIVES[tails]
+    )
+
+
+@pytest.mark.parametrize("test_type", ["one-sample", "two-sample"])
+def test_power_grid_matches_statsmodels(test_type):
+    table = power.power_table(
+        [0.1, 0.5, 1.2], [0.01, 0.05], [1, 2], [1, 2.5], [5, 40, 300], test_type
+    )
+    assert len(table) == (36 if test_type == "one-sample" else 72)
+    for row in table:
+        # statsmodels takes n_2 = ratio * n_1 unrounded, n_2 is whole here
+        ratio = row["n_2"] / row["n_1"] if test_type == "two-sample" else 1
+        expected = _reference_power(
+            row["effect"], row["n_1"], row["alpha"], row["tails"], ratio, test_type
+        )
+        if np.isnan(expected) and row["tails"] == 2:
+            # statsmodels' lower tail comes out nan for some large
+            # noncentralities (scipy nct.cdf), where that tail is negligible:
+            # compare with the upper tail alone
+            expected = _reference_power(
+                row["effect"], row["n_1"], row["alpha"] / 2, 1, ratio, test_type
+            )
+        assert row["power"] == pytest.approx(expected, rel=1e-8)
+
+
+@pytest.mark.parametrize("test_type", ["one-sample", "two-sample"])
+def test_sample_size_grid_is_the_smallest_n(test_type):
+    table = power.sample_size_table(
+        np.linspace(0.05, 2.5, 12),
+        [0.01, 0.05],
+        [1, 2],
+        [1, 3],
+        [0.5, 0.8, 0.95],
+        test_type,
+    )
+    assert (table["n_1"] >= power.MIN_N).all()
+    assert (table["power"] >= table["target"]).all()
+    args = (table["alpha"], table["tails"], table["ratio"], test_type)
+    np.testing.assert_allclose(
+        power.ttest_power(table["effect"], table["n_1"], *args), table["power"]
+    )
+    below = power.ttest_power(table["effect"], table["n_1"] - 1, *args)
+    assert ((below < table["target"]) | (table["n_1"] == power.MIN_N)).all()
+
+
+@pytest.mark.parametrize(
+    "effect, ratio, alpha, tails, target",
+    [(0.5, 1, 0.05, 2, 0.8), (0.2, 1.5, 0.01, 1, 0.9), (0.01, 1, 0.05, 2, 0.8)],
+)
+def test_sample_size_matches_statsmodels(effect, ratio, alpha, tails, target):
+    n, achieved = power.sample_size(effect, alpha, tails, ratio, target, "two-sample")
+    expected = TTestIndPower().solve_power(
+        effect, None, alpha, target, ratio, ALTERNATIVES[tails]
+    )
+    assert n[0] == int(np.ceil(expected))
+    assert achieved[0] >= target
+
+
+def test_sample_size_rejects_bad_targets():
+    with pytest.raises(ValueError):
+        power.sample_size(0.0)
+    with pytest.raises(ValueError):
+        power.sample_size(0.5, power=1.0)
+
+
+def test_parse_grid():
+    np.testing.assert_allclose(power.parse_grid("0.2,0.5"), [0.2, 0.5])
+    np.testing.assert_allclose(power.parse_grid("0.1:0.3:0.1,1"), [0.1, 0.2, 0.3, 1])
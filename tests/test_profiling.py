@@ -0,0 +1,31 @@
+import numpy as np
+import pytest
+
+import profiling
+
+
+@pytest.fixture
+def profiled():
+    profiling.enable()
+    yield
+    profiling.disable()
+
+
+@pytest.mark.skipif(profiling._current_rss() is None, reason="needs /proc")
+def test_rss_delta_is_attributed_to_the_stage(profiled):
+    kept = []
+    with profiling.stage("allocate"):
+        kept.append(np.ones(64 * 1024 * 1024 // 8))
+    with profiling.stage("idle"):
+        pass
+    stages = {s["stage"]: s for s in profiling.report()["stages"]}
+    assert stages["allocate"]["rss_delta_mb"] > 60
+    assert abs(stages["idle"]["rss_delta_mb"]) < 5
+
+
+def test_stage_records_calls_and_items(profiled):
+    for _ in range(3):
+        with profiling.stage("work", 10):
+            pass
+    (record,) = profiling.report()["stages"]
+    assert (record["calls"], record["items"]) == (3, 30)
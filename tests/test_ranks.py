@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+import ranks
+from samples import SampleSummary
+
+
+def _rng():
+    return np.random.default_rng(22)
+
+
+def test_rankdata_matches_scipy_with_ties():
+    x = np.round(_rng().normal(size=500), 1)
+    r, ties = ranks.rankdata(x)
+    np.testing.assert_allclose(r, stats.rankdata(x))
+    _, counts = np.unique(x, return_counts=True)
+    assert ties == pytest.approx(float((counts**3 - counts).sum()))
+
+
+@pytest.mark.parametrize("rounding", [None, 1])
+@pytest.mark.parametrize("merge", [False, True])
+def test_mannwhitneyu_matches_scipy(monkeypatch, rounding, merge):
+    if merge:
+        monkeypatch.setattr(ranks, "RANK_MAX_N", 0)
+    rng = _rng()
+    x, y = rng.normal(size=300), rng.normal(0.2, 1.3, size=250)
+    if rounding is not None:
+        x, y = np.round(x, rounding), np.round(y, rounding)
+    u, p, details = ranks.mannwhitneyu(x, y)
+    expected = stats.mannwhitneyu(x, y, alternative="two-sided", method="asymptotic")
+    assert details["ranking"] == ("sorted merge" if merge else "argsort")
+    assert u == pytest.approx(expected.statistic)
+    assert p == pytest.approx(expected.pvalue, rel=1e-9)
+
+
+def test_mannwhitneyu_uses_sorted_summaries():
+    rng = _rng()
+    x = SampleSummary(rng.normal(size=100)).prepare()
+    y = SampleSummary(rng.normal(size=120)).prepare()
+    u, p, details = ranks.mannwhitneyu(x, y)
+    assert details["ranking"] == "sorted merge"
+    expected = stats.mannwhitneyu(x.data, y.data, method="asymptotic")
+    assert (u, p) == pytest.approx((expected.statistic, expected.pvalue))
+
+
+def test_mannwhitneyu_small_samples_are_exact():
+    rng = _rng()
+    x, y = rng.normal(size=6), rng.normal(size=9)
+    u, p, _ = ranks.mannwhitneyu(x, y)
+    expected = stats.mannwhitneyu(x, y, alternative="two-sided")
+    assert (u, p) == pytest.approx((expected.statistic, expected.pvalue))
+
+
+@pytest.mark.parametrize("n", [12, 40, 60, 400])
+@pytest.mark.parametrize("merge", [False, True])
+def test_wilcoxon_reports_w_plus_on_both_paths(monkeypatch, n, merge):
+    if merge:
+        monkeypatch.setattr(ranks, "RANK_MAX_N", 0)
+    x = np.round(_rng().normal(0.3, 1, size=n), 2)
+    w_plus, p, _ = ranks.wilcoxon(x, pop_mean=0.1)
+    d = x - 0.1
+    # one-sided "greater" reports w+ as its statistic
+    assert w_plus == pytest.approx(stats.wilcoxon(d, alternative="greater").statistic)
+    assert p == pytest.approx(stats.wilcoxon(d, correction=True).pvalue, rel=1e-9)
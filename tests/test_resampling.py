@@ -0,0 +1,140 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+import resampling
+
+
+def _groups():
+    rng = np.random.default_rng(11)
+    return rng.exponential(2.0, size=60), rng.exponential(4.0, size=45) + 0.5
+
+
+def _brute_acceleration(samples, statistic):
+    # textbook jackknife over every sample, statistic recomputed per leave-one-out
+    nums, dens = 0.0, 0.0
+    for j, x in enumerate(samples):
+        theta_i = np.array(
+            [
+                statistic(
+                    *[np.delete(s, i) if k == j else s for k, s in enumerate(samples)]
+                )
+                for i in range(len(x))
+            ]
+        )
+        u = (len(x) - 1) * (theta_i.mean() - theta_i)
+        nums += np.sum(u**3) / len(x) ** 3
+        dens += np.sum(u**2) / len(x) ** 2
+    return nums / (6 * dens**1.5)
+
+
+def test_jackknife_acceleration_one_sample():
+    x, _ = _groups()
+    a = resampling._jackknife_acceleration([x], [1])
+    assert a == pytest.approx(_brute_acceleration([x], np.mean), rel=1e-9)
+
+
+def test_jackknife_acceleration_difference_of_means():
+    x, y = _groups()
+    a = resampling._jackknife_acceleration([x, y], [1, -1])
+    expected = _brute_acceleration([x, y], lambda a, b: a.mean() - b.mean())
+    assert a == pytest.approx(expected, rel=1e-9)
+    assert a < 0
+
+
+@pytest.mark.parametrize("two_sample", [False, True])
+@pytest.mark.parametrize("method", ["percentile", "bca"])
+def test_bootstrap_ci_matches_scipy(two_sample, method):
+    x, y = _groups()
+    data = (x, y) if two_sample else (x,)
+    result = resampling.bootstrap_ci(
+        x, y if two_sample else None, 50000, 0.95, method, seed=1
+    )
+    expected = stats.bootstrap(
+        data,
+        lambda *s, axis: s[0].mean(axis=axis)
+        - (s[1].mean(axis=axis) if len(s) > 1 else 0),
+        n_resamples=50000,
+        method="BCa" if method == "bca" else "percentile",
+        random_state=np.random.default_rng(2),
+    )
+    # independent resamples: endpoints agree to monte carlo error
+    width = result["ci_high"] - result["ci_low"]
+    assert result["ci_low"] == pytest.approx(
+        expected.confidence_interval.low, abs=0.03 * width
+    )
+    assert result["ci_high"] == pytest.approx(
+        expected.confidence_interval.high, abs=0.03 * width
+    )
+
+
+def _small_groups():
+    # few enough values that scipy enumerates every permutation exactly
+    rng = np.random.default_rng(10)
+    return rng.normal(0.6, 1.0, size=10), rng.normal(0.0, 1.5, size=7)
+
+
+@pytest.mark.parametrize("two_sample", [False, True])
+@pytest.mark.parametrize("tail_type", ["two-tailed", "one-tailed"])
+def test_permutation_test_matches_scipy(two_sample, tail_type):
+    x, y = _small_groups()
+    if not two_sample:
+        y = None
+    result = resampling.permutation_test(
+        x, y, 0.1, 200000, tail_type, seed=4, batch_size=5000
+    )
+    observed = x.mean() - (y.mean() if two_sample else 0.1)
+    if tail_type == "two-tailed":
+        alternative = "two-sided"
+    else:
+        alternative = "greater" if observed >= 0 else "less"
+    if two_sample:
+        data = (x, y)
+        permutation_type = "independent"
+
+        def statistic(a, b, axis):
+            return a.mean(axis=axis) - b.mean(axis=axis)
+
+    else:
+        data = (x - 0.1,)
+        permutation_type = "samples"
+
+        def statistic(a, axis):
+            return a.mean(axis=axis)
+
+    expected = stats.permutation_test(
+        data,
+        statistic,
+        permutation_type=permutation_type,
+        alternative=alternative,
+        n_resamples=np.inf,
+    )
+    assert result["statistic"] == pytest.approx(expected.statistic)
+    # exact p against monte carlo p: agree to a few standard errors
+    assert result["p"] == pytest.approx(expected.pvalue, abs=4 * result["mc_error"])
+
+
+def _close_groups():
+    # overlapping groups, p well away from 0 so tol needs many permutations
+    rng = np.random.default_rng(12)
+    return rng.normal(0.2, 1.0, size=50), rng.normal(0.0, 1.0, size=40)
+
+
+@pytest.mark.parametrize("two_sample", [False, True])
+@pytest.mark.parametrize("tol", [None, 0.005])
+def test_permutation_test_same_result_for_any_worker_count(two_sample, tol):
+    x, y = _close_groups()
+    args = (x, y if two_sample else None, 0, 60000, "two-tailed", 7)
+    serial = resampling.permutation_test(*args, workers=0, tol=tol)
+    for workers in [2, 3]:
+        assert resampling.permutation_test(*args, workers=workers, tol=tol) == serial
+
+
+def test_permutation_test_tol_stops_early():
+    x, y = _close_groups()
+    full = resampling.permutation_test(x, y, 0, 10**6, seed=3)
+    early = resampling.permutation_test(x, y, 0, 10**6, seed=3, tol=0.01)
+    assert full["n_permutations"] >= 10**6
+    assert 1000 <= early["n_permutations"] < full["n_permutations"] // 10
+    assert early["mc_error"] < 0.01
+    assert early["p"] == pytest.approx(full["p"], abs=4 * early["mc_error"])
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+import stats_tests as st
+
+NORMALITY = ["shapiro-wilks", "k-squared", "kolmogorov-smirnov", "anderson-darling"]
+VARIANCE = ["levenes", "bartletts"]
+
+
+def _as_dicts(normality, variance):
+    return (
+        [{test: r.to_dict() for test, r in tests.items()} for tests in normality],
+        (
+            None
+            if variance is None
+            else {test: r.to_dict() for test, r in variance.items()}
+        ),
+    )
+
+
+@pytest.mark.parametrize("parallel", ["threads", "processes"])
+@pytest.mark.parametrize("subsample", [None, 300])
+@pytest.mark.parametrize("n_groups", [1, 2])
+def test_parallel_assumptions_match_sequential(parallel, subsample, n_groups):
+    rng = np.random.default_rng(20)
+    groups = [rng.normal(size=2000), rng.exponential(size=1500)][:n_groups]
+    labels = ["a", "b"][:n_groups]
+    args = (groups, labels, [NORMALITY] * n_groups, VARIANCE, subsample, 3)
+    expected = _as_dicts(*st.check_assumptions(*args))
+    assert _as_dicts(*st.check_assumptions(*args, parallel=parallel)) == expected
+    assert [list(tests) for tests in expected[0]] == [NORMALITY] * n_groups
+    assert (expected[1] is None) == (n_groups == 1)
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+import streaming as stream
+from samples import SampleSummary
+
+
+def _data(n=20000, seed=5):
+    # offset mean and skew, where naive one-pass moment sums lose precision
+    rng = np.random.default_rng(seed)
+    return 1e6 + rng.gamma(2.0, 3.0, size=n)
+
+
+def _chunked(data, sizes):
+    acc = stream.MomentAccumulator()
+    for chunk in np.split(data, np.cumsum(sizes)[:-1]):
+        acc.update(chunk)
+    return acc
+
+
+def _assert_moments(acc, data):
+    assert acc.n == len(data)
+    assert acc.mean == pytest.approx(data.mean(), rel=1e-14)
+    assert acc.variance() == pytest.approx(data.var(ddof=1), rel=stream.STREAM_RTOL)
+    assert acc.skewness() == pytest.approx(stats.skew(data), rel=stream.STREAM_RTOL)
+    assert acc.kurtosis() == pytest.approx(
+        stats.kurtosis(data, fisher=False), rel=stream.STREAM_RTOL
+    )
+
+
+@pytest.mark.parametrize("sizes", [[20000], [1] * 10 + [19990], [7, 4993, 15000]])
+def test_chunked_moments_match_scipy(sizes):
+    data = _data()
+    _assert_moments(_chunked(data, sizes), data)
+
+
+def test_merge_is_order_independent():
+    data = _data()
+    parts = [stream.MomentAccumulator.from_array(c) for c in np.array_split(data, 7)]
+    forward, backward = stream.MomentAccumulator(), stream.MomentAccumulator()
+    for part in parts:
+        forward.merge(part)
+    for part in reversed(parts):
+        backward.merge(part)
+    _assert_moments(forward, data)
+    _assert_moments(backward, data)
+
+
+def test_nan_values_are_ignored():
+    data = _data(1000)
+    with_nan = np.insert(data, [0, 500, 1000], np.nan)
+    _assert_moments(stream.MomentAccumulator.from_array(with_nan), data)
+
+
+def test_state_round_trip():
+    acc = stream.MomentAccumulator.from_array(_data(500))
+    again = stream.MomentAccumulator.from_dict(acc.to_dict())
+    assert again.to_dict() == acc.to_dict()
+
+
+def test_moment_tests_match_scipy():
+    rng = np.random.default_rng(9)
+    x, y = rng.normal(1.0, 2.0, size=3000), rng.normal(1.2, 2.5, size=2500)
+    ax, ay = _chunked(x, [1000, 2000]), _chunked(y, [2500])
+    rtol = stream.STREAM_RTOL
+    assert stream.ksquared(ax) == pytest.approx(tuple(stats.normaltest(x)), rel=rtol)
+    assert stream.bartlett([ax, ay]) == pytest.approx(
+        tuple(stats.bartlett(x, y)), rel=rtol
+    )
+    assert stream.ttest_1samp(ax, 1.1) == pytest.approx(
+        tuple(stats.ttest_1samp(x, 1.1)), rel=rtol
+    )
+    assert stream.ttest_ind(ax, ay) == pytest.approx(
+        tuple(stats.ttest_ind(x, y)), rel=rtol
+    )
+
+
+def test_sample_summary_matches_numpy():
+    data = _data(5001)
+    summary = SampleSummary(data)
+    _assert_moments(summary.moments, data)
+    assert summary.median == np.median(data)
+    q = [0, 0.1, 0.25, 0.5, 0.9, 1]
+    np.testing.assert_allclose(summary.quantiles(q), np.quantile(data, q), rtol=1e-15)
+    assert summary.mad == pytest.approx(stats.median_abs_deviation(data))
+
+
+@pytest.mark.parametrize("accuracy", [0.01, 0.001])
+def test_quantile_sketch_relative_error(accuracy):
+    rng = np.random.default_rng(12)
+    data = np.concatenate([rng.lognormal(size=30000), -rng.lognormal(size=10000)])
+    left = stream.QuantileSketch(accuracy).update(data[:25000])
+    right = stream.QuantileSketch(accuracy).update(data[25000:])
+    sketch = stream.QuantileSketch.from_dict(left.merge(right).to_dict())
+    assert sketch.n == len(data)
+    q = np.linspace(0.01, 0.99, 99)
+    # every estimate within the sketch's relative accuracy of a data value
+    exact = np.quantile(data, q, method="lower")
+    np.testing.assert_allclose(sketch.quantiles(q), exact, rtol=2 * accuracy)
@@ -0,0 +1,180 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+import supfunc as sup
+
+
+def test_make_unique_dir_numbers_taken_names(tmp_path):
+    base = str(tmp_path / "hypy_output")
+    made = [sup.make_unique_dir(base) for _ in range(3)]
+    assert made == [base, base + "_1", base + "_2"]
+    assert all(os.path.isdir(path) for path in made)
+
+
+def test_make_unique_dir_keeps_digits_in_the_parent(tmp_path):
+    parent = tmp_path / "run2024"
+    parent.mkdir()
+    base = str(parent / "hypy_output")
+    sup.make_unique_dir(base)
+    assert sup.make_unique_dir(base) == base + "_1"
+
+
+def test_make_unique_dir_concurrent_callers_get_distinct_dirs(tmp_path):
+    base = str(tmp_path / "hypy_output")
+    with ThreadPoolExecutor(8) as pool:
+        made = list(pool.map(lambda _: sup.make_unique_dir(base), range(32)))
+    assert len(set(made)) == 32
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(p) for p in made)
+
+
+def _table(n=500):
+    rng = np.random.default_rng(16)
+    return rng.normal(size=(n, 3))
+
+
+def _assert_columns(path, expected):
+    # header, full read and a projected read all agree with expected
+    assert sup.read_header(path) == list(expected)
+    columns = sup.import_columns(path)
+    assert list(columns) == list(expected)
+    for label, values in expected.items():
+        np.testing.assert_array_equal(columns[label], values)
+    last = list(expected)[-1]
+    projected = sup.import_columns(path, [last], dtype=np.float32)
+    assert list(projected) == [last]
+    assert projected[last].dtype == np.float32
+    np.testing.assert_allclose(projected[last], expected[last], rtol=1e-6)
+
+
+@pytest.mark.parametrize("order", ["C", "F"])
+def test_npy_2d_columns(tmp_path, order):
+    table = _table()
+    path = tmp_path / "data.npy"
+    np.save(path, np.asarray(table, order=order))
+    _assert_columns(path, {f"column_{i}": table[:, i] for i in range(3)})
+
+
+def test_npy_structured_columns(tmp_path):
+    table = _table()
+    data = np.zeros(len(table), dtype=[("a", "f8"), ("b", "f4"), ("c", "i8")])
+    data["a"], data["b"], data["c"] = table[:, 0], table[:, 1], table[:, 2] * 100
+    path = tmp_path / "data.npy"
+    np.save(path, data)
+    _assert_columns(path, {name: data[name] for name in data.dtype.names})
+    assert sup.import_columns(path, ["c"])["c"].dtype == np.int64
+
+
+@pytest.mark.parametrize("save", [np.savez, np.savez_compressed])
+def test_npz_columns(tmp_path, save):
+    table = _table()
+    path = tmp_path / "data.npz"
+    save(path, x=table[:, 0], y=table[:, 1].astype(np.float32), grid=table[:, 1:])
+    expected = {"x": table[:, 0], "y": table[:, 1].astype(np.float32)}
+    expected.update({f"grid_{i}": table[:, i + 1] for i in range(2)})
+    _assert_columns(path, expected)
+    with pytest.raises(KeyError):
+        sup.import_columns(path, ["z"])
+
+
+def test_npz_header_reads_no_arrays(tmp_path, monkeypatch):
+    path = tmp_path / "data.npz"
+    np.savez_compressed(path, x=_table()[:, 0])
+
+    def fail(*args, **kwargs):
+        raise AssertionError("array read for the header")
+
+    monkeypatch.setattr(sup, "_npz_member", fail)
+    monkeypatch.setattr(np.lib.format, "read_array", fail)
+    assert sup.read_header(path) == ["x"]
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "arrow"])
+def test_arrow_columns(tmp_path, fmt):
+    pa = pytest.importorskip("pyarrow")
+    table = _table()
+    # a null in b comes back as NaN
+    b = pa.array(list(table[:-1, 1]) + [None], type=pa.float64())
+    data = pa.table({"a": table[:, 0], "b": b})
+    path = tmp_path / f"data.{fmt}"
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(data, path)
+    else:
+        import pyarrow.feather as feather
+
+        feather.write_feather(data, path)
+    _assert_columns(path, {"a": table[:, 0], "b": np.append(table[:-1, 1], np.nan)})
+
+
+def _write_csv(path, rows):
+    path.write_text("\n".join(",".join(row) for row in rows) + "\n")
+    return path
+
+
+@pytest.mark.parametrize(
+    "cells, expected",
+    [
+        (["1.5", "-2", "3e2"], [1.5, -2.0, 300.0]),
+        (["1.5", "", " ", "nan", "4"], [1.5, np.nan, np.nan, np.nan, 4.0]),
+        (["1.5", "abc", "", "2x", "-inf"], [1.5, np.nan, np.nan, np.nan, -np.inf]),
+    ],
+)
+def test_parse_float_cells_blank_and_junk_cells_become_nan(cells, expected):
+    for dtype in [np.float64, np.float32]:
+        values = sup.parse_float_cells(cells, dtype)
+        assert values.dtype == dtype
+        np.testing.assert_array_equal(values, np.array(expected, dtype=dtype))
+
+
+def test_import_csv_columns_blank_junk_and_ragged_rows(tmp_path):
+    path = _write_csv(
+        tmp_path / "data.csv",
+        [
+            ["a", "b", "c"],
+            ["1", "2", "3"],
+            ["", "junk", "6"],
+            # short row: the missing cells are NaN, extra cells are ignored
+            ["7"],
+            ["8", "9", "10", "11"],
+            [" 12 ", "", ""],
+        ],
+    )
+    columns = sup.import_csv_columns(path)
+    assert list(columns) == ["a", "b", "c"]
+    np.testing.assert_array_equal(columns["a"], [1, np.nan, 7, 8, 12])
+    np.testing.assert_array_equal(columns["b"], [2, np.nan, np.nan, 9, np.nan])
+    np.testing.assert_array_equal(columns["c"], [3, 6, np.nan, 10, np.nan])
+    picked = sup.import_csv_columns(path, ["c", "a"], dtype=np.float32)
+    assert list(picked) == ["c", "a"]
+    assert all(values.dtype == np.float32 for values in picked.values())
+    np.testing.assert_array_equal(picked["c"], np.float32([3, 6, np.nan, 10, np.nan]))
+    with pytest.raises(KeyError):
+        sup.import_csv_columns(path, ["z"])
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 7, 64, 16384])
+def test_import_csv_columns_grows_buffers_across_chunks(tmp_path, chunk_rows):
+    rng = np.random.default_rng(1)
+    table = np.round(rng.normal(size=(1000, 2)), 6)
+    rows = [["x", "y"]] + [[repr(float(a)), repr(float(b))] for a, b in table]
+    # a blank every 37 rows puts the slower parse in some chunks only
+    for i in range(1, len(rows), 37):
+        rows[i][1] = ""
+    table[::37, 1] = np.nan
+    path = _write_csv(tmp_path / "data.csv", rows)
+    for dtype in [np.float64, np.float32]:
+        columns = sup.import_csv_columns(path, dtype=dtype, chunk_rows=chunk_rows)
+        for i, label in enumerate(["x", "y"]):
+            assert columns[label].dtype == dtype
+            np.testing.assert_array_equal(columns[label], table[:, i].astype(dtype))
+
+
+def test_import_csv_columns_header_only(tmp_path):
+    path = _write_csv(tmp_path / "data.csv", [["a", "b"]])
+    columns = sup.import_csv_columns(path)
+    assert list(columns) == ["a", "b"]
+    assert all(len(values) == 0 for values in columns.values())